@@ -0,0 +1,20 @@
+# Generated by Django 4.2.15 on 2026-10-19 11:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('caterings', '0007_make_order_provider_non_nullable'),
+        ('resources', '0159_resourcedailyutilization'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cateringorder',
+            name='reservation',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='catering_orders', to='resources.reservation', verbose_name='Reservation'),
+        ),
+    ]
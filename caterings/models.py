@@ -89,7 +89,8 @@ class CateringOrder(TimeStampedModel):
         CateringProvider, verbose_name=_('Catering provider'), related_name='catering_orders', on_delete=models.PROTECT
     )
     reservation = models.ForeignKey(
-        Reservation, verbose_name=_('Reservation'), related_name='catering_orders', on_delete=models.CASCADE
+        Reservation, verbose_name=_('Reservation'), related_name='catering_orders', on_delete=models.CASCADE,
+        db_constraint=False
     )
     invoicing_data = models.TextField(verbose_name=_('Invoicing data'))
     message = models.TextField(verbose_name=_('Message'), blank=True)
@@ -1,7 +1,7 @@
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 
-from kulkunen.models import AccessControlGrant, AccessControlSystem
+from kulkunen.models import AccessControlGrant, AccessControlGrantIntent, AccessControlSystem
 
 
 class Command(BaseCommand):
@@ -20,6 +20,8 @@ class Command(BaseCommand):
             grant.install()
 
     def handle(self, *args, **options):
+        # Turn the access requested since the last run into grants first
+        AccessControlGrantIntent.process()
         self.now = timezone.now()
         for system in AccessControlSystem.objects.all():
             self.sync_system(system)
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.15 on 2026-10-19 11:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kulkunen', '0005_django_3_update'),
+        ('resources', '0159_resourcedailyutilization'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='accesscontrolgrant',
+            name='reservation',
+            field=models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='access_control_grants', to='resources.reservation'),
+        ),
+    ]
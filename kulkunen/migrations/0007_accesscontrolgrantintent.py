@@ -0,0 +1,29 @@
+# Generated by Django 4.2.15 on 2026-10-19 17:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resources', '0165_changefeedentry'),
+        ('kulkunen', '0006_accesscontrolgrant_reservation_db_constraint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccessControlGrantIntent',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action', models.CharField(choices=[('grant', 'grant'), ('revoke', 'revoke')], max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('modified_at', models.DateTimeField(auto_now=True)),
+                ('reservation', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='resources.reservation')),
+                ('resource', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='grant_intents', to='kulkunen.accesscontrolresource')),
+            ],
+            options={
+                'unique_together': {('reservation', 'resource')},
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.15 on 2026-10-19 19:10
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kulkunen', '0007_accesscontrolgrantintent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='accesscontrolgrantintent',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='accesscontrolgrantintent',
+            name='last_error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='accesscontrolgrantintent',
+            name='next_attempt_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='accesscontrolgrantintent',
+            name='state',
+            field=models.CharField(choices=[('pending', 'pending'), ('failed', 'failed')], default='pending', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='accesscontrolgrantintent',
+            index=models.Index(fields=['state', 'next_attempt_at'], name='kulkunen_intent_due_idx'),
+        ),
+    ]
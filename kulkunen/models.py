@@ -1,8 +1,11 @@
 import logging
 import random
+import time
 from datetime import timedelta
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.core.exceptions import ImproperlyConfigured
 from django.db import models, transaction
 from django.utils import timezone
@@ -22,6 +25,10 @@ DRIVERS = (
 
 driver_classes = {}
 
+RESOURCE_MAP_CACHE_PREFIX = 'kulkunen-access-control-resource'
+RESOURCE_MAP_GENERATION_KEY = '%s:generation' % RESOURCE_MAP_CACHE_PREFIX
+RESOURCE_MAP_CACHE_TIMEOUT = 60 * 60
+
 
 class AccessControlUserQuerySet(models.QuerySet):
     def active(self):
@@ -100,7 +107,8 @@ class AccessControlGrant(models.Model):
     # If a Respa reservation is deleted, it will be marked as None here.
     # AccessControlReservation with reservation == None should be deleted.
     reservation = models.ForeignKey(
-        'resources.Reservation', on_delete=models.SET_NULL, null=True, related_name='access_control_grants'
+        'resources.Reservation', on_delete=models.SET_NULL, null=True, related_name='access_control_grants',
+        db_constraint=False
     )
     starts_at = models.DateTimeField(null=True, blank=True)
     ends_at = models.DateTimeField(null=True, blank=True)
@@ -285,6 +293,63 @@ class AccessControlResource(models.Model):
         self.system.save_resource(self)
         super().save(*args, **kwargs)
 
+    @classmethod
+    def _get_cache_key(cls, resource_id):
+        generation = cache.get(RESOURCE_MAP_GENERATION_KEY)
+        if generation is None:
+            # start from the clock, so that mappings cached before the
+            # generation key was evicted do not become valid again
+            cache.add(RESOURCE_MAP_GENERATION_KEY, int(time.time() * 1000), None)
+            generation = cache.get(RESOURCE_MAP_GENERATION_KEY, 0)
+        return '%s:%s:%s' % (RESOURCE_MAP_CACHE_PREFIX, generation, resource_id)
+
+    @classmethod
+    def get_for_resource(cls, resource_id, select_system=False):
+        """Get the access control resource of a Respa resource, if any.
+
+        Whether a Respa resource has an access control resource is cached,
+        so that the reservation and resource signal handlers do not need to
+        query for the resources without one. The cache keys contain a
+        generation number that is bumped whenever an access control resource
+        changes, so the cache is used only if it is shared by the processes.
+        """
+        queryset = cls.objects.select_related('system') if select_system else cls.objects.all()
+        if not settings.RESPA_SHARED_CACHE:
+            return queryset.filter(resource=resource_id).order_by('id').first()
+
+        key = cls._get_cache_key(resource_id)
+        acr_id = cache.get(key)
+        if acr_id == 0:
+            return None
+        if acr_id is not None:
+            acr = queryset.filter(pk=acr_id).first()
+        else:
+            # only one access control resource per Respa resource is supported, the first one is used
+            acr = queryset.filter(resource=resource_id).order_by('id').first()
+            cache.set(key, acr.id if acr else 0, RESOURCE_MAP_CACHE_TIMEOUT)
+        return acr
+
+    @classmethod
+    def get_id_for_resource(cls, resource_id):
+        """Get the id of the access control resource of a Respa resource, if any."""
+        if not settings.RESPA_SHARED_CACHE:
+            return cls.objects.filter(resource=resource_id).order_by('id').values_list('id', flat=True).first()
+
+        key = cls._get_cache_key(resource_id)
+        acr_id = cache.get(key)
+        if acr_id is None:
+            acr_id = cls.objects.filter(resource=resource_id).order_by('id').values_list('id', flat=True).first()
+            acr_id = acr_id or 0
+            cache.set(key, acr_id, RESOURCE_MAP_CACHE_TIMEOUT)
+        return acr_id or None
+
+    @classmethod
+    def clear_resource_map(cls):
+        try:
+            cache.incr(RESOURCE_MAP_GENERATION_KEY)
+        except ValueError:
+            cache.set(RESOURCE_MAP_GENERATION_KEY, int(time.time() * 1000), None)
+
     def pad_start_and_end_times(self, start, end):
         system = self.system
         leeway = system.reservation_leeway or 0
@@ -345,6 +410,139 @@ class AccessControlResource(models.Model):
         return self.grants.active().count()
 
 
+class AccessControlGrantIntent(models.Model):
+    """A pending request to grant or revoke access for a reservation.
+
+    The reservation signal handlers record the intents when the transaction
+    commits, and `sync_kulkunen` turns them into grants in batches before
+    installing and removing the grants, so that the requests do not wait for
+    the access control systems. Only the latest intent for a reservation is
+    kept.
+
+    Intents that fail are retried with an increasing delay, up to
+    MAX_ATTEMPTS times, after which they are marked failed.
+    """
+    GRANT = 'grant'
+    REVOKE = 'revoke'
+    ACTION_CHOICES = (
+        (GRANT, _('grant')),
+        (REVOKE, _('revoke')),
+    )
+
+    PENDING = 'pending'
+    FAILED = 'failed'
+    STATE_CHOICES = (
+        (PENDING, _('pending')),
+        (FAILED, _('failed')),
+    )
+
+    MAX_ATTEMPTS = 8
+
+    reservation = models.ForeignKey(
+        'resources.Reservation', on_delete=models.DO_NOTHING, related_name='+', db_constraint=False
+    )
+    resource = models.ForeignKey(AccessControlResource, related_name='grant_intents', on_delete=models.CASCADE)
+    action = models.CharField(max_length=20, choices=ACTION_CHOICES)
+    state = models.CharField(max_length=20, choices=STATE_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    modified_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = (('reservation', 'resource'),)
+        indexes = [
+            models.Index(fields=['state', 'next_attempt_at'], name='kulkunen_intent_due_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return "%s %s (%s)" % (self.action, self.reservation_id, self.resource_id)
+
+    @classmethod
+    def record(cls, reservation, resource_id, action):
+        """Record the intent when the current transaction commits."""
+        reservation_id = reservation.pk
+
+        def create():
+            # replace the earlier intent for the reservation, if any, and start its attempts over
+            cls.objects.bulk_create(
+                [cls(reservation_id=reservation_id, resource_id=resource_id, action=action)],
+                update_conflicts=True, unique_fields=['reservation', 'resource'],
+                update_fields=['action', 'state', 'attempts', 'next_attempt_at', 'last_error', 'modified_at'],
+            )
+        transaction.on_commit(create, robust=True)
+
+    @classmethod
+    def process(cls, batch_size=100):
+        """Grant or revoke access for the recorded intents.
+
+        The intents are processed in batches that share the access control
+        resources and systems, and with them the driver instances. Intents
+        that fail are logged and rescheduled.
+
+        :return: number of intents processed
+        """
+        from resources.models import Reservation
+
+        processed = 0
+        last_id = 0
+        systems = {}
+        now = timezone.now()
+        while True:
+            with transaction.atomic():
+                intents = list(
+                    cls.objects.filter(id__gt=last_id, state=cls.PENDING, next_attempt_at__lte=now)
+                    .order_by('id').select_for_update(skip_locked=True)[:batch_size]
+                )
+                if not intents:
+                    break
+                last_id = intents[-1].id
+
+                acrs = AccessControlResource.objects.select_related('system', 'resource')\
+                    .in_bulk({intent.resource_id for intent in intents})
+                for acr in acrs.values():
+                    acr.system = systems.setdefault(acr.system_id, acr.system)
+                reservations = Reservation.objects.select_related('resource', 'user')\
+                    .in_bulk({intent.reservation_id for intent in intents})
+
+                done = []
+                for intent in intents:
+                    acr = acrs[intent.resource_id]
+                    reservation = reservations.get(intent.reservation_id)
+                    # deleted reservations and ones moved to other resources need nothing more
+                    if reservation is not None and reservation.resource_id == acr.resource_id:
+                        try:
+                            with transaction.atomic():
+                                if intent.action == cls.GRANT:
+                                    acr.grant_access(reservation)
+                                else:
+                                    acr.revoke_access(reservation)
+                        except Exception as e:
+                            logger.exception('[%s] Failed to process access control grant intent' % intent)
+                            intent.reschedule(e)
+                            continue
+                    done.append(intent.id)
+                cls.objects.filter(id__in=done).delete()
+                processed += len(done)
+        return processed
+
+    def reschedule(self, error):
+        """Schedule the intent to be retried after a while, or mark it failed
+        when it has been tried too many times.
+        """
+        self.attempts += 1
+        self.last_error = str(error)
+        if self.attempts >= self.MAX_ATTEMPTS:
+            self.state = self.FAILED
+            logger.error('[%s] Giving up after %d attempts' % (self, self.attempts))
+        else:
+            min_delay = min(1 << self.attempts, 30 * 60)
+            retry_delay = random.randint(min_delay, 2 * min_delay)
+            self.next_attempt_at = timezone.now() + timedelta(seconds=retry_delay)
+        self.save(update_fields=['state', 'attempts', 'next_attempt_at', 'last_error', 'modified_at'])
+
+
 class AccessControlSystem(models.Model):
     name = models.CharField(max_length=100, unique=True)
     driver = models.CharField(max_length=30, choices=[(x[0], x[1]) for x in DRIVERS])
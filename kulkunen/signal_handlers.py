@@ -1,54 +1,71 @@
 import logging
 
 from django.apps import apps
-from django.db.models.signals import pre_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
 
 from resources.signals import reservation_cancelled, reservation_confirmed, reservation_modified
 
 logger = logging.getLogger(__name__)
 
 
-def _get_acr(resource):
-    acr = list(resource.access_control_resources.all())
-    if not len(acr):
-        return None
-    if len(acr) > 1:
-        logger.error('Currently supporting only one access control resource per Respa resource')
-    return acr[0]
+def _get_acr_id(resource_id):
+    from .models import AccessControlResource
 
+    return AccessControlResource.get_id_for_resource(resource_id)
 
-def handle_reservation_confirmed(sender, **kwargs):
-    reservation = kwargs.get('instance')
-    acr = _get_acr(reservation.resource)
-    if not acr:
+
+def _record_intent(reservation, action):
+    from .models import AccessControlGrantIntent
+
+    acr_id = _get_acr_id(reservation.resource_id)
+    if not acr_id:
         return
-    acr.grant_access(reservation)
+    AccessControlGrantIntent.record(reservation, acr_id, action)
+
+
+def handle_reservation_confirmed(sender, **kwargs):
+    from .models import AccessControlGrantIntent
+
+    _record_intent(kwargs.get('instance'), AccessControlGrantIntent.GRANT)
 
 
 def handle_reservation_cancelled(sender, **kwargs):
-    reservation = kwargs.get('instance')
-    acr = _get_acr(reservation.resource)
-    if not acr:
-        return
-    acr.revoke_access(reservation)
+    from .models import AccessControlGrantIntent
+
+    _record_intent(kwargs.get('instance'), AccessControlGrantIntent.REVOKE)
 
 
 def handle_reservation_modified(sender, **kwargs):
-    reservation = kwargs.get('instance')
-    acr = _get_acr(reservation.resource)
-    if not acr:
-        return
-    acr.grant_access(reservation)
+    from .models import AccessControlGrantIntent
+
+    _record_intent(kwargs.get('instance'), AccessControlGrantIntent.GRANT)
 
 
 def handle_respa_resource_save(sender, **kwargs):
+    from .models import AccessControlResource
+
     resource = kwargs.get('instance')
-    acr = _get_acr(resource)
+    if not resource.pk:
+        return
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and 'generate_access_codes' not in update_fields:
+        # The drivers only adjust the access code generation, which would not be saved anyway
+        return
+    acr = AccessControlResource.get_for_resource(resource.pk, select_system=True)
     if not acr:
         return
     acr.system.save_respa_resource(acr, resource)
 
 
+def handle_access_control_resource_changed(sender, **kwargs):
+    from .models import AccessControlResource
+
+    AccessControlResource.clear_resource_map()
+    # again after the commit, in case another process cached the old mapping meanwhile
+    transaction.on_commit(AccessControlResource.clear_resource_map)
+
+
 def install_signal_handlers():
     reservation_confirmed.connect(handle_reservation_confirmed)
     reservation_cancelled.connect(handle_reservation_cancelled)
@@ -56,3 +73,7 @@ def install_signal_handlers():
 
     Resource = apps.get_model(app_label='resources', model_name='Resource')
     pre_save.connect(handle_respa_resource_save, sender=Resource)
+
+    AccessControlResource = apps.get_model(app_label='kulkunen', model_name='AccessControlResource')
+    post_save.connect(handle_access_control_resource_changed, sender=AccessControlResource)
+    post_delete.connect(handle_access_control_resource_changed, sender=AccessControlResource)
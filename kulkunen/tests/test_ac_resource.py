@@ -1,6 +1,11 @@
+from unittest import mock
+
 import pytest
+from django.core.cache import cache
 
-from resources.models import Resource
+from kulkunen.models import AccessControlGrant, AccessControlGrantIntent, AccessControlResource
+from resources.models import Reservation, Resource
+from resources.signals import reservation_cancelled, reservation_confirmed, reservation_modified
 
 
 @pytest.mark.django_db
@@ -43,3 +48,100 @@ def test_resource_with_access_code(test_driver, monkeypatch, ac_resource):
 
     resource.refresh_from_db()
     assert resource.generate_access_codes is False
+
+
+@pytest.mark.django_db
+def test_grant_intents(django_capture_on_commit_callbacks, user, ac_resource, reservation):
+    with django_capture_on_commit_callbacks(execute=True):
+        reservation_confirmed.send(sender=Reservation, instance=reservation, user=user)
+    # The grant is created by sync_kulkunen, not in the request
+    assert not AccessControlGrant.objects.exists()
+    intent = AccessControlGrantIntent.objects.get(reservation=reservation)
+    assert intent.action == AccessControlGrantIntent.GRANT
+
+    with django_capture_on_commit_callbacks(execute=True):
+        reservation_modified.send(sender=Reservation, instance=reservation, user=user)
+    assert AccessControlGrantIntent.objects.count() == 1
+
+    assert AccessControlGrantIntent.process() == 1
+    grant = AccessControlGrant.objects.get(reservation=reservation)
+    assert grant.state == AccessControlGrant.REQUESTED
+    assert not AccessControlGrantIntent.objects.exists()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        reservation_cancelled.send(sender=Reservation, instance=reservation, user=user)
+    assert AccessControlGrantIntent.process() == 1
+    grant.refresh_from_db()
+    assert grant.state == AccessControlGrant.REMOVED
+
+
+@pytest.mark.django_db
+def test_grant_intents_only_for_access_controlled_resources(
+    django_capture_on_commit_callbacks, user, ac_resource, reservation, resource_in_unit2
+):
+    reservation.resource = resource_in_unit2
+    with django_capture_on_commit_callbacks(execute=True):
+        reservation_confirmed.send(sender=Reservation, instance=reservation, user=user)
+    assert not AccessControlGrantIntent.objects.exists()
+
+    # the intents are recorded as soon as the resource gets access control
+    AccessControlResource.objects.create(system=ac_resource.system, resource=resource_in_unit2)
+    with django_capture_on_commit_callbacks(execute=True):
+        reservation_confirmed.send(sender=Reservation, instance=reservation, user=user)
+    assert AccessControlGrantIntent.objects.filter(reservation=reservation).exists()
+
+
+@pytest.mark.django_db
+def test_grant_intents_are_retried(django_capture_on_commit_callbacks, user, ac_resource, reservation):
+    with django_capture_on_commit_callbacks(execute=True):
+        reservation_confirmed.send(sender=Reservation, instance=reservation, user=user)
+
+    with mock.patch.object(AccessControlResource, 'grant_access', side_effect=Exception('ACS is down')):
+        assert AccessControlGrantIntent.process() == 0
+    intent = AccessControlGrantIntent.objects.get(reservation=reservation)
+    assert intent.state == AccessControlGrantIntent.PENDING
+    assert intent.attempts == 1
+    assert intent.last_error == 'ACS is down'
+
+    # not due yet
+    with mock.patch.object(AccessControlResource, 'grant_access') as grant_access:
+        assert AccessControlGrantIntent.process() == 0
+    assert not grant_access.called
+
+    intent.attempts = AccessControlGrantIntent.MAX_ATTEMPTS - 1
+    intent.next_attempt_at = intent.created_at
+    intent.save()
+    with mock.patch.object(AccessControlResource, 'grant_access', side_effect=Exception('ACS is down')):
+        AccessControlGrantIntent.process()
+    intent.refresh_from_db()
+    assert intent.state == AccessControlGrantIntent.FAILED
+
+    # a new intent for the reservation starts over
+    with django_capture_on_commit_callbacks(execute=True):
+        reservation_modified.send(sender=Reservation, instance=reservation, user=user)
+    intent.refresh_from_db()
+    assert intent.state == AccessControlGrantIntent.PENDING
+    assert intent.attempts == 0
+
+
+@pytest.mark.django_db
+def test_resource_map_cache(settings, django_assert_num_queries, ac_system, resource_in_unit, resource_in_unit2):
+    settings.RESPA_SHARED_CACHE = True
+    cache.clear()
+
+    # resources without an access control resource are cached too
+    assert AccessControlResource.get_id_for_resource(resource_in_unit.pk) is None
+    with django_assert_num_queries(0):
+        assert AccessControlResource.get_id_for_resource(resource_in_unit.pk) is None
+        assert AccessControlResource.get_for_resource(resource_in_unit.pk, select_system=True) is None
+
+    # saving an access control resource invalidates the mapping
+    ac_resource = AccessControlResource.objects.create(system=ac_system, resource=resource_in_unit)
+    assert AccessControlResource.get_id_for_resource(resource_in_unit.pk) == ac_resource.pk
+    with django_assert_num_queries(1):
+        acr = AccessControlResource.get_for_resource(resource_in_unit.pk, select_system=True)
+        assert acr.system == ac_system
+    assert AccessControlResource.get_id_for_resource(resource_in_unit2.pk) is None
+
+    ac_resource.delete()
+    assert AccessControlResource.get_id_for_resource(resource_in_unit.pk) is None
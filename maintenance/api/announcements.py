@@ -1,6 +1,6 @@
 from django.utils import timezone
 from rest_framework import viewsets, serializers
-from resources.api.base import TranslatedModelSerializer, register_view
+from resources.api.base import ReadReplicaMixin, TranslatedModelSerializer, register_view
 from maintenance.models import MaintenanceMessage
 
 
@@ -24,7 +24,7 @@ class MaintenanceMessageSerializer(TranslatedModelSerializer):
 
 
 
-class MaintenanceMessageViewSet(viewsets.ReadOnlyModelViewSet):
+class MaintenanceMessageViewSet(ReadReplicaMixin, viewsets.ReadOnlyModelViewSet):
     queryset = MaintenanceMessage.objects.all()
     serializer_class = MaintenanceMessageSerializer
 
@@ -7,7 +7,7 @@ from resources.api.base import TranslatedModelSerializer
 from resources.models.reservation import Reservation
 from resources.models.utils import get_translated_fields
 
-from ..models import Order, OrderLine, Product, ProductCustomerGroup
+from ..models import Order, OrderLine, Product
 
 
 class ProductSerializer(TranslatedModelSerializer):
@@ -38,8 +38,8 @@ class ProductSerializer(TranslatedModelSerializer):
         return ret
 
     def get_product_customer_groups(self, obj):
-        product_cgs = ProductCustomerGroup.objects.filter(product=obj)
-        serializer = ProductCustomerGroupSerializer(product_cgs, many=True)
+        # read through the relation so that prefetched customer groups are used, see ProductQuerySet.prefetch_prices
+        serializer = ProductCustomerGroupSerializer(obj.product_customer_groups.all(), many=True)
         return serializer.data
 
 
@@ -50,8 +50,7 @@ class ProductSerializer(TranslatedModelSerializer):
         required_translations = ('name_fi', 'description_fi',)
 
     def get_product_customer_groups(self, obj):
-        prod_groups = ProductCustomerGroup.objects.filter(product=obj)
-        serializer = ProductCustomerGroupSerializer(prod_groups, many=True)
+        serializer = ProductCustomerGroupSerializer(obj.product_customer_groups.all(), many=True)
         return serializer.data
 
 
@@ -70,7 +69,7 @@ class ProductPermissions(DjangoModelPermissions):
 
 
 class ProductViewSet(viewsets.ModelViewSet):
-    queryset = Product.objects.filter(archived_at=ARCHIVED_AT_NONE)
+    queryset = Product.objects.filter(archived_at=ARCHIVED_AT_NONE).prefetch_prices()
     serializer_class = ProductSerializer
     permission_classes = (ProductPermissions, )
 
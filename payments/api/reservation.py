@@ -1,3 +1,5 @@
+from contextlib import contextmanager
+
 from django.utils.translation import gettext_lazy as _
 from django.db.models import Q
 from rest_framework import exceptions, serializers, status
@@ -16,6 +18,25 @@ from ..providers import get_payment_provider
 from .base import OrderSerializerBase
 
 
+@contextmanager
+def map_payment_errors():
+    """Turn payment provider errors into API errors with a matching status code"""
+    try:
+        yield
+    except DuplicateOrderError as doe:
+        raise exceptions.APIException(detail=str(doe),
+                                      code=status.HTTP_409_CONFLICT)
+    except (PayloadValidationError, UnknownReturnCodeError) as e:
+        raise exceptions.APIException(detail=str(e),
+                                      code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    except ServiceUnavailableError as sue:
+        raise exceptions.APIException(detail=str(sue),
+                                      code=status.HTTP_503_SERVICE_UNAVAILABLE)
+    except RespaPaymentError as pe:
+        raise exceptions.APIException(detail=str(pe),
+                                      code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 MODIFIABLE_FIELDS = (
     'state',
     'begin',
@@ -78,24 +99,7 @@ class ReservationEndpointOrderSerializer(OrderSerializerBase):
                 order.save()
                 return order
 
-        payments = get_payment_provider(request=self.context['request'],
-                                        ui_return_url=return_url)
-        try:
-            self.context['payment_url'] = payments.initiate_payment(order)
-            order.payment_url = self.context['payment_url']
-            order.save()
-        except DuplicateOrderError as doe:
-            raise exceptions.APIException(detail=str(doe),
-                                          code=status.HTTP_409_CONFLICT)
-        except (PayloadValidationError, UnknownReturnCodeError) as e:
-            raise exceptions.APIException(detail=str(e),
-                                          code=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        except ServiceUnavailableError as sue:
-            raise exceptions.APIException(detail=str(sue),
-                                          code=status.HTTP_503_SERVICE_UNAVAILABLE)
-        except RespaPaymentError as pe:
-            raise exceptions.APIException(detail=str(pe),
-                                          code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.initiate_payment(order, return_url, defer=True)
         return order
 
 
@@ -105,28 +109,60 @@ class ReservationEndpointOrderSerializer(OrderSerializerBase):
         return_url = validated_data.pop('return_url', '')
 
         order = super().update(instance, validated_data)
-        payments = get_payment_provider(request=self.context['request'],
-                                ui_return_url=return_url)
-        try:
-            self.context['payment_url'] = payments.initiate_payment(order)
-            order.payment_url = self.context['payment_url']
-            order.save()
-        except DuplicateOrderError as doe:
-            raise exceptions.APIException(detail=str(doe),
-                                          code=status.HTTP_409_CONFLICT)
-        except (PayloadValidationError, UnknownReturnCodeError) as e:
-            raise exceptions.APIException(detail=str(e),
-                                          code=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        except ServiceUnavailableError as sue:
-            raise exceptions.APIException(detail=str(sue),
-                                          code=status.HTTP_503_SERVICE_UNAVAILABLE)
-        except RespaPaymentError as pe:
-            raise exceptions.APIException(detail=str(pe),
-                                          code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.initiate_payment(order, return_url)
         return order
 
 
 
+    def initiate_payment(self, order, return_url, defer=False):
+        """
+        Prepare the payment of the order with the provider and create it.
+
+        With defer, when a new reservation is saved through ReservationViewSet,
+        the payment is created with the provider only after the transaction
+        has been committed, so that a slow provider does not keep the
+        reservation locked. If that fails, the order is rejected, which
+        releases the reservation, like the rollback would have done. The
+        changes of an existing reservation can't be undone like that, so
+        their payments are created within the transaction.
+        """
+        payments = get_payment_provider(request=self.context['request'],
+                                        ui_return_url=return_url)
+        with map_payment_errors():
+            payment_url = payments.prepare_payment(order)
+        if payment_url:
+            self.set_payment_url(order, payment_url)
+            return
+        order.save()
+
+        view = self.context.get('view')
+        if not defer or not hasattr(view, 'add_post_commit_hook'):
+            with map_payment_errors():
+                self.set_payment_url(order, payments.initiate_payment(order))
+            return
+
+        order.create_log_entry('Creating payment with the payment provider.', order.state)
+
+        def create_payment(response):
+            try:
+                with map_payment_errors():
+                    payment_url = payments.initiate_payment(order)
+            except exceptions.APIException as e:
+                order.set_state(Order.REJECTED, 'Creating payment failed: %s' % e.detail)
+                raise
+            self.set_payment_url(order, payment_url)
+            order.create_log_entry('Payment created.', order.state)
+            order_data = response.data.get('order')
+            if isinstance(order_data, dict) and 'payment_url' in order_data:
+                order_data['payment_url'] = payment_url
+
+        view.add_post_commit_hook(create_payment)
+
+    def set_payment_url(self, order, payment_url):
+        self.context['payment_url'] = payment_url
+        order.payment_url = payment_url
+        order.save()
+
     def get_payment_url(self, obj):
         return self.context.get('payment_url', '')
 
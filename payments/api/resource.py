@@ -7,6 +7,9 @@ from ..models import ARCHIVED_AT_NONE
 
 
 class PaymentsResourceSerializerMixin(serializers.ModelSerializer):
+    # products are versioned and archived separately from the resource, so they are not cached
+    DYNAMIC_FIELDS = ResourceSerializer.DYNAMIC_FIELDS + ('products',)
+
     products = serializers.SerializerMethodField()
 
     def get_products(self, obj):
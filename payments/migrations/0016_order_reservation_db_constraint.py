@@ -0,0 +1,20 @@
+# Generated by Django 4.2.15 on 2026-10-19 11:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0015_new_tax_percentage'),
+        ('resources', '0159_resourcedailyutilization'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='order',
+            name='reservation',
+            field=models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.PROTECT, related_name='order', to='resources.reservation', verbose_name='reservation'),
+        ),
+    ]
@@ -5,7 +5,7 @@ from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
 from django.db import models, transaction, DatabaseError
-from django.db.models import Case, DateTimeField, ExpressionWrapper, F, OuterRef, Q, Subquery, When
+from django.db.models import Case, DateTimeField, ExpressionWrapper, F, OuterRef, Prefetch, Q, Subquery, When
 from django.utils import translation
 from django.utils.formats import localize
 from django.utils.functional import cached_property
@@ -24,6 +24,7 @@ from .utils import (
     is_datetime_range_between_times, rounded, handle_customer_group_pricing, get_price_dict,
     finalize_price_data, get_fixed_time_slot_prices
 )
+from respa.instrumentation import timed
 
 import logging
 
@@ -298,6 +299,21 @@ class ProductQuerySet(models.QuerySet):
     def current(self):
         return self.filter(archived_at=ARCHIVED_AT_NONE)
 
+    def prefetch_prices(self):
+        """Prefetch the customer group and time slot prices serialized with the products"""
+        customer_groups = CustomerGroup.objects.prefetch_related('only_for_login_methods')
+        cg_time_slot_prices = CustomerGroupTimeSlotPrice.objects.prefetch_related(
+            Prefetch('customer_group', queryset=customer_groups)
+        )
+        return self.prefetch_related(
+            Prefetch('product_customer_groups', queryset=ProductCustomerGroup.objects.prefetch_related(
+                Prefetch('customer_group', queryset=customer_groups)
+            )),
+            Prefetch('time_slot_prices', queryset=TimeSlotPrice.objects.prefetch_related(
+                Prefetch('customer_group_time_slot_prices', queryset=cg_time_slot_prices)
+            )),
+        )
+
     def rents(self):
         return self.filter(type=Product.RENT)
 
@@ -442,8 +458,17 @@ class Product(models.Model):
         return convert_aftertax_to_pretax(self.get_price_for_time_range(begin, end), self.tax_percentage)
 
     @rounded
-    def get_price_for_time_range(self, begin: datetime, end: datetime, product_cg = None) -> Decimal:
+    @timed('pricing')
+    def get_price_for_time_range(self, begin: datetime, end: datetime, product_cg = None,
+                                 customer_group_id = None) -> Decimal:
+        '''
+        Returns the price of the product for the time range. The customer group
+        prices are looked up by customer_group_id, or the customer group the
+        product is priced for if not given.
+        '''
         assert begin < end
+        if customer_group_id is None:
+            customer_group_id = getattr(self, '_in_memory_cg', None)
 
         price = self.price if not product_cg else product_cg.price
         time_slot_prices = TimeSlotPrice.objects.filter(product=self)
@@ -452,7 +477,8 @@ class Product(models.Model):
         local_tz_end = end.astimezone(tz)
         if self.price_type == Product.PRICE_FIXED:
             if time_slot_prices:
-                return get_fixed_time_slot_price(time_slot_prices, local_tz_begin, local_tz_end, self, price)
+                return get_fixed_time_slot_price(time_slot_prices, local_tz_begin, local_tz_end, self, price,
+                                                 customer_group_id)
             return price
         elif self.price_type == Product.PRICE_PER_PERIOD:
             if time_slot_prices:
@@ -466,12 +492,12 @@ class Product(models.Model):
                         if is_datetime_range_between_times(begin_x=slot_begin, end_x=slot_begin + check_interval,
                             begin_y=time_slot_price.begin, end_y=time_slot_price.end):
                                 cg_time_slot_price = CustomerGroupTimeSlotPrice.objects.filter(
-                                    time_slot_price=time_slot_price, customer_group_id=self._in_memory_cg).first()
+                                    time_slot_price=time_slot_price, customer_group_id=customer_group_id).first()
                                 slot_price = time_slot_price.price
                                 if cg_time_slot_price:
                                     slot_price = cg_time_slot_price.price
                                 elif (ProductCustomerGroup.objects.filter(
-                                    product=self, customer_group_id=self._in_memory_cg).exists()
+                                    product=self, customer_group_id=customer_group_id).exists()
                                     or hasattr(self, '_orderline_has_stored_pcg_price_for_non_null_cg')):
                                     # customer group data exists for product but not for time slot ->
                                     # use default pricing
@@ -766,7 +792,8 @@ class Order(models.Model):
     state = models.CharField(max_length=32, verbose_name=_('state'), choices=STATE_CHOICES, default=WAITING)
     order_number = models.CharField(max_length=64, verbose_name=_('order number'), unique=True, default=generate_id)
     reservation = models.OneToOneField(
-        Reservation, verbose_name=_('reservation'), related_name='order', on_delete=models.PROTECT
+        Reservation, verbose_name=_('reservation'), related_name='order', on_delete=models.PROTECT,
+        db_constraint=False
     )
     payment_url = models.TextField(verbose_name=_('payment url'), blank=True, default='')
     payment_method = models.CharField(
@@ -3,7 +3,6 @@ import hmac
 import logging
 from datetime import datetime, timedelta
 
-import requests
 from django.http import HttpResponse
 from requests.exceptions import RequestException
 
@@ -13,6 +12,7 @@ from ..exceptions import (
 )
 from ..models import Order, OrderLine
 from ..utils import price_as_sub_units
+from . import http_client
 from .base import PaymentProvider
 
 logger = logging.getLogger(__name__)
@@ -73,7 +73,7 @@ class BamboraPayformProvider(PaymentProvider):
         self.payload_add_auth_code(payload)
 
         try:
-            r = requests.post(self.url_payment_auth, json=payload, timeout=60)
+            r = http_client.post(self.url_payment_auth, json=payload)
             r.raise_for_status()
             return self.handle_initiate_payment(r.json())
         except RequestException as e:
@@ -1,3 +1,4 @@
+from typing import Optional
 from urllib.parse import urlencode
 
 from django.http import HttpResponse, HttpResponseNotFound, HttpResponseServerError
@@ -17,11 +18,23 @@ class PaymentProvider:
         self.request = kwargs.get('request')
         self.ui_return_url = kwargs.get('ui_return_url')
 
+    def prepare_payment(self, order: Order) -> Optional[str]:
+        """Do the local work needed before the payment is created.
+
+        Called inside the database transaction that creates the order, before
+        initiate_payment(). Override this in your subclass if the provider
+        needs to save something or handles some orders, e.g. free ones, without
+        a payment. Returning a URL skips initiate_payment() and the user is
+        redirected there instead."""
+        return None
+
     def initiate_payment(self, order: Order) -> str:
         """Create a payment to the provider.
 
         Implement this in your subclass. Should return a URL to which the user
-        is redirected to actually pay the order."""
+        is redirected to actually pay the order. The reservation API calls this
+        after the transaction creating the order has been committed, send the
+        requests to the provider with payments.providers.http_client."""
 
     def handle_success_request(self) -> HttpResponse:
         """Handle incoming payment success request from the payment provider.
@@ -0,0 +1,142 @@
+"""
+Shared HTTP client for the payment provider APIs.
+
+All providers send their requests through one requests session per
+process, so checkouts reuse pooled keep-alive connections instead of
+opening a new TLS connection every time. The requests have short connect
+and read timeouts, idempotent requests are retried a bounded number of
+times, and a circuit breaker per provider host fails requests immediately
+with ServiceUnavailableError while the provider is down instead of letting
+them tie up the workers. The time spent waiting for the providers is
+reported as the payment_provider section of the request metrics, see
+respa.instrumentation.
+"""
+import logging
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from respa.instrumentation import timed
+
+from ..exceptions import ServiceUnavailableError
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = 'respa-payment-provider-circuit'
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def create_session():
+    # POST is not in the allowed methods, so payment creation is only
+    # retried when the connection could not be opened at all
+    retry = Retry(
+        total=settings.RESPA_PAYMENTS_HTTP_RETRIES,
+        backoff_factor=0.2,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=settings.RESPA_PAYMENTS_HTTP_POOL_SIZE,
+        pool_maxsize=settings.RESPA_PAYMENTS_HTTP_POOL_SIZE,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session():
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = create_session()
+    return _session
+
+
+class CircuitBreaker:
+    """
+    Counts consecutive failures of a provider host in the cache. With a
+    shared cache (see CACHE_URL) all the processes see the same state,
+    with the default per-process cache each process counts on its own.
+
+    When the threshold is reached the circuit opens for the reset timeout,
+    after which requests are let through again.
+    """
+    def __init__(self, host):
+        self.host = host
+        self.failures_key = '%s:%s:failures' % (CACHE_PREFIX, host)
+        self.open_key = '%s:%s:open' % (CACHE_PREFIX, host)
+
+    def is_open(self):
+        return bool(cache.get(self.open_key))
+
+    def record_success(self):
+        cache.delete(self.failures_key)
+
+    def record_failure(self):
+        reset_timeout = settings.RESPA_PAYMENTS_CIRCUIT_BREAKER_RESET_TIMEOUT
+        cache.add(self.failures_key, 0, reset_timeout)
+        try:
+            failures = cache.incr(self.failures_key)
+        except ValueError:
+            # the key expired in between
+            return
+        if failures >= settings.RESPA_PAYMENTS_CIRCUIT_BREAKER_THRESHOLD:
+            logger.warning(
+                'Payment provider %s failed %d times in a row, not sending requests to it for %d seconds.' % (
+                    self.host, failures, reset_timeout
+                )
+            )
+            cache.set(self.open_key, True, reset_timeout)
+            cache.delete(self.failures_key)
+
+
+def request(method, url, **kwargs):
+    """
+    Send a request to a payment provider. Takes the same arguments as
+    requests.request().
+
+    :raises ServiceUnavailableError: if the circuit of the provider is open
+    """
+    breaker = CircuitBreaker(urlsplit(url).netloc)
+    if breaker.is_open():
+        logger.warning('Payment provider %s is considered down, not sending %s %s' % (breaker.host, method, url))
+        raise ServiceUnavailableError(_('Payment service is unavailable'))
+
+    kwargs.setdefault('timeout', (
+        settings.RESPA_PAYMENTS_HTTP_CONNECT_TIMEOUT, settings.RESPA_PAYMENTS_HTTP_READ_TIMEOUT
+    ))
+    started = time.perf_counter()
+    try:
+        with timed('payment_provider'):
+            response = get_session().request(method, url, **kwargs)
+    except requests.RequestException:
+        breaker.record_failure()
+        raise
+    finally:
+        logger.info('%s %s took %d ms' % (method, url, (time.perf_counter() - started) * 1000))
+
+    if response.status_code >= 500:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+    return response
+
+
+def get(url, **kwargs):
+    return request('GET', url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request('POST', url, **kwargs)
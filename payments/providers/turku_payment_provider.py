@@ -1,8 +1,8 @@
 from decimal import Decimal
+from typing import Optional
 import logging
 from requests.exceptions import RequestException
 from django.http import HttpResponse
-import requests
 import json
 from hashlib import sha256, md5
 from datetime import datetime
@@ -13,6 +13,7 @@ from django.utils.translation import gettext_lazy as _
 from ..models import Order, OrderLine
 from ..utils import is_free, round_price
 
+from . import http_client
 from .base import PaymentProvider
 logger = logging.getLogger(__name__)
 
@@ -43,8 +44,8 @@ class TurkuPaymentProvider(PaymentProvider):
             RESPA_PAYMENTS_TURKU_API_APP_NAME: str,
         }
 
-    def initiate_payment(self, order) -> str:
-        """Initiate payment by constructing the payload with necessary items"""
+    def prepare_payment(self, order) -> Optional[str]:
+        """Create the Timmi reservation and confirm free orders right away"""
         if order.reservation.resource.timmi_resource:
             logger.debug("Creating reservation with Timmi API")
             timmi_payload = TimmiManager().create_reservation(order.reservation)
@@ -60,8 +61,10 @@ class TurkuPaymentProvider(PaymentProvider):
                 TimmiManager().confirm_reservation(order.reservation, timmi_payload.payload).save()
                 timmi_payload.delete()
             return '/reservation-payment-return?payment_status=success&reservation_id={0}'.format(order.reservation.id)
+        return None
 
-
+    def initiate_payment(self, order) -> str:
+        """Initiate payment by constructing the payload with necessary items"""
         payload = {
             'orderNumber': str(order.order_number),
             'currency': 'EUR',
@@ -92,7 +95,7 @@ class TurkuPaymentProvider(PaymentProvider):
         }
 
         try:
-            r = requests.post(self.url_payment_api, headers=headers, json=payload, timeout=60)
+            r = http_client.post(self.url_payment_api, headers=headers, json=payload)
             r.raise_for_status()
             return self.handle_initiate_payment(r.json())
         except RequestException as e:
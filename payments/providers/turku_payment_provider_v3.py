@@ -1,10 +1,10 @@
 from decimal import Decimal
+from typing import Optional
 from enum import Enum
 import logging
 import uuid
 from requests.exceptions import RequestException
 from django.http import HttpResponse
-import requests
 import json
 from hashlib import sha256
 from datetime import datetime
@@ -15,6 +15,7 @@ from django.utils.translation import gettext_lazy as _
 from ..models import Order, OrderLine
 from ..utils import is_free, round_price
 
+from . import http_client
 from .base import PaymentProvider
 logger = logging.getLogger(__name__)
 
@@ -57,8 +58,8 @@ class TurkuPaymentProviderV3(PaymentProvider):
             RESPA_PAYMENTS_TURKU_SAP_SECTOR: str,
         }
 
-    def initiate_payment(self, order) -> str:
-        """Initiate payment by constructing the payload with necessary items"""
+    def prepare_payment(self, order) -> Optional[str]:
+        """Create the Timmi reservation and confirm free orders right away"""
         if order.reservation.resource.timmi_resource:
             logger.debug("Creating reservation with Timmi API")
             timmi_payload = TimmiManager().create_reservation(order.reservation)
@@ -74,8 +75,10 @@ class TurkuPaymentProviderV3(PaymentProvider):
                 TimmiManager().confirm_reservation(order.reservation, timmi_payload.payload).save()
                 timmi_payload.delete()
             return '/reservation-payment-return?payment_status=success&reservation_id={0}'.format(order.reservation.id)
+        return None
 
-
+    def initiate_payment(self, order) -> str:
+        """Initiate payment by constructing the payload with necessary items"""
         payload = {
             'stamp': str(uuid.uuid4()),
             'reference': str(order.order_number),
@@ -111,7 +114,7 @@ class TurkuPaymentProviderV3(PaymentProvider):
         }
 
         try:
-            r = requests.post(self.url_payment_api, headers=headers, json=payload, timeout=60)
+            r = http_client.post(self.url_payment_api, headers=headers, json=payload)
             r.raise_for_status()
             return self.handle_initiate_payment(r.json())
         except RequestException as e:
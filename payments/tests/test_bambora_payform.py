@@ -83,7 +83,7 @@ def test_initiate_payment_success(provider_base_config, order_with_products):
     request = rf.post(RESERVATION_LIST_URL)
 
     payment_provider = create_bambora_provider(provider_base_config, request, UI_RETURN_URL)
-    with mock.patch('payments.providers.bambora_payform.requests.post', side_effect=mocked_response_create):
+    with mock.patch('payments.providers.bambora_payform.http_client.post', side_effect=mocked_response_create):
         url = payment_provider.initiate_payment(order_with_products)
         assert url.startswith(payment_provider.url_payment_api)
         assert 'token' in url
@@ -99,7 +99,7 @@ def test_initiate_payment_error_unavailable(provider_base_config, order_with_pro
     unavailable_payment_provider = create_bambora_provider(provider_base_config,
                                                            request, UI_RETURN_URL)
 
-    with mock.patch('payments.providers.bambora_payform.requests.post', side_effect=mocked_response_create):
+    with mock.patch('payments.providers.bambora_payform.http_client.post', side_effect=mocked_response_create):
         with pytest.raises(ServiceUnavailableError):
             unavailable_payment_provider.initiate_payment(order_with_products)
 
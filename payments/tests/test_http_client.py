@@ -0,0 +1,52 @@
+from unittest import mock
+
+import pytest
+from django.core.cache import cache
+from django.test import override_settings
+from requests.exceptions import ConnectionError
+
+from payments.exceptions import ServiceUnavailableError
+from payments.providers import http_client
+
+API_URL = 'https://payments.example.com/api/payments'
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+
+def test_session_is_shared():
+    assert http_client.get_session() is http_client.get_session()
+
+
+@override_settings(RESPA_PAYMENTS_HTTP_CONNECT_TIMEOUT=2, RESPA_PAYMENTS_HTTP_READ_TIMEOUT=5)
+def test_request_uses_timeouts():
+    with mock.patch.object(http_client.get_session(), 'request', return_value=mock.Mock(status_code=201)) as request:
+        http_client.post(API_URL, json={})
+    assert request.call_args[1]['timeout'] == (2, 5)
+
+
+@override_settings(RESPA_PAYMENTS_CIRCUIT_BREAKER_THRESHOLD=2)
+def test_circuit_breaker_opens_after_failures():
+    with mock.patch.object(http_client.get_session(), 'request', side_effect=ConnectionError('down')) as request:
+        for i in range(2):
+            with pytest.raises(ConnectionError):
+                http_client.post(API_URL, json={})
+        with pytest.raises(ServiceUnavailableError):
+            http_client.post(API_URL, json={})
+    assert request.call_count == 2
+
+    # other providers are not affected
+    with mock.patch.object(http_client.get_session(), 'request', return_value=mock.Mock(status_code=200)):
+        assert http_client.get('https://other.example.com/').status_code == 200
+
+
+@override_settings(RESPA_PAYMENTS_CIRCUIT_BREAKER_THRESHOLD=2)
+def test_circuit_breaker_success_resets_failures():
+    breaker = http_client.CircuitBreaker('payments.example.com')
+    responses = [mock.Mock(status_code=503), mock.Mock(status_code=200), mock.Mock(status_code=503)]
+    with mock.patch.object(http_client.get_session(), 'request', side_effect=responses):
+        for i in range(3):
+            http_client.post(API_URL, json={})
+    assert not breaker.is_open()
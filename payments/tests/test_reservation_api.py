@@ -20,6 +20,7 @@ from resources.tests.conftest import resource_in_unit, user_api_client  # noqa
 from resources.tests.test_reservation_api import day_and_period  # noqa
 from users.models import LoginMethod
 
+from ..exceptions import ServiceUnavailableError
 from ..factories import ProductFactory
 from ..models import CustomerGroup, Order, OrderCustomerGroupData, OrderLine, Product, ProductCustomerGroup
 from ..providers.base import PaymentProvider
@@ -135,6 +136,7 @@ def product_2(resource_in_unit):
 @pytest.fixture(autouse=True)
 def mock_provider():
     mocked_provider = create_autospec(PaymentProvider)
+    mocked_provider.prepare_payment = MagicMock(return_value=None)
     mocked_provider.initiate_payment = MagicMock(return_value='https://mocked-payment-url.com')
     with patch('payments.api.reservation.get_payment_provider', return_value=mocked_provider):
         yield mocked_provider
@@ -322,6 +324,47 @@ def test_order_post(user_api_client, resource_in_unit, product, product_2, mock_
     assert order_lines[1].quantity == 5
 
 
+def test_order_post_payment_provider_unavailable(user_api_client, resource_in_unit, product, mock_provider):
+    mock_provider.initiate_payment.side_effect = ServiceUnavailableError('Payment service is unreachable')
+    reservation_data = build_reservation_data(resource_in_unit)
+    reservation_data['order'] = build_order_data(product=product)
+
+    response = user_api_client.post(LIST_URL, reservation_data)
+
+    assert response.status_code == 503
+    # the payment is created after the reservation has been committed,
+    # so the order is rejected instead of rolled back
+    new_order = Order.objects.last()
+    assert new_order.state == Order.REJECTED
+    assert new_order.reservation.state == Reservation.CANCELLED
+    assert new_order.log_entries.filter(message__startswith='Creating payment failed').exists()
+
+
+def test_order_update_payment_provider_unavailable(user_api_client, resource_in_unit, product, mock_provider):
+    resource_in_unit.need_manual_confirmation = True
+    resource_in_unit.save()
+    reservation_data = build_reservation_data(resource_in_unit)
+    reservation_data['order'] = build_order_data(product=product)
+    response = user_api_client.post(LIST_URL, reservation_data)
+    assert response.status_code == 201, response.data
+    reservation = Reservation.objects.last()
+    order = reservation.get_order()
+    original_end = reservation.end
+    log_entry_count = order.log_entries.count()
+
+    mock_provider.initiate_payment.side_effect = ServiceUnavailableError('Payment service is unreachable')
+    reservation_data.update({'end': '2115-04-04T12:30:00+02:00'})
+    response = user_api_client.put(get_detail_url(reservation), reservation_data)
+
+    assert response.status_code == 503
+    # the payment of a modification is created within the transaction, so the modification is rolled back
+    reservation.refresh_from_db()
+    order.refresh_from_db()
+    assert reservation.end == original_end
+    assert order.state == Order.WAITING
+    assert order.log_entries.count() == log_entry_count
+
+
 @pytest.mark.parametrize('payment_method, expected_status', (
     (None, 201),
     (Order.CASH, 201),
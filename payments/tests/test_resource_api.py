@@ -2,6 +2,8 @@ from datetime import timedelta
 from decimal import Decimal
 
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework.reverse import reverse
 
 from ..factories import (
@@ -121,3 +123,27 @@ def test_get_resource_products_cg_allowed_login_methods_when_not_included(
     product_data = products_data[0]
     cg_data = product_data['product_customer_groups'][0]['customer_group']
     assert cg_data['only_for_login_methods'] == []
+
+
+
+def test_resource_list_products_are_prefetched(
+        user_api_client, resource_in_unit, product_with_fixed_price_type_and_time_slots, settings):
+    settings.RESPA_RESOURCE_FRAGMENT_CACHE_TIMEOUT = 0
+
+    def get_products():
+        with CaptureQueriesContext(connection) as context:
+            response = user_api_client.get(LIST_URL)
+        assert response.status_code == 200
+        return response.data['results'][0]['products'], len(context.captured_queries)
+
+    products_data, query_count = get_products()
+    assert len(products_data[0]['time_slot_prices']) == 6
+    assert len(products_data[0]['product_customer_groups']) == 1
+
+    # more products and prices must not add queries
+    for i in range(3):
+        product = ProductFactory.create(resources=[resource_in_unit])
+        ProductCustomerGroupFactory.create(customer_group=CustomerGroupFactory.create(), product=product)
+    products_data, new_query_count = get_products()
+    assert len(products_data) == 4
+    assert new_query_count == query_count
@@ -83,7 +83,7 @@ def test_initiate_payment_success(provider_base_config, order_with_products):
     request = rf.post(RESERVATION_LIST_URL)
 
     payment_provider = create_turku_payment_provider(provider_base_config, request, UI_RETURN_URL)
-    with mock.patch('payments.providers.turku_payment_provider.requests.post', side_effect=mocked_response_create):
+    with mock.patch('payments.providers.turku_payment_provider.http_client.post', side_effect=mocked_response_create):
         url = payment_provider.initiate_payment(order_with_products)
         assert url == PAYMENT_URL
 
@@ -98,7 +98,7 @@ def test_initiate_payment_error_unavailable(provider_base_config, order_with_pro
     unavailable_payment_provider = create_turku_payment_provider(provider_base_config,
                                                            request, UI_RETURN_URL)
 
-    with mock.patch('payments.providers.turku_payment_provider.requests.post', side_effect=mocked_response_create):
+    with mock.patch('payments.providers.turku_payment_provider.http_client.post', side_effect=mocked_response_create):
         with pytest.raises(ServiceUnavailableError):
             unavailable_payment_provider.initiate_payment(order_with_products)
 
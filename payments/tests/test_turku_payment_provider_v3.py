@@ -86,7 +86,7 @@ def test_initiate_payment_success(provider_base_config, order_with_products):
     request = rf.post(RESERVATION_LIST_URL)
 
     payment_provider = create_turku_payment_provider(provider_base_config, request, UI_RETURN_URL)
-    with mock.patch('payments.providers.turku_payment_provider_v3.requests.post', side_effect=mocked_response_create):
+    with mock.patch('payments.providers.turku_payment_provider_v3.http_client.post', side_effect=mocked_response_create):
         href = payment_provider.initiate_payment(order_with_products)
         assert href == PAYMENT_URL
 
@@ -98,8 +98,8 @@ def test_initiate_payment_success_free(provider_base_config, order_with_no_price
     request = rf.post(RESERVATION_LIST_URL)
 
     payment_provider = create_turku_payment_provider(provider_base_config, request, UI_RETURN_URL)
-    with mock.patch('payments.providers.turku_payment_provider_v3.requests.post', side_effect=mocked_response_create):
-        href = payment_provider.initiate_payment(order_with_no_price_product_customer_group)
+    with mock.patch('payments.providers.turku_payment_provider_v3.http_client.post', side_effect=mocked_response_create):
+        href = payment_provider.prepare_payment(order_with_no_price_product_customer_group)
         reservation_id = order_with_no_price_product_customer_group.reservation.id
         expected_href = '/reservation-payment-return?payment_status=success&reservation_id={0}'.format(reservation_id)
         assert href == expected_href
@@ -116,7 +116,7 @@ def test_initiate_payment_calls_handle_errors(handle_request_errors, provider_ba
     unavailable_payment_provider = create_turku_payment_provider(provider_base_config,
                                                            request, UI_RETURN_URL)
 
-    with mock.patch('payments.providers.turku_payment_provider_v3.requests.post', side_effect=mocked_response_create):
+    with mock.patch('payments.providers.turku_payment_provider_v3.http_client.post', side_effect=mocked_response_create):
         unavailable_payment_provider.initiate_payment(order_with_products)
         handle_request_errors.assert_called_once()
 
@@ -131,7 +131,7 @@ def test_initiate_payment_error_unavailable(provider_base_config, order_with_pro
     unavailable_payment_provider = create_turku_payment_provider(provider_base_config,
                                                            request, UI_RETURN_URL)
 
-    with mock.patch('payments.providers.turku_payment_provider_v3.requests.post', side_effect=mocked_response_create):
+    with mock.patch('payments.providers.turku_payment_provider_v3.http_client.post', side_effect=mocked_response_create):
         with pytest.raises(ServiceUnavailableError):
             unavailable_payment_provider.initiate_payment(order_with_products)
 
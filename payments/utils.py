@@ -150,21 +150,27 @@ def find_time_slot_with_smallest_duration(time_slots):
     return smallest_duration_slot
 
 
-def get_fixed_time_slot_price(time_slot_prices, begin, end, product, default_price):
-    '''Returns correct time slot's price or default price based on given time slots and product'''
+def get_fixed_time_slot_price(time_slot_prices, begin, end, product, default_price, customer_group_id=None):
+    '''
+    Returns correct time slot's price or default price based on given time slots and product.
+    Uses the customer group of the product unless customer_group_id is given.
+    '''
     from payments.models import CustomerGroupTimeSlotPrice, ProductCustomerGroup
 
+    if customer_group_id is None:
+        customer_group_id = getattr(product, '_in_memory_cg', None)
+
     # fetch only time slots between given begin and end
     slots_between_begin_and_end = time_slot_prices.filter(begin__lte=begin, end__gte=end)
     time_slot_prices = slots_between_begin_and_end
 
     # try to find valid time slots by cg first
     cg_data_exists_for_product = (ProductCustomerGroup.objects.filter(
-        product=product, customer_group_id=product._in_memory_cg).exists()
+        product=product, customer_group_id=customer_group_id).exists()
         or hasattr(product, '_orderline_has_stored_pcg_price_for_non_null_cg'))
-    if product._in_memory_cg:
+    if customer_group_id:
         time_slots_with_cg = slots_between_begin_and_end.filter(
-                customer_group_time_slot_prices__customer_group=product._in_memory_cg)
+                customer_group_time_slot_prices__customer_group=customer_group_id)
         if len(time_slots_with_cg) > 0:
             # found time slots with cg -> use them
             time_slot_prices = time_slots_with_cg
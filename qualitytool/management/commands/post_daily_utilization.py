@@ -1,6 +1,5 @@
 from django.core.management.base import BaseCommand
 from django.utils import timezone
-from qualitytool.models import ResourceQualityTool
 from qualitytool.manager import qt_manager
 import logging
 
@@ -13,21 +12,21 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument('--date', action='store')
+        parser.add_argument('--until', action='store', help='Backfill every day from --date until this date')
 
     def handle(self, *args, **options):
         date = options.get('date', None)
+        until = options.get('until', None)
 
 
         if date:
             date = timezone.make_aware(datetime.strptime(date, '%Y-%m-%d'))
         else:
             date = timezone.now()
-    
-        payload = [
-            qt_manager.get_daily_utilization(qualitytool, date) 
-            for qualitytool in ResourceQualityTool.objects.all()
-        ]
-
-        if not payload:
-            return
-        return qt_manager.post_utilization(payload)
\ No newline at end of file
+
+        if until:
+            until = timezone.make_aware(datetime.strptime(until, '%Y-%m-%d'))
+
+        qt_manager.post_utilizations(
+            qt_manager.get_daily_utilizations(date, until)
+        )
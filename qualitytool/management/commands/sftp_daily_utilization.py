@@ -18,10 +18,12 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument('path')
         parser.add_argument('--date', action='store')
+        parser.add_argument('--until', action='store', help='Backfill every day from --date until this date')
 
     def handle(self, *args, **options):
         path = options.get('path')
         date = options.get('date', None)
+        until = options.get('until', None)
 
         if not settings.QUALITYTOOL_SFTP_HOST:
             raise ImproperlyConfigured('Missing env setting: QUALITYTOOL_SFTP_HOST')
@@ -31,13 +33,11 @@ class Command(BaseCommand):
         else:
             date = timezone.now()
 
-    
-        daily_utilizations = [
-            qt_manager.get_daily_utilization(qualitytool, date) 
-            for qualitytool in ResourceQualityTool.objects.all()
-        ]
+        if until:
+            until = timezone.make_aware(datetime.strptime(until, '%Y-%m-%d'))
 
-        if not daily_utilizations:
+    
+        if not ResourceQualityTool.objects.exists():
             return
         
 
@@ -53,8 +53,10 @@ class Command(BaseCommand):
 
 
         with sftp.open(path, 'w') as csv_file:
-            for daily_utilization in daily_utilizations:
+            entries = 0
+            for daily_utilization in qt_manager.get_daily_utilizations(date, until):
                 csv_file.write('%(row)s\n' % ({
                     'row': ','.join(str(val) for val in daily_utilization.values())
                 }))
-        logging.info(f'Generated new daily utilization csv file with {len(daily_utilizations)} entries.')
\ No newline at end of file
+                entries += 1
+        logging.info(f'Generated new daily utilization csv file with {entries} entries.')
\ No newline at end of file
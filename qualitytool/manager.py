@@ -1,5 +1,6 @@
 from django.conf import settings
 from django.db import models
+from django.db.models.functions import TruncDate
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from functools import wraps
@@ -108,6 +109,19 @@ class QualityToolManager():
         response = self.session.post(self.config['UTILIZATION_UPSERT'], json=data)
         return response.json()
 
+    def post_utilizations(self, utilizations, batch_size=1000):
+        """
+        Posts an iterable of daily utilizations in batches of batch_size entries.
+        """
+        batch = []
+        for utilization in utilizations:
+            batch.append(utilization)
+            if len(batch) >= batch_size:
+                self.post_utilization(batch)
+                batch = []
+        if batch:
+            self.post_utilization(batch)
+
     def get_daily_utilization(self, qualitytool, date) -> dict:
         """
         Returns volume count of reservations that were created the given date
@@ -117,25 +131,65 @@ class QualityToolManager():
             'volume': int
         }
         """
-        begin = date.replace(hour=0, minute=0, second=0, microsecond=0)
-        end = date.replace(hour=23, minute=59, second=59, microsecond=0)
-    
-        query = models.Q(
-            reservations__created_at__gte=begin,
-            reservations__created_at__lte=end,
-            reservations__type=Reservation.TYPE_NORMAL # Include only normal reservations
+        return next(self.get_daily_utilizations(date, qualitytools=[qualitytool]))
+
+    def get_daily_utilizations(self, start, end=None, qualitytools=None):
+        """
+        Yields the volume count of reservations created each day between
+        start and end (inclusive) for every quality tool target.
+
+        Volumes are computed with a single query grouped by target and date,
+        targets without reservations on a given day are yielded with volume 0.
+        yield: {
+            'targetId': uuid,
+            'date': date,
+            'volume': int
+        }
+        """
+        from qualitytool.models import ResourceQualityTool
+
+        if qualitytools is None:
+            qualitytools = ResourceQualityTool.objects.all()
+        target_ids = [str(qualitytool.target_id) for qualitytool in qualitytools]
+        if not target_ids:
+            return
+
+        tz = timezone.get_current_timezone()
+        first_day = timezone.localtime(start, tz).date()
+        last_day = timezone.localtime(end, tz).date() if end else first_day
+        begin = timezone.make_aware(datetime.combine(first_day, datetime.min.time()), tz)
+        end = timezone.make_aware(datetime.combine(last_day + timedelta(days=1), datetime.min.time()), tz)
+
+        # Reservations are included if the target has no email restrictions or
+        # if the reserver matches one of the target's emails.
+        email_query = (
+            models.Q(resource__qualitytool__emails__isnull=True) |
+            models.Q(resource__qualitytool__emails__len=0) |
+            models.Q(resource__qualitytool__emails__contains=[models.F('user__email')]) |
+            models.Q(resource__qualitytool__emails__contains=[models.F('reserver_email_address')])
         )
-        
-        if qualitytool.emails:
-            query &= models.Q(
-                models.Q(reservations__user__email__in=qualitytool.emails) |
-                models.Q(reservations__reserver_email_address__in=qualitytool.emails)
-            )
-        volume = qualitytool.resources.filter(query).values_list('reservations', flat=True)
-        return {
-            'targetId': str(qualitytool.target_id), 
-            'date': str(date.date()),
-            'volume': volume.count()
+        volumes = Reservation.objects.filter(
+            email_query,
+            resource__qualitytool__in=target_ids,
+            created_at__gte=begin,
+            created_at__lt=end,
+            type=Reservation.TYPE_NORMAL # Include only normal reservations
+        ).annotate(
+            date=TruncDate('created_at', tzinfo=tz)
+        ).values_list('resource__qualitytool', 'date').annotate(volume=models.Count('pk', distinct=True))
+        volumes = {
+            (str(target_id), date): volume
+            for target_id, date, volume in volumes
         }
 
+        day = first_day
+        while day <= last_day:
+            for target_id in target_ids:
+                yield {
+                    'targetId': target_id,
+                    'date': str(day),
+                    'volume': volumes.get((target_id, day), 0)
+                }
+            day += timedelta(days=1)
+
 qt_manager = QualityToolManager()
\ No newline at end of file
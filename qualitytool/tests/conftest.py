@@ -0,0 +1 @@
+from resources.tests.conftest import *  # noqa
@@ -0,0 +1,79 @@
+import datetime
+import uuid
+
+import pytest
+from django.utils import timezone
+
+from qualitytool.manager import qt_manager
+from qualitytool.models import ResourceQualityTool
+from resources.models import Reservation
+
+
+def create_reservation(resource, created_at, hour, user=None, reserver_email_address='', type=Reservation.TYPE_NORMAL):
+    begin = timezone.make_aware(datetime.datetime(2115, 4, 4, hour))
+    reservation = Reservation.objects.create(
+        resource=resource, begin=begin, end=begin + datetime.timedelta(minutes=30), user=user,
+        reserver_email_address=reserver_email_address, type=type, state=Reservation.CONFIRMED,
+    )
+    Reservation.objects.filter(pk=reservation.pk).update(created_at=created_at)
+    return reservation
+
+
+def get_expected_volume(qualitytool, day):
+    """Count the volume of a single target and day the way the per-day queries did."""
+    tz = timezone.get_current_timezone()
+    volume = 0
+    reservations = Reservation.objects.filter(resource__in=qualitytool.resources.all(), type=Reservation.TYPE_NORMAL)
+    for reservation in reservations.select_related('user'):
+        if timezone.localtime(reservation.created_at, tz).date() != day:
+            continue
+        emails = qualitytool.emails
+        if emails and (reservation.user.email if reservation.user else None) not in emails \
+                and reservation.reserver_email_address not in emails:
+            continue
+        volume += 1
+    return volume
+
+
+@pytest.mark.django_db
+def test_get_daily_utilizations(resource_in_unit, resource_in_unit2, user, user2):
+    qualitytool = ResourceQualityTool.objects.create(name='open', target_id=uuid.uuid4())
+    qualitytool.resources.set([resource_in_unit])
+    restricted_qualitytool = ResourceQualityTool.objects.create(
+        name='restricted', target_id=uuid.uuid4(), emails=[user.email, 'reserver@example.com']
+    )
+    restricted_qualitytool.resources.set([resource_in_unit2])
+
+    tz = timezone.get_current_timezone()
+    day1 = timezone.make_aware(datetime.datetime(2024, 3, 1, 0, 30), tz)
+    day3 = timezone.make_aware(datetime.datetime(2024, 3, 3, 23, 30), tz)
+    create_reservation(resource_in_unit, day1, 8, user=user)
+    create_reservation(resource_in_unit, day1 + datetime.timedelta(hours=5), 9, user=user2)
+    create_reservation(resource_in_unit, day3, 10, user=user)
+    create_reservation(resource_in_unit, day3, 11, user=user, type=Reservation.TYPE_BLOCKED)
+    create_reservation(resource_in_unit2, day1, 8, user=user)
+    create_reservation(resource_in_unit2, day1, 9, user=user2)
+    create_reservation(resource_in_unit2, day3, 10, user=user2, reserver_email_address='reserver@example.com')
+    # outside the range
+    create_reservation(resource_in_unit, day3 + datetime.timedelta(hours=1), 12, user=user)
+
+    utilizations = list(qt_manager.get_daily_utilizations(day1, day3))
+
+    days = [datetime.date(2024, 3, 1), datetime.date(2024, 3, 2), datetime.date(2024, 3, 3)]
+    assert len(utilizations) == len(days) * 2
+    volumes = {(u['targetId'], u['date']): u['volume'] for u in utilizations}
+    for day in days:
+        for target in (qualitytool, restricted_qualitytool):
+            assert volumes[(str(target.target_id), str(day))] == get_expected_volume(target, day)
+
+    assert volumes[(str(qualitytool.target_id), '2024-03-01')] == 2
+    assert volumes[(str(qualitytool.target_id), '2024-03-02')] == 0
+    assert volumes[(str(qualitytool.target_id), '2024-03-03')] == 1
+    assert volumes[(str(restricted_qualitytool.target_id), '2024-03-01')] == 1
+    assert volumes[(str(restricted_qualitytool.target_id), '2024-03-02')] == 0
+    assert volumes[(str(restricted_qualitytool.target_id), '2024-03-03')] == 1
+
+    # a single day of a single target
+    assert qt_manager.get_daily_utilization(qualitytool, day3) == {
+        'targetId': str(qualitytool.target_id), 'date': '2024-03-03', 'volume': 1
+    }
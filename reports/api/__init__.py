@@ -1,2 +1,3 @@
 from .daily_reservations import DailyReservationsReport  # noqa
+from .daily_utilization import DailyUtilizationReport  # noqa
 from .reservation_details import ReservationDetailsReport  # noqa
@@ -1,26 +1,71 @@
+import collections
 import datetime
+import hashlib
 import io
 import pytz
 from docx.shared import Pt, Cm
 
+from django.core.cache import cache
+from django.db.models import Count, Max
 from django.utils.translation import get_language, gettext_lazy as _
 from django.utils import formats
 from django.utils.timezone import localtime
 from django.conf import settings
-from rest_framework import exceptions
+from rest_framework import exceptions, serializers
+from rest_framework.response import Response
 
+from resources.auth import is_general_admin
 from resources.models import Reservation, Resource, Unit
-from resources.api.resource import ResourceSerializer
 from .base import BaseReport, DocxRenderer
-from .utils import iso_to_dt
 
 
 FALLBACK_LANGUAGE = settings.LANGUAGES[0][0]
 
+REPORT_RESERVATION_FIELDS = ('event_subject', 'reserver_name', 'host_name', 'number_of_participants')
+
+CACHE_TIMEOUT = getattr(settings, 'RESPA_REPORTS_CACHE_TIMEOUT', 60 * 60)
+
+
+class DailyReservationsResourceSerializer(serializers.Serializer):
+    """
+    Serializes only the resource name and the confirmed reservations of the day.
+
+    Reservations are read from the 'reservations_cache' context, which maps
+    resource ids to lists of reservation dicts, so no queries are made per resource.
+    The 'extra_fields_visible' context maps resource ids to the requesting user's
+    permission to see the reservation details.
+    """
+    id = serializers.CharField()
+    name = serializers.SerializerMethodField()
+    reservations = serializers.SerializerMethodField()
+
+    def get_name(self, obj):
+        return {lang: getattr(obj, 'name_%s' % lang, None) for lang, __ in settings.LANGUAGES}
+
+    def get_reservations(self, obj):
+        user = self.context['request'].user
+        rv_list = self.context['reservations_cache'].get(obj.id, [])
+        extra_fields_visible = self.context['extra_fields_visible'][obj.id]
+        supported_fields = set(obj.get_supported_reservation_extra_field_names())
+
+        ret = []
+        for rv in rv_list:
+            visible = extra_fields_visible or (user.is_authenticated and rv['user_id'] == user.id)
+            data = {'begin': rv['begin'], 'end': rv['end']}
+            for field_name in REPORT_RESERVATION_FIELDS:
+                if visible and field_name in supported_fields:
+                    data[field_name] = rv[field_name]
+            ret.append(data)
+        return ret
+
 
 class DailyReservationsDocxRenderer(DocxRenderer):
     def render(self, data, media_type=None, renderer_context=None):
         renderer_context = renderer_context or {}
+        if isinstance(data, bytes):
+            # Already rendered document from the cache
+            return data
+
         day = renderer_context.get('day')
 
         include_resources_without_reservations = renderer_context.get('include_resources_without_reservations')
@@ -39,7 +84,7 @@ class DailyReservationsDocxRenderer(DocxRenderer):
             return val
 
         for resource in data:
-            reservations = [rv for rv in resource['reservations'] if rv['state'] == Reservation.CONFIRMED]
+            reservations = resource['reservations']
             reservation_count = len(reservations)
             if reservation_count == 0 and not include_resources_without_reservations:
                 continue
@@ -61,9 +106,8 @@ class DailyReservationsDocxRenderer(DocxRenderer):
 
             for reservation in reservations:
                 # the time
-                begin = iso_to_dt(reservation['begin'])
-                end = iso_to_dt(reservation['end'])
-                range_str = formats.time_format(localtime(begin)) + '–' + formats.time_format(localtime(end))
+                range_str = (formats.time_format(localtime(reservation['begin'])) + '–' +
+                             formats.time_format(localtime(reservation['end'])))
                 time_paragraph = document.add_heading(range_str, 3)
                 time_paragraph.paragraph_format.space_before = Cm(1)
 
@@ -91,24 +135,102 @@ class DailyReservationsDocxRenderer(DocxRenderer):
 
         output = io.BytesIO()
         document.save(output)
+        output = output.getvalue()
+
+        cache_key = renderer_context.get('cache_key')
+        if cache_key:
+            cache.set(cache_key, output, CACHE_TIMEOUT)
 
-        return output.getvalue()
+        return output
 
 
 class DailyReservationsReport(BaseReport):
-    serializer_class = ResourceSerializer
+    serializer_class = DailyReservationsResourceSerializer
     renderer_classes = (DailyReservationsDocxRenderer,)
 
     def get_queryset(self):
-        return Resource.objects.all().order_by('unit__name', 'name')
-
-    def get_serializer_context(self):
-        context = super().get_serializer_context()
-        if not getattr(context['view'], 'swagger_fake_view', False):
-            context['start'] = self.start
-            context['end'] = self.end
-        self.action = self.request.method
-        return context
+        return Resource.objects.all().order_by('unit__name', 'name').select_related(
+            'unit', 'reservation_metadata_set'
+        ).prefetch_related(
+            'reservation_metadata_set__supported_fields'
+        )
+
+    def get_reservations_queryset(self, resources):
+        return Reservation.objects.filter(
+            resource__in=resources,
+            resource__timmi_resource=False,
+            state=Reservation.CONFIRMED,
+            begin__lte=self.end,
+            end__gte=self.start,
+        )
+
+    def get_extra_fields_visible(self, resources):
+        """
+        Map the resource ids to the requesting user's permission to see the
+        reservation details, checked with one query for all the resources.
+        """
+        user = self.request.user
+        if not user.is_authenticated:
+            return {resource.id: False for resource in resources}
+        if is_general_admin(user):
+            return {resource.id: True for resource in resources}
+        allowed = set(resources.with_perm('can_view_reservation_extra_fields', user).values_list('id', flat=True))
+        return {resource.id: resource.id in allowed for resource in resources}
+
+    def get_cache_key(self, resources, reservations, extra_fields_visible):
+        """
+        Build a cache key for the rendered document.
+
+        The key changes whenever a reservation of the day is created, modified
+        or removed, or when the requesting user's visibility to the reservation
+        details differs.
+        """
+        user = self.request.user
+        summary = reservations.aggregate(count=Count('id'), modified_at=Max('modified_at'))
+        own_reservations = []
+        if user.is_authenticated:
+            own_reservations = sorted(reservations.filter(user=user).values_list('id', flat=True))
+        parts = [
+            self.day.isoformat(),
+            get_language(),
+            str(self.include_resources_without_reservations()),
+            str(summary['count']),
+            summary['modified_at'].isoformat() if summary['modified_at'] else '',
+            ','.join(str(pk) for pk in own_reservations),
+        ]
+        for resource in resources:
+            parts.append('%s:%s:%s' % (
+                resource.id, resource.modified_at.isoformat(), extra_fields_visible[resource.id]
+            ))
+        return 'daily-reservations-report:%s' % hashlib.sha1('|'.join(parts).encode()).hexdigest()
+
+    def get(self, request, format=None):
+        resources = self.filter_queryset(self.get_queryset())
+        reservations = self.get_reservations_queryset(resources)
+        extra_fields_visible = self.get_extra_fields_visible(resources)
+
+        self.cache_key = self.get_cache_key(resources, reservations, extra_fields_visible)
+        document = cache.get(self.cache_key)
+        if document is not None:
+            response = Response(document)
+        else:
+            reservations_cache = collections.defaultdict(list)
+            rv_values = reservations.order_by('begin').values(
+                'resource_id', 'user_id', 'begin', 'end', *REPORT_RESERVATION_FIELDS
+            )
+            for rv in rv_values:
+                reservations_cache[rv['resource_id']].append(rv)
+            serializer = self.get_serializer(
+                resources, many=True, context={
+                    **self.get_serializer_context(),
+                    'reservations_cache': reservations_cache,
+                    'extra_fields_visible': extra_fields_visible,
+                }
+            )
+            response = Response(serializer.data)
+
+        response['Content-Disposition'] = 'attachment; filename=%s' % self.get_filename(request, None)
+        return response
 
     def filter_queryset(self, queryset):
         params = self.request.query_params
@@ -155,13 +277,17 @@ class DailyReservationsReport(BaseReport):
 
         return queryset
 
+    def include_resources_without_reservations(self):
+        params = self.request.query_params
+        return params.get('include_resources_without_reservations', '').lower() in ['true', '1', 't', 'y', 'yes']
+
     def get_renderer_context(self):
         context = super().get_renderer_context()
-        params = self.request.query_params
-        val = params.get('include_resources_without_reservations', '').lower() in ['true', '1', 't', 'y', 'yes']
-        context['include_resources_without_reservations'] = val
+        context['include_resources_without_reservations'] = self.include_resources_without_reservations()
         if hasattr(self, 'day'):
             context['day'] = self.day
+        if hasattr(self, 'cache_key'):
+            context['cache_key'] = self.cache_key
         return context
 
     def get_filename(self, request, validated_data):
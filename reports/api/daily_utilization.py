@@ -0,0 +1,91 @@
+import datetime
+
+from django.db.models import F, Sum
+from django.db.models.functions import TruncMonth, TruncYear
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions, permissions, renderers, serializers
+
+from resources.models import ResourceDailyUtilization, Unit
+from .base import BaseReport
+
+
+PERIODS = {
+    'day': F('date'),
+    'month': TruncMonth('date'),
+    'year': TruncYear('date'),
+}
+
+GROUPS = {
+    'resource': 'resource',
+    'unit': 'resource__unit',
+}
+
+
+class DailyUtilizationSerializer(serializers.Serializer):
+    """
+    Serializes the utilization sums of one resource or unit for one period.
+    """
+    id = serializers.CharField(source='group')
+    date = serializers.DateField(source='period')
+    reservation_count = serializers.IntegerField()
+    booked_minutes = serializers.IntegerField()
+    open_minutes = serializers.IntegerField()
+    cancelled_count = serializers.IntegerField()
+    utilization = serializers.SerializerMethodField()
+
+    def get_utilization(self, obj):
+        if not obj['open_minutes']:
+            return None
+        return round(obj['booked_minutes'] / obj['open_minutes'], 4)
+
+
+class DailyUtilizationReport(BaseReport):
+    """
+    Reservation counts, booked and open minutes of resources or units per day, month or year.
+
+    Read from the ResourceDailyUtilization table, so the reservations themselves are not queried.
+    Only the units the user administers or manages are included, unless the user is a general admin.
+    """
+    serializer_class = DailyUtilizationSerializer
+    renderer_classes = (renderers.JSONRenderer,)
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get_queryset(self):
+        # managed_by() returns all the units for general admins
+        units = Unit.objects.managed_by(self.request.user)
+        return ResourceDailyUtilization.objects.filter(resource__unit__in=units)
+
+    def filter_queryset(self, queryset):
+        params = self.request.query_params
+
+        unit = params.get('unit', '').strip()
+        if unit:
+            queryset = queryset.filter(resource__unit__in=[x.strip() for x in unit.split(',')])
+
+        resources = params.get('resource', '').strip()
+        if resources:
+            queryset = queryset.filter(resource__in=[x.strip() for x in resources.split(',')])
+
+        try:
+            start = datetime.datetime.strptime(params.get('start', '').strip(), '%Y-%m-%d').date()
+            end = datetime.datetime.strptime(params.get('end', '').strip(), '%Y-%m-%d').date()
+        except ValueError:
+            raise exceptions.ParseError(_('start and end must be of ISO format (YYYY-MM-DD)'))
+        if end < start:
+            raise exceptions.ParseError(_('start must not be after end'))
+
+        period = params.get('period', 'day')
+        if period not in PERIODS:
+            raise exceptions.ParseError(_('period must be one of: %s') % ', '.join(PERIODS))
+        group_by = params.get('group_by', 'resource')
+        if group_by not in GROUPS:
+            raise exceptions.ParseError(_('group_by must be one of: %s') % ', '.join(GROUPS))
+
+        return queryset.filter(date__gte=start, date__lte=end).annotate(
+            group=F(GROUPS[group_by]), period=PERIODS[period]
+        ).values('group', 'period').annotate(
+            reservation_count=Sum('reservation_count'),
+            booked_minutes=Sum('booked_minutes'),
+            open_minutes=Sum('open_minutes'),
+            cancelled_count=Sum('cancelled_count'),
+        ).order_by('group', 'period')
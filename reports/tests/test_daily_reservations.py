@@ -1,6 +1,9 @@
 import pytest
+from unittest.mock import patch
 from freezegun import freeze_time
 from django.utils import dateparse
+from rest_framework.test import APIClient
+from reports.api.daily_reservations import DailyReservationsDocxRenderer, DailyReservationsReport
 from resources.models import Reservation
 from resources.tests.conftest import *
 
@@ -87,3 +90,50 @@ def test_daily_reservations_filter_errors(api_client, test_unit, reservation, re
     response = api_client.get(list_url + '?unit=bogus-unit')
     assert response.status_code == 404
     assert 'unit' in response.data['detail']
+
+
+@pytest.mark.django_db
+def test_daily_reservations_document_is_cached(api_client, test_unit, reservation):
+    url = list_url + '?unit=%s&day=2015-04-04' % test_unit.id
+    with patch.object(DailyReservationsDocxRenderer, 'create_document',
+                      wraps=DailyReservationsDocxRenderer.create_document) as create_document:
+        response = api_client.get(url)
+        assert response.status_code == 200
+        check_valid_response(response)
+        assert create_document.call_count == 1
+
+        # nothing has changed, the document is served from the cache
+        cached_response = api_client.get(url)
+        assert cached_response.status_code == 200
+        assert cached_response.content == response.content
+        assert create_document.call_count == 1
+
+        # modifying a reservation of the day invalidates the cached document
+        reservation.event_subject = 'Changed subject'
+        reservation.save()
+        response = api_client.get(url)
+        assert response.status_code == 200
+        check_valid_response(response)
+        assert create_document.call_count == 2
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('client_name, expected', (
+    ('api_client', False),
+    ('user_api_client', False),
+    ('unit_manager_api_client', True),
+    ('general_admin', True),
+))
+def test_daily_reservations_extra_fields_visibility(request, test_unit, reservation, client_name, expected):
+    if client_name == 'general_admin':
+        api_client = APIClient()
+        api_client.force_authenticate(user=request.getfixturevalue('general_admin'))
+    else:
+        api_client = request.getfixturevalue(client_name)
+    get_cache_key = DailyReservationsReport.get_cache_key
+    with patch.object(DailyReservationsReport, 'get_cache_key', autospec=True,
+                      side_effect=get_cache_key) as mock_get_cache_key:
+        response = api_client.get(list_url + '?unit=%s&day=2015-04-04' % test_unit.id)
+    assert response.status_code == 200
+    extra_fields_visible = mock_get_cache_key.call_args[0][3]
+    assert extra_fields_visible == {reservation.resource_id: expected}
@@ -0,0 +1,80 @@
+import datetime
+
+import pytest
+from resources.models import Reservation, ResourceDailyUtilization
+from resources.tests.conftest import *
+
+
+list_url = '/reports/daily_utilization/'
+
+
+@pytest.fixture
+def reservations(resource_in_unit, user):
+    return [
+        Reservation.objects.create(
+            resource=resource_in_unit,
+            begin='2015-04-04T09:00:00+03:00',
+            end='2015-04-04T10:30:00+03:00',
+            user=user,
+            state=Reservation.CONFIRMED
+        ),
+        Reservation.objects.create(
+            resource=resource_in_unit,
+            begin='2015-04-04T12:00:00+03:00',
+            end='2015-04-04T13:00:00+03:00',
+            user=user,
+            state=Reservation.CANCELLED
+        ),
+    ]
+
+
+@pytest.mark.django_db
+def test_daily_utilization_update(resource_in_unit, reservations):
+    ResourceDailyUtilization.update_for_dates(resource_in_unit, [datetime.date(2015, 4, 4)])
+
+    utilization = ResourceDailyUtilization.objects.get(resource=resource_in_unit, date=datetime.date(2015, 4, 4))
+    assert utilization.reservation_count == 1
+    assert utilization.booked_minutes == 90
+    assert utilization.cancelled_count == 1
+
+    # recalculating updates the existing row
+    reservations[1].state = Reservation.CONFIRMED
+    reservations[1].save()
+    ResourceDailyUtilization.update_for_dates(resource_in_unit, [datetime.date(2015, 4, 4)])
+    utilization.refresh_from_db()
+    assert utilization.reservation_count == 2
+    assert utilization.booked_minutes == 150
+    assert utilization.cancelled_count == 0
+
+
+@pytest.mark.django_db
+def test_daily_utilization_report(api_client, staff_api_client, unit_manager_api_client, user_api_client,
+                                  general_admin, resource_in_unit, reservations):
+    ResourceDailyUtilization.update_for_dates(resource_in_unit, [datetime.date(2015, 4, 3), datetime.date(2015, 4, 4)])
+    url = list_url + '?resource=%s&start=2015-04-01&end=2015-04-30' % resource_in_unit.id
+
+    response = user_api_client.get(url)
+    assert response.status_code == 403
+
+    # staff users see only the units they manage
+    response = staff_api_client.get(url)
+    assert response.status_code == 200
+    assert response.data == []
+
+    response = unit_manager_api_client.get(url)
+    assert response.status_code == 200
+    assert [row['date'] for row in response.data] == ['2015-04-03', '2015-04-04']
+
+    api_client.force_authenticate(user=general_admin)
+    response = api_client.get(url)
+    assert response.status_code == 200
+    assert len(response.data) == 2
+
+    response = unit_manager_api_client.get(url + '&period=month&group_by=unit')
+    assert response.status_code == 200
+    assert len(response.data) == 1
+    assert response.data[0]['id'] == resource_in_unit.unit.id
+    assert response.data[0]['booked_minutes'] == 90
+
+    response = unit_manager_api_client.get(list_url + '?start=bogus')
+    assert response.status_code == 400
@@ -9,6 +9,7 @@ from .reservation import ReservationViewSet
 from .unit import UnitViewSet, UnitCancelReservationsView
 from .search import TypeaheadViewSet
 from .equipment import EquipmentViewSet
+from .change_feed import ChangeFeedViewSet
 
 from rest_framework import routers
 
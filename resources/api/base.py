@@ -16,8 +16,10 @@ from django.contrib.gis.geos import Point
 from resources.models.availability import Period, Day
 from resources.models.resource import Resource
 from resources.models.unit import Unit
+from django.db import transaction
 from resources.models.reservation import Reservation, RESERVATION_BILLING_FIELDS
 from payments.utils import is_free, get_price
+from respa import replica
 
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
@@ -231,6 +233,28 @@ class ExtraDataMixin():
             return fields
         """
         return {}
+
+
+class ReadReplicaMixin():
+    """ Mixin for views whose safe requests may be served from the read replica, see respa.replica
+
+    Safe requests are not wrapped in a transaction on the primary, other
+    requests are, like with ATOMIC_REQUESTS.
+    """
+    @transaction.non_atomic_requests
+    def dispatch(self, request, *args, **kwargs):
+        if request.method in permissions.SAFE_METHODS and replica.is_replica_configured():
+            return super().dispatch(request, *args, **kwargs)
+        with transaction.atomic():
+            return super().dispatch(request, *args, **kwargs)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if (request.method in permissions.SAFE_METHODS and replica.is_replica_configured() and
+                not replica.is_pinned_to_primary(request)):
+            replica.use_replica()
+
+
 class DaySerializer(serializers.ModelSerializer):
     weekday = serializers.ChoiceField(choices=Day.DAYS_OF_WEEK, required=True)
 
@@ -428,7 +452,12 @@ class CancelReservationsView(views.APIView):
         reservations = self.get_reservation_queryset(
             validated_data['begin'], validated_data['end']).exclude(state=Reservation.CANCELLED)
 
-        if reservations.exists():
-            reservations.cancel(user)
+        job = reservations.cancel(user)
+        if not job:
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        if job.reservation_count > settings.RESPA_CANCEL_RESERVATIONS_ASYNC_THRESHOLD:
+            return Response({'job': job.pk}, status=status.HTTP_202_ACCEPTED)
 
+        transaction.on_commit(job.process)
         return Response(status=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
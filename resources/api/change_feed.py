@@ -0,0 +1,230 @@
+import json
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max, Q
+from django.http import StreamingHttpResponse
+from rest_framework import exceptions, serializers, viewsets
+from rest_framework.decorators import action
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from resources.models import ChangeFeedEntry, Resource
+
+from .base import register_view
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+# advisory lock class of the long-poll and stream connection slots
+CONNECTION_SLOT_LOCK_CLASS = 0x72657371
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Lets the EventSource clients negotiate the stream, the events themselves
+    are written by the view. Errors are rendered as JSON.
+    """
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, cls=JSONEncoder).encode(self.charset)
+
+
+class ConnectionSlot:
+    """
+    One of the RESPA_CHANGE_FEED_MAX_CONNECTIONS slots of waiting connections,
+    shared by all the processes through session level advisory locks.
+    """
+    def __init__(self):
+        self.slot = None
+
+    def acquire(self):
+        """
+        :raises Throttled: if all the slots are taken
+        """
+        with connection.cursor() as cursor:
+            for slot in range(settings.RESPA_CHANGE_FEED_MAX_CONNECTIONS):
+                cursor.execute('SELECT pg_try_advisory_lock(%s, %s)', [CONNECTION_SLOT_LOCK_CLASS, slot])
+                if cursor.fetchone()[0]:
+                    self.slot = slot
+                    return
+        raise exceptions.Throttled(detail='Too many clients are waiting for changes, try again later.')
+
+    def release(self):
+        if self.slot is None:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_unlock(%s, %s)', [CONNECTION_SLOT_LOCK_CLASS, self.slot])
+        self.slot = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
+class EventStream:
+    """
+    The events of a stream response. The response closes the stream when it
+    is done or the client goes away, which releases the connection slot.
+    """
+    def __init__(self, events, slot):
+        self.events = events
+        self.slot = slot
+
+    def __iter__(self):
+        return self.events
+
+    def close(self):
+        try:
+            self.events.close()
+        finally:
+            self.slot.release()
+
+
+class ChangeFeedEntrySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ChangeFeedEntry
+        fields = ('id', 'created_at', 'object_type', 'object_id', 'action', 'resource', 'unit')
+
+
+class ChangeFeedViewSet(viewsets.GenericViewSet):
+    """
+    Changes to reservations and opening hours after the given sequence number.
+
+    Pass the `last` of the previous response as `since` to get the next
+    changes. The feed can be filtered with `resource`, `unit` and `object_type`.
+
+    If RESPA_CHANGE_FEED_LONG_POLL_ENABLED is set, `wait` waits up to that
+    many seconds for new changes before responding and `stream/` sends the
+    changes as Server-Sent Events. Both keep a worker busy meanwhile, so at
+    most RESPA_CHANGE_FEED_MAX_CONNECTIONS clients may wait at a time.
+    """
+    queryset = ChangeFeedEntry.objects.all()
+    serializer_class = ChangeFeedEntrySerializer
+
+    @transaction.non_atomic_requests
+    def dispatch(self, request, *args, **kwargs):
+        # do not keep a transaction open while waiting for changes
+        return super().dispatch(request, *args, **kwargs)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        params = self.request.query_params
+
+        visible_resources = Resource.objects.visible_for(self.request.user).values('pk')
+        # opening hours of units apply to all of their resources
+        queryset = queryset.filter(Q(resource__isnull=True) | Q(resource__in=visible_resources))
+
+        if params.get('resource'):
+            resource_ids = params['resource'].split(',')
+            unit_ids = Resource.objects.filter(pk__in=resource_ids).values('unit')
+            queryset = queryset.filter(Q(resource__in=resource_ids) | Q(resource__isnull=True, unit__in=unit_ids))
+        if params.get('unit'):
+            queryset = queryset.filter(unit__in=params['unit'].split(','))
+        if params.get('object_type'):
+            queryset = queryset.filter(object_type__in=params['object_type'].split(','))
+        return queryset
+
+    def get_int_param(self, name, default, maximum=None):
+        value = self.request.query_params.get(name)
+        if value in (None, ''):
+            return default
+        try:
+            value = int(value)
+        except ValueError:
+            raise exceptions.ParseError("'%s' must be an integer" % name)
+        if value < 0:
+            raise exceptions.ParseError("'%s' must not be negative" % name)
+        return min(value, maximum) if maximum is not None else value
+
+    def get_changes(self, since, limit, wait):
+        """
+        Return the changes after `since`, waiting up to `wait` seconds for them.
+
+        Entries the client would not see are skipped by advancing `since`
+        past them, so an idle filtered feed does not return the same
+        position over and over.
+
+        :return: the entries, the sequence number to continue from and whether there are more entries
+        :rtype: tuple[list, int, bool]
+        """
+        queryset = self.get_queryset()
+        deadline = time.monotonic() + wait
+        while True:
+            # only the primary key index is needed to notice that nothing has changed
+            latest = ChangeFeedEntry.objects.filter(id__gt=since).aggregate(latest=Max('id'))['latest']
+            if latest is not None:
+                entries = list(queryset.filter(id__gt=since, id__lte=latest)[:limit + 1])
+                if entries:
+                    more = len(entries) > limit
+                    entries = entries[:limit]
+                    return entries, entries[-1].id, more or entries[-1].id < latest
+                since = latest
+            if time.monotonic() >= deadline:
+                return [], since, False
+            time.sleep(min(settings.RESPA_CHANGE_FEED_POLL_INTERVAL, max(deadline - time.monotonic(), 0)))
+
+    def list(self, request, *args, **kwargs):
+        since = self.get_int_param('since', None)
+        if since is None:
+            # a new client starts from the current position
+            return Response({'last': ChangeFeedEntry.get_latest_id(), 'more': False, 'results': []})
+
+        limit = self.get_int_param('limit', DEFAULT_LIMIT, MAX_LIMIT) or DEFAULT_LIMIT
+        wait = self.get_int_param('wait', 0, settings.RESPA_CHANGE_FEED_MAX_WAIT)
+        if wait and settings.RESPA_CHANGE_FEED_LONG_POLL_ENABLED:
+            with ConnectionSlot():
+                entries, last, more = self.get_changes(since, limit, wait)
+        else:
+            entries, last, more = self.get_changes(since, limit, 0)
+        return Response({
+            'last': last,
+            'more': more,
+            'results': self.get_serializer(entries, many=True).data,
+        })
+
+    @action(detail=False, methods=['get'], renderer_classes=[EventStreamRenderer, JSONRenderer])
+    def stream(self, request, *args, **kwargs):
+        if not settings.RESPA_CHANGE_FEED_LONG_POLL_ENABLED:
+            raise exceptions.NotFound()
+        last_event_id = request.META.get('HTTP_LAST_EVENT_ID')
+        if last_event_id and last_event_id.isdigit():
+            since = int(last_event_id)
+        else:
+            since = self.get_int_param('since', None)
+        if since is None:
+            since = ChangeFeedEntry.get_latest_id()
+        slot = ConnectionSlot()
+        slot.acquire()
+        response = StreamingHttpResponse(EventStream(self.stream_events(since), slot),
+                                         content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # tell nginx not to buffer the events
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    def stream_events(self, since):
+        # the stream is closed after a while to free the worker, the clients
+        # reconnect on their own and continue from the Last-Event-ID
+        deadline = time.monotonic() + settings.RESPA_CHANGE_FEED_STREAM_TIMEOUT
+        yield 'retry: 3000\n\n'
+        while time.monotonic() < deadline:
+            wait = min(settings.RESPA_CHANGE_FEED_MAX_WAIT, max(int(deadline - time.monotonic()), 0))
+            entries, since, more = self.get_changes(since, MAX_LIMIT, wait)
+            if not entries:
+                # comments keep the proxies from closing an idle connection
+                yield ': keep-alive\n\n'
+            for entry in entries:
+                data = json.dumps(self.get_serializer(entry).data, cls=JSONEncoder)
+                yield 'id: %d\nevent: change\ndata: %s\n\n' % (entry.id, data)
+
+
+register_view(ChangeFeedViewSet, 'changes', base_name='changes')
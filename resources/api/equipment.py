@@ -2,7 +2,7 @@ from rest_framework import serializers, viewsets
 from rest_framework.permissions import DjangoModelPermissionsOrAnonReadOnly
 import django_filters
 from rest_framework.relations import PrimaryKeyRelatedField
-from .base import TranslatedModelSerializer, register_view
+from .base import ReadReplicaMixin, TranslatedModelSerializer, register_view
 from resources.models import Equipment, EquipmentAlias, EquipmentCategory
 
 
@@ -29,7 +29,7 @@ class PlainEquipmentCategorySerializer(TranslatedModelSerializer):
         fields = ('name', 'id')
 
 
-class EquipmentCategoryViewSet(viewsets.ModelViewSet):
+class EquipmentCategoryViewSet(ReadReplicaMixin, viewsets.ModelViewSet):
     queryset = EquipmentCategory.objects.all()
     serializer_class = EquipmentCategorySerializer
     permission_classes = (DjangoModelPermissionsOrAnonReadOnly, )
@@ -104,7 +104,7 @@ class EquipmentFilterSet(django_filters.FilterSet):
         fields = ('resource_group',)
 
 
-class EquipmentViewSet(viewsets.ModelViewSet):
+class EquipmentViewSet(ReadReplicaMixin, viewsets.ModelViewSet):
     queryset = Equipment.objects.all()
     serializer_class = EquipmentSerializer
     filter_backends = (django_filters.rest_framework.DjangoFilterBackend,)
@@ -1,3 +1,4 @@
+import datetime
 import uuid
 import arrow
 import django_filters
@@ -11,7 +12,9 @@ from django.utils.translation import gettext_lazy as _
 from django.core.exceptions import (
     PermissionDenied, ValidationError as DjangoValidationError
 )
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.db.models.signals import post_save
 from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
 from django.contrib.auth.models import AnonymousUser
@@ -21,6 +24,7 @@ from rest_framework.authentication import TokenAuthentication, SessionAuthentica
 from rest_framework.fields import BooleanField, IntegerField
 from rest_framework import renderers
 from rest_framework.exceptions import NotAcceptable, ValidationError
+from rest_framework.response import Response
 from rest_framework.settings import api_settings as drf_settings
 
 from munigeo import api as munigeo_api
@@ -37,7 +41,7 @@ from resources.models import (
     ReservationHomeMunicipalityField, ReservationBulk, Unit
 )
 from resources.models.reservation import RESERVATION_EXTRA_FIELDS
-from resources.models.utils import build_reservations_ical_file
+from resources.models.utils import build_reservations_ical_file, normalize_phone_number
 from resources.pagination import ReservationPagination
 from resources.models.utils import generate_reservation_xlsx, get_object_or_none
 
@@ -52,6 +56,7 @@ from ..models.utils import has_reservation_data_changed, is_reservation_metadata
 from respa.renderers import ResourcesBrowsableAPIRenderer
 
 from maintenance.models import MaintenanceMode
+from respa.instrumentation import timed
 
 User = get_user_model()
 
@@ -200,6 +205,7 @@ class ReservationSerializer(ExtraDataMixin,
 
         raise ValidationError(_('Illegal state change'))
 
+    @timed('reservation_validate')
     def validate(self, data):
         reservation = self.instance
         request_user = self.context['request'].user
@@ -517,11 +523,36 @@ class ReservationBulkSerializer(ReservationCreateMixin, serializers.Serializer):
             raise NotAcceptable({
                 'reservation_stack': _('Reservation failed. Too many reservations at once.')
             })
+        if not reservation_stack:
+            return attrs
+
+        # Fetch the opening hours and the colliding reservations for the whole series at once
+        # instead of querying them separately for every reservation.
+        reservation_stack = sorted(reservation_stack, key=lambda data: data['begin'])
+        tz = resource.unit.get_tz()
+        begin = reservation_stack[0]['begin']
+        end = max(data['end'] for data in reservation_stack)
+        opening_hours = resource.get_opening_hours(
+            begin.astimezone(tz).date() - datetime.timedelta(days=1),
+            end.astimezone(tz).date() + datetime.timedelta(days=1)
+        )
+        cooldown = resource.cooldown or datetime.timedelta(0)
+        active_reservations = list(
+            resource.reservations.filter(end__gt=begin - cooldown, begin__lt=end + cooldown).active()
+        )
+
+        previous_end = None
         for data in reservation_stack:
+            if previous_end and data['begin'] < previous_end:
+                raise ValidationError({
+                    'reservation_stack': _('Reservation failed. The reservations overlap each other.')
+                })
+            previous_end = max(previous_end, data['end']) if previous_end else data['end']
+
             reservation = Reservation(**_cattrs, **data)
-            reservation.clean()
-            resource.validate_reservation_period(reservation, reservation.user)
-            resource.validate_max_reservations_per_user(reservation.user)
+            reservation.clean(opening_hours=opening_hours, active_reservations=active_reservations)
+            resource.validate_reservation_period(reservation, reservation.user, opening_hours=opening_hours)
+        resource.validate_max_reservations_per_user(_cattrs.get('user'))
 
         return attrs
 
@@ -533,19 +564,29 @@ class ReservationBulkSerializer(ReservationCreateMixin, serializers.Serializer):
 
     def create(self, validated_data):
         reservation_stack = validated_data.pop('reservation_stack')
-        reservations = []
         user = validated_data['user']
+        instance = ReservationBulk.objects.create(created_by=user)
+
+        reservations = []
         for reservation_data in reservation_stack:
-            reservation = Reservation.objects.create(state=Reservation.CONFIRMED,
-                                      approver=user, **validated_data, **reservation_data)
+            reservation = Reservation(state=Reservation.CONFIRMED, approver=user, bulk=instance,
+                                      **validated_data, **reservation_data)
+            reservation.populate_derived_fields()
+            reservations.append(reservation)
+        reservations = Reservation.objects.bulk_create(reservations)
+
+        # bulk_create() doesn't send the model signals, send them for the batch after the insert
+        for reservation in reservations:
+            post_save.send(sender=Reservation, instance=reservation, created=True,
+                           update_fields=None, raw=False, using=instance._state.db)
             reservation_confirmed.send(
                 sender=self.__class__,
                 instance=reservation, user=user)
-            reservation.save()
-            reservations.append(reservation)
 
-        instance = ReservationBulk.objects.create(created_by=user)
-        instance.reservations.add(*reservations)
+        # signal handlers may have attached reminders to the reservations
+        with_reminders = [reservation for reservation in reservations if reservation.reminder_id]
+        if with_reminders:
+            Reservation.objects.bulk_update(with_reminders, ['reminder'])
 
         return instance
 
@@ -554,6 +595,153 @@ class ReservationBulkSerializer(ReservationCreateMixin, serializers.Serializer):
             context=self.context
         ).to_representation(instance.reservations.first())
 
+class ReservationFeasibilitySlotSerializer(serializers.Serializer):
+    resource = serializers.CharField()
+    begin = serializers.DateTimeField()
+    end = serializers.DateTimeField()
+
+
+class ReservationFeasibilitySerializer(serializers.Serializer):
+    slots = ReservationFeasibilitySlotSerializer(many=True)
+
+    def validate_slots(self, value):
+        if not value:
+            raise ValidationError(_('At least one slot is required.'))
+        if len(value) > 100:
+            raise NotAcceptable({
+                'slots': _('Too many slots at once.')
+            })
+        return value
+
+
+class ReservationFeasibilityViewSet(viewsets.GenericViewSet):
+    """
+    Check whether candidate reservation slots could be reserved, without reserving them.
+
+    Every slot is evaluated independently against the current reservations. The data
+    needed for the checks is fetched once for all slots and no locks are taken.
+    """
+    permission_classes = (permissions.AllowAny, )
+    serializer_class = ReservationFeasibilitySerializer
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        slots = serializer.validated_data['slots']
+        user = request.user
+
+        resources = {
+            resource.pk: resource for resource in
+            Resource.objects.visible_for(user).filter(pk__in={slot['resource'] for slot in slots})
+            .select_related('unit')
+        }
+        begin = min(slot['begin'] for slot in slots)
+        end = max(slot['end'] for slot in slots)
+        max_cooldown = max([resource.cooldown or datetime.timedelta(0) for resource in resources.values()],
+                           default=datetime.timedelta(0))
+
+        active_reservations = {}
+        for reservation in Reservation.objects.filter(
+                resource__in=resources.keys(),
+                end__gt=begin - max_cooldown, begin__lt=end + max_cooldown).active():
+            active_reservations.setdefault(reservation.resource_id, []).append(reservation)
+
+        user_reservation_counts = {}
+        if is_authenticated_user(user):
+            user_reservation_counts = dict(
+                Reservation.objects.filter(resource__in=resources.keys(), user=user).active()
+                .values_list('resource').annotate(count=Count('pk')).order_by()
+            )
+
+        opening_hours = {}
+        for resource in resources.values():
+            tz = resource.unit.get_tz()
+            opening_hours[resource.pk] = resource.get_opening_hours(
+                begin.astimezone(tz).date() - datetime.timedelta(days=1),
+                end.astimezone(tz).date() + datetime.timedelta(days=1)
+            )
+
+        rent_products = self._get_rent_products(resources)
+
+        results = []
+        for slot in slots:
+            resource = resources.get(slot['resource'])
+            if resource is None:
+                errors = [_('Invalid resource.')]
+            else:
+                errors = self._check_slot(
+                    resource, slot['begin'], slot['end'], user,
+                    opening_hours[resource.pk], active_reservations.get(resource.pk, []),
+                    user_reservation_counts.get(resource.pk, 0)
+                )
+            price = None
+            if not errors and rent_products.get(resource.pk):
+                price = sum(product.get_price_for_time_range(slot['begin'], slot['end'])
+                            for product in rent_products[resource.pk])
+            results.append({
+                'resource': slot['resource'],
+                'begin': slot['begin'],
+                'end': slot['end'],
+                'feasible': not errors,
+                'errors': [str(error) for error in errors],
+                'price': price,
+            })
+
+        return Response({'slots': results})
+
+    def _get_rent_products(self, resources):
+        if not settings.RESPA_PAYMENTS_ENABLED:
+            return {}
+        from payments.models import Product
+
+        rent_products = {}
+        products = Product.objects.current().rents().filter(resources__in=resources.keys())\
+            .annotate(rent_resource_id=F('resources'))
+        for product in products:
+            rent_products.setdefault(product.rent_resource_id, []).append(product)
+        return rent_products
+
+    def _check_slot(self, resource, begin, end, user, opening_hours, active_reservations, user_reservation_count):
+        if end <= begin:
+            return [_('You must end the reservation after it has begun')]
+        if end < timezone.now():
+            return [_('You cannot make a reservation in the past')]
+        if not resource.can_make_reservations(user):
+            return [_('You are not allowed to make reservations in this resource.')]
+
+        errors = []
+        if not resource.can_ignore_opening_hours(user):
+            reservable_before = resource.get_reservable_before()
+            if reservable_before and begin >= reservable_before:
+                errors.append(_('The resource is reservable only before %(datetime)s' %
+                                {'datetime': reservable_before}))
+            reservable_after = resource.get_reservable_after()
+            if reservable_after and begin < reservable_after:
+                errors.append(_('The resource is reservable only after %(datetime)s' %
+                                {'datetime': reservable_after}))
+
+        reservation = Reservation(
+            resource=resource, begin=begin, end=end,
+            user=user if is_authenticated_user(user) else None
+        )
+        try:
+            resource.validate_reservation_period(reservation, user, opening_hours=opening_hours)
+        except DjangoValidationError as exc:
+            errors.extend(exc.messages)
+        try:
+            reservation.clean(user=user, opening_hours=opening_hours, active_reservations=active_reservations)
+        except DjangoValidationError as exc:
+            errors.extend(exc.messages)
+
+        max_count = resource.max_reservations_per_user
+        if (is_authenticated_user(user) and max_count is not None and
+                user_reservation_count >= max_count and
+                not resource.can_ignore_max_reservations_per_user(user)):
+            errors.append(_('Maximum number of active reservations for this resource exceeded.'))
+
+        return errors
+
+
 class UserFilterBackend(filters.BaseFilterBackend):
     """
     Filter by user uuid and by is_own.
@@ -643,8 +831,12 @@ class PhonenumberFilterBackend(filters.BaseFilterBackend):
         phonenumber = request.query_params.get('reserver_phone_number', '')
         phonenumber = phonenumber.strip()
         if phonenumber and phonenumber.isdigit():
-            queryset = queryset.filter(Q(reserver_phone_number=phonenumber) |
-                                       Q(reserver_phone_number='+%s' % phonenumber))
+            # the number may be given with or without the country code
+            candidates = {
+                normalize_phone_number(phonenumber), normalize_phone_number('+%s' % phonenumber),
+                phonenumber, '+%s' % phonenumber,
+            }
+            queryset = queryset.filter(reserver_phone_number_normalized__in=candidates)
         return queryset
 
 
@@ -735,7 +927,7 @@ class ReservationFilterSet(django_filters.rest_framework.FilterSet):
         if not value:
             return queryset
 
-        fields = ('user__first_name', 'user__last_name', 'user__email')
+        fields = ('first_name', 'last_name', 'email')
         conditions = []
         for field in fields:
             conditions.append(Q(**{field + '__icontains': value}))
@@ -744,14 +936,16 @@ class ReservationFilterSet(django_filters.rest_framework.FilterSet):
         if ' ' in value and value.count(' ') == 1:
             name1, name2 = value.split()
             filters = Q(
-                user__first_name__icontains=name1,
-                user__last_name__icontains=name2,
+                first_name__icontains=name1,
+                last_name__icontains=name2,
             ) | Q(
-                user__first_name__icontains=name2,
-                user__last_name__icontains=name1,
+                first_name__icontains=name2,
+                last_name__icontains=name1,
             )
             conditions.append(filters)
-        return queryset.filter(reduce(operator.or_, conditions))
+        # matching the users first lets the conditions use the trigram indexes of the user table
+        users = get_user_model().objects.filter(reduce(operator.or_, conditions))
+        return queryset.filter(user__in=users)
 
 
 class ReservationPermission(permissions.BasePermission):
@@ -868,15 +1062,12 @@ class ReservationBulkViewSet(mixins.CreateModelMixin, viewsets.GenericViewSet):
     def perform_create(self, serializer):
         instance = serializer.save(user=self.request.user)
 
-        attachments = []
-        for reservation in instance.reservations.all():
-            ical_file = build_reservations_ical_file([reservation])
-            begin = self._strftime(reservation.begin)
-            end = self._strftime(reservation.end) \
-                if reservation.begin.date() != reservation.end.date() else self._to_localtime(reservation.end).strftime('%H.%M')
-            
-            attachment = ('reservation %s - %s.ics' % (begin, end), ical_file, 'text/calendar')
-            attachments.append(attachment)
+        reservations = list(instance.reservations.order_by('begin').select_related('resource'))
+        # one calendar file containing every reservation of the series
+        ical_file = build_reservations_ical_file(reservations)
+        begin = self._to_localtime(reservations[0].begin).strftime('%d.%m.%Y')
+        end = self._to_localtime(reservations[-1].end).strftime('%d.%m.%Y')
+        attachments = [('reservations %s - %s.ics' % (begin, end), ical_file, 'text/calendar')]
         instance.reservations.first().send_reservation_mail(
             NotificationType.RESERVATION_BULK_CREATED,
             attachments=attachments,
@@ -902,6 +1093,35 @@ class ReservationViewSet(munigeo_api.GeoModelAPIView, viewsets.ModelViewSet, Res
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.srs = getattr(self, 'srs', munigeo_api.srid_to_srs(None))
+        self.post_commit_hooks = []
+
+    @transaction.non_atomic_requests
+    def dispatch(self, request, *args, **kwargs):
+        """
+        Wrap the request in a transaction like ATOMIC_REQUESTS does and run
+        the hooks added with add_post_commit_hook() after it has been
+        committed.
+        """
+        with transaction.atomic():
+            response = super().dispatch(request, *args, **kwargs)
+        if response.status_code >= 400:
+            # the transaction was rolled back by the exception handler
+            return response
+        try:
+            for hook in self.post_commit_hooks:
+                hook(response)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+            response = self.finalize_response(self.request, response, *args, **kwargs)
+        return response
+
+    def add_post_commit_hook(self, hook):
+        """
+        Call hook(response) after the reservation has been saved, e.g. to
+        talk to an external service without holding the transaction open.
+        The hook may update the response or raise an API exception.
+        """
+        self.post_commit_hooks.append(hook)
 
     def get_serializer_class(self):
         if settings.RESPA_PAYMENTS_ENABLED:
@@ -1048,3 +1268,4 @@ class ReservationViewSet(munigeo_api.GeoModelAPIView, viewsets.ModelViewSet, Res
 
 register_view(ReservationViewSet, 'reservation')
 register_view(ReservationBulkViewSet, 'reservation_bulk')
+register_view(ReservationFeasibilityViewSet, 'reservation_feasibility', base_name='reservation_feasibility')
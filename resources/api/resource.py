@@ -1,5 +1,6 @@
 import collections
 import datetime
+import hashlib
 import logging
 from posixpath import basename
 import jsonschema as json
@@ -14,8 +15,8 @@ from django import forms
 from django.conf import settings
 from django.core.validators import validate_email
 from django.core.files.base import ContentFile
-from django.db.models import OuterRef, Prefetch, Q, Subquery, Value
-from django.db.models.functions import Coalesce, Least
+from django.db.models import F, FilteredRelation, Manager, Prefetch, Q, Value
+from django.db.models.functions import Coalesce
 from django.urls import reverse
 from django.contrib.gis.db.models.functions import Distance
 from django.contrib.gis.geos import Point
@@ -45,7 +46,7 @@ from resources.models import (
     AccessibilityValue, AccessibilityViewpoint, Purpose, Reservation, Resource, ResourceAccessibility,
     ResourceImage, ResourceType, ResourceEquipment, TermsOfUse, Equipment, ReservationMetadataSet,
     ReservationMetadataField, ReservationHomeMunicipalityField,
-    ReservationHomeMunicipalitySet, ResourceDailyOpeningHours, UnitAccessibility, Unit, ResourceTag,
+    ReservationHomeMunicipalitySet, ResourceDailyOpeningHours, Unit, ResourceTag,
     ResourceUniversalField, ResourceUniversalFormOption, UniversalFormFieldType, ResourcePublishDate
 )
 from resources.models.resource import determine_hours_time_range
@@ -57,7 +58,7 @@ from .accessibility import ResourceAccessibilitySerializer
 from .base import (
     ExtraDataMixin, TranslatedModelSerializer, register_view,
     DRFFilterBooleanWidget, PeriodSerializer, DaySerializer, Period,
-    LocationField, get_translated_field_help_text, CancelReservationsView
+    LocationField, get_translated_field_help_text, CancelReservationsView, ReadReplicaMixin
 )
 from .reservation import ReservationSerializer
 from .unit import UnitSerializer
@@ -70,6 +71,8 @@ from maintenance.models import MaintenanceMode
 
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
+from respa.instrumentation import timed
+from resources import fragment_cache
 
 
 logger = logging.getLogger(__name__)
@@ -154,7 +157,7 @@ class PurposeSerializer(TranslatedModelSerializer):
         super().update(instance, validated_data)
         return instance
 
-class PurposeViewSet(viewsets.ModelViewSet):
+class PurposeViewSet(ReadReplicaMixin, viewsets.ModelViewSet):
     queryset = Purpose.objects.all()
     serializer_class = PurposeSerializer
     pagination_class = PurposePagination
@@ -327,7 +330,11 @@ class NestedResourceImageSerializer(TranslatedModelSerializer):
     filename = serializers.SerializerMethodField()
 
     def get_url(self, obj):
-        url = reverse('resource-image-view', kwargs={'pk': obj.pk})
+        if obj.stamp:
+            # versioned URLs can be cached by the clients until the image changes
+            url = reverse('resource-image-view-versioned', kwargs={'pk': obj.pk, 'stamp': obj.stamp})
+        else:
+            url = reverse('resource-image-view', kwargs={'pk': obj.pk})
         request = self.context.get('request')
         if request:
             return request.build_absolute_uri(url)
@@ -646,7 +653,22 @@ class ResourcePublishDateSerializer(serializers.ModelSerializer):
             return resource
         return super().save(**kwargs)
 
+
+class ResourceListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        iterable = list(data.all() if isinstance(data, Manager) else data)
+        self.child.prefetch_fragments(iterable)
+        return super().to_representation(iterable)
+
+
 class ResourceSerializer(ExtraDataMixin, TranslatedModelSerializer, munigeo_api.GeoModelSerializer):
+    # Fields that depend on the request, the user or the current time. The
+    # rest of the representation is cached, see resources.fragment_cache.
+    DYNAMIC_FIELDS = (
+        'opening_hours', 'reservations', 'user_permissions', 'is_favorite', 'reservable',
+        'reservable_before', 'reservable_after', 'publish_date', 'public',
+    )
+
     purposes = PurposeSerializer(many=True)
     images = NestedResourceImageSerializer(many=True)
     equipment = ResourceEquipmentSerializer(many=True, read_only=True, source='resource_equipment')
@@ -702,6 +724,8 @@ class ResourceSerializer(ExtraDataMixin, TranslatedModelSerializer, munigeo_api.
             extra_fields['accessibility_summaries'] = serializers.SerializerMethodField()
         if 'unit_detail' in includes:
             extra_fields['unit'] = UnitSerializer(read_only=True, context=context)
+        # included fields are not cached
+        self._extra_field_names = set(extra_fields)
         return extra_fields
 
     def get_accessibility_summaries(self, obj):
@@ -797,6 +821,7 @@ class ResourceSerializer(ExtraDataMixin, TranslatedModelSerializer, munigeo_api.
         else:
             return obj.get_reservable_after()
 
+    @timed('resource_serializer')
     def to_representation(self, obj):
         request = self.context['request']
         user = request.user
@@ -815,7 +840,22 @@ class ResourceSerializer(ExtraDataMixin, TranslatedModelSerializer, munigeo_api.
             home_municipality_set_id = obj.reservation_home_municipality_set_id
             if home_municipality_set_id:
                 obj.reservation_home_municipality_set = self.context['reservation_home_municipality_set_cache'][home_municipality_set_id]
-        ret = super().to_representation(obj)
+
+        if fragment_cache.is_enabled():
+            key = self.get_fragment_key(obj)
+            if key in self._fragments:
+                fragment = self._fragments[key]
+            else:
+                fragment = fragment_cache.get_fragments([key]).get(key)
+            if fragment is None:
+                ret = super().to_representation(obj)
+                fragment_cache.set_fragment(key, {
+                    name: value for name, value in ret.items() if name not in self.get_dynamic_field_names()
+                })
+            else:
+                ret = self.merge_fragment(obj, fragment)
+        else:
+            ret = super().to_representation(obj)
         if hasattr(obj, 'distance'):
             if obj.distance is not None:
                 ret['distance'] = int(obj.distance.m)
@@ -840,6 +880,54 @@ class ResourceSerializer(ExtraDataMixin, TranslatedModelSerializer, munigeo_api.
 
         return ret
 
+    @property
+    def _fragments(self):
+        return self.context.setdefault('resource_fragment_cache', {})
+
+    def get_dynamic_field_names(self):
+        return set(self.DYNAMIC_FIELDS) | getattr(self, '_extra_field_names', set())
+
+    def get_fragment_key(self, obj):
+        if 'resource_fragment_generation' not in self.context:
+            self.context['resource_fragment_generation'] = fragment_cache.get_generation()
+        request = self.context['request']
+        # the image urls are absolute and the geometries depend on the srid parameter
+        variant = '%s:%s:%s:%s' % (
+            type(self).__name__, ','.join(sorted(self.fields)), request.build_absolute_uri('/'),
+            request.query_params.get('srid', ''),
+        )
+        return fragment_cache.get_key(
+            self.context['resource_fragment_generation'], obj, hashlib.md5(variant.encode('utf8')).hexdigest()
+        )
+
+    def prefetch_fragments(self, objs):
+        """
+        Fetch the cached fragments of the resources with one cache roundtrip.
+        """
+        if not fragment_cache.is_enabled():
+            return
+        keys = [self.get_fragment_key(obj) for obj in objs if isinstance(obj, Resource)]
+        fragments = fragment_cache.get_fragments(keys)
+        self._fragments.update({key: fragments.get(key) for key in keys})
+
+    def merge_fragment(self, obj, fragment):
+        """
+        Build the representation from a cached fragment, serializing only the
+        dynamic fields.
+        """
+        ret = collections.OrderedDict()
+        dynamic_field_names = self.get_dynamic_field_names()
+        for field in self._readable_fields:
+            if field.field_name not in dynamic_field_names:
+                ret[field.field_name] = fragment.get(field.field_name)
+                continue
+            try:
+                attribute = field.get_attribute(obj)
+            except fields.SkipField:
+                continue
+            ret[field.field_name] = None if attribute is None else field.to_representation(attribute)
+        return ret
+
     def get_location(self, obj):
         if obj.location is not None:
             return obj.location
@@ -913,6 +1001,7 @@ class ResourceSerializer(ExtraDataMixin, TranslatedModelSerializer, munigeo_api.
         exclude = ('reservation_requested_notification_extra', 'reservation_confirmed_notification_extra',
                    'access_code_type', 'reservation_metadata_set', 'reservation_home_municipality_set', 
                    'created_by', 'modified_by', 'configuration', 'resource_email', 'soft_deleted', '_public')
+        list_serializer_class = ResourceListSerializer
 
 
 class ResourceDetailsSerializer(ResourceSerializer):
@@ -967,21 +1056,18 @@ class ResourceOrderingFilter(django_filters.OrderingFilter):
                 value = [val for val in value if val != 'accessibility' and val != '-accessibility']
                 return super().filter(qs, value)
 
-            # annotate the queryset with accessibility priority from selected viewpoint.
-            # use the worse value of the resource and unit accessibilities.
+            # annotate the queryset with accessibility priority from selected viewpoint,
+            # precomputed in ResourceAccessibilityOrder from the resource and unit accessibilities.
             # missing accessibility data is considered same priority as UNKNOWN.
-            resource_accessibility_summary = ResourceAccessibility.objects.filter(
-                resource_id=OuterRef('pk'), viewpoint_id=accessibility_viewpoint.id)
-            resource_accessibility_order = Subquery(resource_accessibility_summary.values('order')[:1])
-            unit_accessibility_summary = UnitAccessibility.objects.filter(
-                unit_id=OuterRef('unit_id'), viewpoint_id=accessibility_viewpoint.id)
-            unit_accessibility_order = Subquery(unit_accessibility_summary.values('order')[:1])
             qs = qs.annotate(
-                accessibility_priority=Least(
-                    Coalesce(resource_accessibility_order, Value(AccessibilityValue.UNKNOWN_ORDERING)),
-                    Coalesce(unit_accessibility_order, Value(AccessibilityValue.UNKNOWN_ORDERING))
+                viewpoint_accessibility_order=FilteredRelation(
+                    'accessibility_orders', condition=Q(accessibility_orders__viewpoint=accessibility_viewpoint)
+                )
+            ).annotate(
+                accessibility_priority=Coalesce(
+                    F('viewpoint_accessibility_order__order'), Value(AccessibilityValue.UNKNOWN_ORDERING)
                 )
-            ).prefetch_related('accessibility_summaries')
+            )
         return super().filter(qs, value)
 
 
@@ -2069,13 +2155,15 @@ class ResourceDeleteView(views.APIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class ResourceListViewSet(munigeo_api.GeoModelAPIView, mixins.ListModelMixin,
+class ResourceListViewSet(ReadReplicaMixin, munigeo_api.GeoModelAPIView, mixins.ListModelMixin,
                           viewsets.GenericViewSet, ResourceCacheMixin):
     queryset = Resource.objects.select_related('generic_terms', 'payment_terms', 'unit', 'type', 'reservation_metadata_set')
     queryset = queryset.prefetch_related('favorited_by', 'resource_equipment', 'resource_equipment__equipment',
                                          'purposes', 'images', 'purposes', 'groups', 'resource_tags')
     if settings.RESPA_PAYMENTS_ENABLED:
-        queryset = queryset.prefetch_related('products')
+        queryset = queryset.prefetch_related(
+            Prefetch('products', queryset=Product.objects.current().prefetch_prices())
+        )
     filter_backends = (filters.SearchFilter, ResourceFilterBackend, LocationFilterBackend)
     search_fields = (
                     'name_fi', 'description_fi', 'unit__name_fi', 'type__name_fi',
@@ -2114,10 +2202,15 @@ class ResourceListViewSet(munigeo_api.GeoModelAPIView, mixins.ListModelMixin,
         return context
 
     def get_queryset(self):
-        return self.queryset.visible_for(self.request.user)
+        queryset = self.queryset.visible_for(self.request.user)
+        if 'accessibility_summaries' in self.request.query_params.getlist('include'):
+            queryset = queryset.prefetch_related(Prefetch(
+                'accessibility_summaries', queryset=ResourceAccessibility.objects.select_related('value', 'viewpoint')
+            ))
+        return queryset
 
 
-class ResourceViewSet(munigeo_api.GeoModelAPIView, mixins.RetrieveModelMixin,
+class ResourceViewSet(ReadReplicaMixin, munigeo_api.GeoModelAPIView, mixins.RetrieveModelMixin,
                       viewsets.GenericViewSet, ResourceCacheMixin):
     queryset = ResourceListViewSet.queryset
     authentication_classes = (
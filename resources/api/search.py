@@ -4,11 +4,12 @@ from rest_framework import viewsets
 from rest_framework.fields import BooleanField
 from rest_framework.response import Response
 
+from resources.api.base import ReadReplicaMixin
 from resources.api.resource import ResourceListViewSet
 from resources.api.unit import UnitViewSet
 
 
-class TypeaheadViewSet(viewsets.ViewSet):
+class TypeaheadViewSet(ReadReplicaMixin, viewsets.ViewSet):
     """
     Get typeahead suggestions for objects based on an arbitrary user
     input (the `input` query parameter).
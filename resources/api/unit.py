@@ -6,7 +6,7 @@ from resources.auth import (
 )
 from rest_framework import serializers, viewsets
 from django.contrib.auth.models import AnonymousUser
-from django.db.models import Q
+from django.db.models import Exists, OuterRef, Q
 from django.core.exceptions import PermissionDenied
 import django_filters
 from rest_framework.permissions import DjangoModelPermissionsOrAnonReadOnly
@@ -19,13 +19,20 @@ from resources.models.resource import Resource
 from resources.models.reservation import Reservation
 from resources.enums import UNIT_AUTH_MAP
 from .accessibility import UnitAccessibilitySerializer
-from .base import ExtraDataMixin, LocationField, PeriodSerializer
+from .base import ExtraDataMixin, LocationField, PeriodSerializer, ReadReplicaMixin
 from resources.models.utils import log_entry
 
 from users.models import User
 
 
 
+def get_public_resources(unit):
+    # the base manager skips ResourceManager's publish date refresh, which loads every resource
+    return Resource._base_manager.filter(
+        Resource.get_public_query(), unit=unit, soft_deleted=False
+    )
+
+
 class UnitCancelReservationsView(CancelReservationsView):
     queryset = Unit.objects.all()
     class Meta:
@@ -142,11 +149,9 @@ class UnitSerializer(ExtraDataMixin, TranslatedModelSerializer):
         if not isinstance(user, AnonymousUser):
             if (user.is_staff and user.has_perm('unit:can_view_unit', obj)) or user.is_general_admin or user.is_superuser:
                 return False
-        x = True
-        for ob in Resource.objects.filter(unit=obj).all():
-            if ob.public:
-                x = False
-        return x
+        if hasattr(obj, 'has_public_resources'):
+            return not obj.has_public_resources
+        return not get_public_resources(obj.pk).exists()
     
     def to_representation(self, obj):
         request = self.context['request']
@@ -211,12 +216,17 @@ class UnitSerializer(ExtraDataMixin, TranslatedModelSerializer):
         )
 
 
-class UnitViewSet(viewsets.ModelViewSet):
+class UnitViewSet(ReadReplicaMixin, viewsets.ModelViewSet):
     queryset = Unit.objects.all()
     serializer_class = UnitSerializer
     filter_backends = (django_filters.rest_framework.DjangoFilterBackend,)
     filterset_class = UnitFilterSet
     permission_classes = (DjangoModelPermissionsOrAnonReadOnly, )
 
+    def get_queryset(self):
+        return super().get_queryset().annotate(
+            has_public_resources=Exists(get_public_resources(OuterRef('pk')))
+        )
+
 
 register_view(UnitViewSet, 'unit')
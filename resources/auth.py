@@ -1,6 +1,89 @@
+import collections
+import contextvars
+
 from django.contrib.auth.models import AnonymousUser
 from .enums import UnitGroupAuthorizationLevel, UnitAuthorizationLevel
 
+_current_profiles = contextvars.ContextVar('respa_authorization_profiles', default=None)
+
+
+class AuthorizationProfile:
+    """
+    The unit and unit group authorization levels of a user.
+
+    Built from the user's authorizations with at most three queries, or
+    fewer when they have been prefetched. Within a request the profile is
+    built once per user and shared by the helpers in this module, see
+    AuthorizationProfileMiddleware.
+    """
+    def __init__(self, user):
+        self.unit_levels = collections.defaultdict(set)
+        self.unit_group_levels = collections.defaultdict(set)
+        self.unit_group_units = collections.defaultdict(set)
+
+        for auth in user.unit_authorizations.all():
+            self.unit_levels[auth.subject_id].add(auth.level)
+        for auth in user.unit_group_authorizations.all():
+            self.unit_group_levels[auth.subject_id].add(auth.level)
+        if self.unit_group_levels:
+            from .models import UnitGroup
+            members = UnitGroup.members.through.objects.filter(unitgroup__in=self.unit_group_levels.keys())
+            for unit_group_id, unit_id in members.values_list('unitgroup_id', 'unit_id'):
+                self.unit_group_units[unit_group_id].add(unit_id)
+
+        self.levels = set().union(*self.unit_levels.values())
+        self.group_levels = set().union(*self.unit_group_levels.values())
+        self.highest_level = max(self.levels) if self.levels else None
+
+    def has_level(self, level):
+        return level in self.levels or level in self.group_levels
+
+    def get_unit_levels(self, unit_id):
+        return self.unit_levels.get(unit_id, set())
+
+    def is_unit_group_admin(self, unit_id):
+        return any(
+            UnitGroupAuthorizationLevel.admin in levels and unit_id in self.unit_group_units[unit_group_id]
+            for unit_group_id, levels in self.unit_group_levels.items()
+        )
+
+
+def get_authorization_profile(user):
+    """
+    Return the AuthorizationProfile of an authenticated user, memoized for
+    the duration of the current request.
+    """
+    profiles = _current_profiles.get()
+    if profiles is None or user.pk is None:
+        return AuthorizationProfile(user)
+    profile = profiles.get(user.pk)
+    if profile is None:
+        profile = profiles[user.pk] = AuthorizationProfile(user)
+    return profile
+
+
+def clear_authorization_profiles():
+    """
+    Forget the profiles of the current request, called when authorizations
+    change, see resources.signals.
+    """
+    profiles = _current_profiles.get()
+    if profiles:
+        profiles.clear()
+
+
+class AuthorizationProfileMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _current_profiles.set({})
+        try:
+            return self.get_response(request)
+        finally:
+            _current_profiles.reset(token)
+
+
 def is_authenticated_user(user):
     return bool(user and user.is_authenticated)
 
@@ -21,38 +104,22 @@ def is_staff(user):
 def has_any_auth_equal_or_higher(user, level):
     if not is_authenticated_user(user):
         return False
-        
-    authorizations = user.unit_authorizations.all()
-    if not authorizations.exists():
-        return False
-    
-    unit_level = any(auth.level >= level for auth in authorizations)
-    return unit_level
+    highest_level = get_authorization_profile(user).highest_level
+    return highest_level is not None and highest_level >= level
 
 
 def has_any_auth_higher(user, level):
     if not is_authenticated_user(user):
         return False
-        
-    authorizations = user.unit_authorizations.all()
-    if not authorizations.exists():
-        return False
-    
-    unit_level = any(auth.level > level for auth in authorizations)
-    return unit_level
+    highest_level = get_authorization_profile(user).highest_level
+    return highest_level is not None and highest_level > level
 
 
 def has_auth_level(user, level):
     if not is_authenticated_user(user):
         return False
+    return get_authorization_profile(user).has_level(level)
 
-    group_authorizations = user.unit_group_authorizations.all()
-    authorizations = user.unit_authorizations.all()
-
-    group_level = any(group_auth.level == level for group_auth in group_authorizations)
-    unit_level = any(auth.level == level for auth in authorizations)
-
-    return group_level or unit_level
 
 def is_any_admin(user):
     if not is_authenticated_user(user):
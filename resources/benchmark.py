@@ -0,0 +1,395 @@
+"""
+Benchmark scenarios for the synthetic dataset of the generate_benchmark_data
+management command.
+
+The run_benchmarks command times every registered scenario a number of
+times and writes the results as JSON, so that the numbers measured at two
+commits can be compared with each other.
+"""
+import contextlib
+import datetime
+import io
+import math
+import platform
+import random
+import statistics
+import subprocess
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, connections
+from django.db.models import Max, Min
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from payments.models import Product
+from resources.importer.base import Importer
+from resources.importer.sync import ModelSyncher
+from resources.models import Period, Reservation, Resource, Unit
+from respa.instrumentation import RequestMetrics
+
+# Identifiers of the generated units and resources and usernames of the
+# generated users start with this
+ID_PREFIX = 'benchmark'
+
+# Days at the end of the generated opening hours that are left without
+# reservations, the reservation scenarios make their reservations there
+FREE_DAYS = 30
+
+scenarios = OrderedDict()
+
+
+def register_scenario(klass):
+    scenarios[klass.name] = klass
+    return klass
+
+
+def get_benchmark_units():
+    return Unit.objects.filter(id__startswith='%s:' % ID_PREFIX)
+
+
+def get_benchmark_resources():
+    return Resource._base_manager.filter(id__startswith='%s:' % ID_PREFIX, soft_deleted=False)
+
+
+def get_benchmark_users(staff=False):
+    kind = 'staff' if staff else 'user'
+    return get_user_model().objects.filter(username__startswith='%s-%s-' % (ID_PREFIX, kind))
+
+
+def _percentile(values, percent):
+    values = sorted(values)
+    index = max(int(math.ceil(len(values) * percent / 100.0)) - 1, 0)
+    return values[index]
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR, stderr=subprocess.DEVNULL
+        ).decode('utf8').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Scenario:
+    """
+    A timed operation. run() is measured, setup() and reset() are not.
+    run() may return a dict of counters that are summed over the runs.
+    """
+    name = None
+
+    def __init__(self, runner):
+        self.runner = runner
+        self.rng = runner.rng
+
+    def setup(self):
+        pass
+
+    def run(self):
+        raise NotImplementedError()
+
+    def reset(self):
+        pass
+
+
+class APIScenario(Scenario):
+    def get_client(self, user=None):
+        client = APIClient()
+        if user is not None:
+            client.force_authenticate(user=user)
+        return client
+
+    def get(self, client, path, params):
+        response = client.get(path, params)
+        return {'status_%d' % response.status_code: 1}
+
+
+@register_scenario
+class ResourceListScenario(APIScenario):
+    name = 'resource_list'
+    user = None
+
+    def setup(self):
+        self.client = self.get_client(self.user)
+        self.pages = max(Resource._base_manager.filter(soft_deleted=False).count() // 100, 1)
+
+    def run(self):
+        return self.get(self.client, '/v1/resource/', {'page_size': 100, 'page': self.rng.randint(1, self.pages)})
+
+
+@register_scenario
+class StaffResourceListScenario(ResourceListScenario):
+    name = 'resource_list_staff'
+
+    def setup(self):
+        self.users = list(get_benchmark_users(staff=True).order_by('pk'))
+        super().setup()
+
+    def run(self):
+        self.client.force_authenticate(user=self.rng.choice(self.users))
+        return super().run()
+
+
+@register_scenario
+class AvailableBetweenScenario(APIScenario):
+    name = 'available_between'
+
+    def setup(self):
+        self.client = self.get_client()
+
+    def run(self):
+        begin = self.runner.get_random_datetime(hours=range(8, 16))
+        end = begin + datetime.timedelta(hours=2)
+        return self.get(self.client, '/v1/resource/', {
+            'page_size': 100,
+            'available_between': '%s,%s' % (begin.isoformat(), end.isoformat()),
+        })
+
+
+@register_scenario
+class ReservationCreateScenario(APIScenario):
+    """
+    Concurrent reservation requests by different users, two requests per
+    resource so that the resources are contended.
+    """
+    name = 'reservation_create'
+
+    def setup(self):
+        concurrency = self.runner.concurrency
+        self.users = list(get_benchmark_users().order_by('pk')[:concurrency])
+        self.resources = list(get_benchmark_resources().filter(
+            reservable=True, need_manual_confirmation=False
+        ).order_by('pk')[:max(concurrency // 2, 1)])
+        if not self.users or not self.resources:
+            raise ValueError('No reservable benchmark resources or users')
+        self.date = self.runner.free_date
+        self.created = []
+
+    def _create(self, user, resource, begin, barrier):
+        client = self.get_client(user)
+        try:
+            barrier.wait()
+            response = client.post('/v1/reservation/', {
+                'resource': resource.pk,
+                'begin': begin.isoformat(),
+                'end': (begin + datetime.timedelta(hours=1)).isoformat(),
+            }, format='json')
+            return response.status_code, response.data.get('id') if response.status_code == 201 else None
+        finally:
+            connections.close_all()
+
+    def run(self):
+        tz = self.runner.tz
+        barrier = threading.Barrier(len(self.users))
+        with ThreadPoolExecutor(max_workers=len(self.users)) as executor:
+            futures = []
+            for i, user in enumerate(self.users):
+                resource = self.resources[i % len(self.resources)]
+                hour = 10 + i // len(self.resources)
+                begin = tz.localize(datetime.datetime.combine(self.date, datetime.time(hour)))
+                futures.append(executor.submit(self._create, user, resource, begin, barrier))
+            ret = {}
+            for future in futures:
+                status, pk = future.result()
+                ret['status_%d' % status] = ret.get('status_%d' % status, 0) + 1
+                if pk:
+                    self.created.append(pk)
+        return ret
+
+    def reset(self):
+        Reservation.objects.filter(pk__in=self.created).delete()
+        self.created = []
+
+
+@register_scenario
+class PricingScenario(Scenario):
+    name = 'pricing'
+
+    def setup(self):
+        self.products = list(
+            Product.objects.current().filter(resources__in=get_benchmark_resources()).distinct().order_by('pk')[:50]
+        )
+
+    def run(self):
+        for product in self.products:
+            begin = self.runner.get_random_datetime(hours=range(8, 20))
+            product.get_price_for_time_range(begin, begin + datetime.timedelta(hours=2))
+        return {'prices': len(self.products)}
+
+
+@register_scenario
+class XlsxExportScenario(APIScenario):
+    name = 'xlsx_export'
+
+    def setup(self):
+        user = get_benchmark_users(staff=True).filter(is_general_admin=True).order_by('pk').first()
+        self.client = self.get_client(user)
+        self.units = list(get_benchmark_units().order_by('pk').values_list('pk', flat=True))
+
+    def run(self):
+        start = self.runner.get_random_datetime(hours=[0])
+        return self.get(self.client, '/v1/reservation/', {
+            'format': 'xlsx',
+            'unit': self.rng.choice(self.units),
+            'start': start.isoformat(),
+            'end': (start + datetime.timedelta(days=7)).isoformat(),
+            'page_size': 50000,
+        })
+
+
+class BenchmarkImporter(Importer):
+    name = 'benchmark'
+
+
+@register_scenario
+class SyncScenario(Scenario):
+    """
+    Resync all generated resources through the importer machinery, every
+    tenth of them with a changed English name.
+    """
+    name = 'sync'
+
+    def setup(self):
+        self.suffix = False
+
+    def run(self):
+        self.suffix = not self.suffix
+        importer = BenchmarkImporter({})
+        syncher = ModelSyncher(get_benchmark_resources().order_by('pk'), lambda obj: obj.pk)
+        changed = 0
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i, obj in enumerate(list(syncher.obj_dict.values())):
+                name_en = (obj.name_en or '').rstrip(' *')
+                if i % 10 == 0 and self.suffix:
+                    name_en += ' *'
+                    changed += 1
+                data = {
+                    'name': {'fi': obj.name_fi, 'en': name_en, 'sv': obj.name_sv},
+                    'purposes': [],
+                }
+                importer.save_resource(data, obj)
+                syncher.mark(obj)
+            syncher.finish()
+            importer.flush_saves()
+        return {'changed': changed}
+
+
+class BenchmarkRunner:
+    def __init__(self, repeat=5, warmup=1, concurrency=8, seed=0):
+        self.repeat = repeat
+        self.warmup = warmup
+        self.concurrency = concurrency
+        self.seed = seed
+        self.rng = random.Random(seed)
+
+        units = get_benchmark_units()
+        unit = units.order_by('pk').first()
+        if unit is None:
+            raise ValueError('No benchmark data, run the generate_benchmark_data command first')
+        self.tz = unit.get_tz()
+        dates = Period.objects.filter(unit__in=units).aggregate(first=Min('start'), last=Max('end'))
+        self.first_date = dates['first']
+        self.last_reserved_date = dates['last'] - datetime.timedelta(days=FREE_DAYS)
+        self.free_date = self.last_reserved_date + datetime.timedelta(days=FREE_DAYS // 2)
+
+    def get_random_datetime(self, hours):
+        days = (self.last_reserved_date - self.first_date).days
+        date = self.first_date + datetime.timedelta(days=self.rng.randint(0, days))
+        return self.tz.localize(datetime.datetime.combine(date, datetime.time(self.rng.choice(hours))))
+
+    def get_dataset(self):
+        resources = get_benchmark_resources()
+        return OrderedDict([
+            ('units', get_benchmark_units().count()),
+            ('resources', resources.count()),
+            ('reservations', Reservation.objects.filter(resource__in=resources).count()),
+            ('products', Product.objects.current().filter(resources__in=resources).distinct().count()),
+            ('staff_users', get_benchmark_users(staff=True).count()),
+            ('first_date', self.first_date.isoformat()),
+            ('last_reserved_date', self.last_reserved_date.isoformat()),
+        ])
+
+    def run_scenario(self, name):
+        scenario = scenarios[name](self)
+        scenario.setup()
+        for i in range(self.warmup):
+            scenario.run()
+            scenario.reset()
+
+        durations = []
+        queries = []
+        counters = OrderedDict()
+        for i in range(self.repeat):
+            metrics = RequestMetrics()
+            with connection.execute_wrapper(metrics.execute_wrapper):
+                ret = scenario.run() or {}
+            metrics.finish()
+            scenario.reset()
+            durations.append(metrics.duration * 1000)
+            queries.append(metrics.query_count)
+            for key, value in ret.items():
+                counters[key] = counters.get(key, 0) + value
+
+        return OrderedDict([
+            ('runs', len(durations)),
+            ('min_ms', round(min(durations), 2)),
+            ('median_ms', round(statistics.median(durations), 2)),
+            ('mean_ms', round(statistics.mean(durations), 2)),
+            ('p95_ms', round(_percentile(durations, 95), 2)),
+            ('max_ms', round(max(durations), 2)),
+            ('queries', int(statistics.median(queries))),
+            ('counters', counters),
+        ])
+
+    def run(self, names=None):
+        names = names or list(scenarios.keys())
+        unknown = set(names) - set(scenarios.keys())
+        if unknown:
+            raise ValueError('Unknown scenarios: %s' % ', '.join(sorted(unknown)))
+
+        results = OrderedDict()
+        # the API is called through the test client
+        with override_settings(ALLOWED_HOSTS=['*']):
+            for name in names:
+                results[name] = self.run_scenario(name)
+
+        return OrderedDict([
+            ('meta', OrderedDict([
+                ('commit', _git_commit()),
+                ('created_at', timezone.now().isoformat()),
+                ('python', platform.python_version()),
+                ('django', django.get_version()),
+                ('repeat', self.repeat),
+                ('warmup', self.warmup),
+                ('concurrency', self.concurrency),
+                ('seed', self.seed),
+                ('dataset', self.get_dataset()),
+            ])),
+            ('scenarios', results),
+        ])
+
+
+def compare_results(old, new):
+    """
+    Compare the median durations of two result documents.
+
+    :return: rows of (scenario, old median ms, new median ms, change in percents)
+    :rtype: list[tuple]
+    """
+    rows = []
+    for name, result in new['scenarios'].items():
+        old_result = old['scenarios'].get(name)
+        if not old_result:
+            rows.append((name, None, result['median_ms'], None))
+            continue
+        change = None
+        if old_result['median_ms']:
+            change = round((result['median_ms'] - old_result['median_ms']) * 100.0 / old_result['median_ms'], 1)
+        rows.append((name, old_result['median_ms'], result['median_ms'], change))
+    return rows
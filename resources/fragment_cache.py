@@ -0,0 +1,52 @@
+"""
+Cache of the static parts of serialized resources.
+
+ResourceSerializer stores the fields of a resource's representation that do
+not depend on the request (names, images, equipment, terms and so on) and
+computes only the dynamic fields, like opening hours and user permissions,
+per request. The cache keys contain a generation number that is bumped
+whenever a resource or a row its representation is built from changes, see
+resources.signals. The generation lives in the cache, so the cache has to be
+shared by all the processes for the invalidations to reach them.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+CACHE_PREFIX = 'respa-resource-fragment'
+GENERATION_KEY = '%s:generation' % CACHE_PREFIX
+
+
+def is_enabled():
+    return settings.RESPA_RESOURCE_FRAGMENT_CACHE_TIMEOUT > 0
+
+
+def get_generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        # start from the clock, so that fragments cached before the
+        # generation key was evicted do not become valid again
+        cache.add(GENERATION_KEY, int(time.time() * 1000), None)
+        generation = cache.get(GENERATION_KEY, 0)
+    return generation
+
+
+def invalidate():
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, int(time.time() * 1000), None)
+
+
+def get_key(generation, resource, variant):
+    modified_at = resource.modified_at.timestamp() if resource.modified_at else ''
+    return '%s:%s:%s:%s:%s' % (CACHE_PREFIX, generation, resource.pk, modified_at, variant)
+
+
+def get_fragments(keys):
+    return cache.get_many(keys)
+
+
+def set_fragment(key, fragment):
+    cache.set(key, fragment, settings.RESPA_RESOURCE_FRAGMENT_CACHE_TIMEOUT)
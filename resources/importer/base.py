@@ -5,19 +5,63 @@ import re
 import struct
 import time
 import functools
+from concurrent.futures import ThreadPoolExecutor
 
+import requests
 from django.conf import settings
+from django.db.models.signals import post_save, pre_save
+from django.utils import timezone
 from modeltranslation.translator import translator
 
 from resources.models import Resource, Unit, UnitIdentifier
 from munigeo.models import Municipality
 
 
+# Number of concurrent requests when fetching remote data
+FETCH_WORKERS = 8
+
+logger = logging.getLogger(__name__)
+
+
 @functools.lru_cache()
 def get_muni(muni_id):
     return Municipality.objects.get(id=muni_id)
 
 
+def create_requests_session(pool_size=FETCH_WORKERS):
+    """
+    Create a requests session that keeps up to pool_size connections per host alive.
+    """
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def fetch_timetables(timetable_fetcher, units, start, end):
+    """
+    Fetch the timetables of the given units concurrently
+
+    The units' identifiers must be prefetched, the worker
+    threads must not query the database. A unit whose fetch
+    fails gets None, so that the other units are still processed.
+
+    :param timetable_fetcher: function taking the unit, start and end
+    :param units: list of Unit objects
+    :return: list of timetable_fetcher results in the order of units
+    """
+    def fetch(unit):
+        try:
+            return timetable_fetcher(unit, start, end)
+        except Exception:
+            logger.exception('Failed to fetch the timetable of %s' % unit)
+            return None
+
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as executor:
+        return list(executor.map(fetch, units))
+
+
 class Importer(object):
 
     @staticmethod
@@ -125,17 +169,19 @@ class Importer(object):
                 id_obj = identifiers[ns]
                 if id_obj.value != val:
                     id_obj.value = val
-                    id_obj.save()
+                    id_obj._changed_fields = ['value']
+                    self._defer_save(id_obj)
                     obj._changed = True
             else:
-                id_obj = UnitIdentifier(unit=obj, namespace=ns, value=val)
-                id_obj.save()
+                self._pending_creates.setdefault(UnitIdentifier, []).append(
+                    UnitIdentifier(unit=obj, namespace=ns, value=val)
+                )
                 obj._changed = True
 
         if obj._changed:
             if not obj._created:
                 print("%s changed: %s" % (obj, ', '.join(obj._changed_fields)))
-            obj.save()
+                self._defer_save(obj)
 
         return obj
 
@@ -158,16 +204,61 @@ class Importer(object):
         old_purposes = set([purp.pk for purp in obj.purposes.all()])
         new_purposes = set([purp.pk for purp in data['purposes']])
         if old_purposes != new_purposes:
-            obj.purposes = new_purposes
+            obj.purposes.set(new_purposes)
             obj._changed_fields.append('purposes')
 
         if obj._changed:
             if not obj._created:
                 print("%s changed: %s" % (obj, ', '.join(obj._changed_fields)))
-            obj.save()
+                self._defer_save(obj)
 
         return obj
 
+    def _defer_save(self, obj):
+        """
+        Queue the changed fields of an existing object for flush_saves().
+        """
+        pending = self._pending_saves.setdefault(type(obj), {})
+        queued_obj, fields = pending.setdefault(obj.pk, (obj, set()))
+        assert queued_obj is obj
+        fields.update(obj._changed_fields)
+
+    def flush_saves(self):
+        """
+        Write the objects queued by save_unit() and save_resource() with
+        bulk_create() and bulk_update(). The model save signals are sent for
+        the updated objects so that signal handlers see the changes.
+        """
+        for model, objs in self._pending_creates.items():
+            model.objects.bulk_create(objs)
+        self._pending_creates = {}
+
+        for model, pending in self._pending_saves.items():
+            objs = [obj for obj, __ in pending.values()]
+            field_names = set()
+            for __, fields in pending.values():
+                field_names.update(fields)
+            field_names = {
+                model._meta.get_field(name).name for name in field_names
+                if model._meta.get_field(name).concrete and not model._meta.get_field(name).many_to_many
+            }
+            # bulk_update() bypasses save(), which updates the modification time
+            if 'modified_at' not in field_names and any(f.name == 'modified_at' for f in model._meta.fields):
+                now = timezone.now()
+                for obj in objs:
+                    obj.modified_at = now
+                field_names.add('modified_at')
+            if not field_names:
+                continue
+            for obj in objs:
+                pre_save.send(sender=model, instance=obj, raw=False, using=obj._state.db,
+                              update_fields=frozenset(field_names))
+            model.objects.bulk_update(objs, sorted(field_names), batch_size=500)
+            for obj in objs:
+                post_save.send(sender=model, instance=obj, created=False, raw=False, using=obj._state.db,
+                               update_fields=frozenset(field_names))
+        self._pending_saves = {}
+
     def __init__(self, options):
         self.logger = logging.getLogger("%s_importer" % self.name)
 
@@ -181,6 +272,8 @@ class Importer(object):
         self.data_paths.append(app_path)
 
         self.options = options
+        self._pending_creates = {}
+        self._pending_saves = {}
 
 importers = {}
 
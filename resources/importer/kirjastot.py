@@ -1,4 +1,5 @@
 import datetime
+
 import delorean
 import requests
 from django.conf import settings
@@ -6,7 +7,7 @@ from django.db import transaction
 from raven import Client
 from resources.models import Unit
 from typing import Dict, List
-from .base import Importer, register_importer
+from .base import Importer, create_requests_session, fetch_timetables, register_importer
 
 IMPORTER_NAME = "kirjastot"
 
@@ -17,6 +18,8 @@ SELF_SERVICE_HOURS = 2
 KIRKANTA_NAMESPACE = 'kirkanta'
 REQUESTS_TIMEOUT = 10
 
+session = create_requests_session()
+
 
 @register_importer
 class KirjastotImporter(Importer):
@@ -40,12 +43,13 @@ def process_varaamo_libraries():
 
     :return: None
     """
-    varaamo_units = Unit.objects.filter(identifiers__namespace=KIRKANTA_NAMESPACE)
+    varaamo_units = list(
+        Unit.objects.filter(identifiers__namespace=KIRKANTA_NAMESPACE).distinct().prefetch_related('identifiers')
+    )
 
     start, end = get_time_range()
     problems = []
-    for varaamo_unit in varaamo_units:
-        data = timetable_fetcher(varaamo_unit, start, end)
+    for varaamo_unit, data in zip(varaamo_units, fetch_timetables(timetable_fetcher, varaamo_units, start, end)):
         if data:
             try:
                 with transaction.atomic():
@@ -101,7 +105,7 @@ def timetable_fetcher(unit, start='2016-07-01', end='2016-12-31'):
         }
         url = "{}/{}".format(base_url, identificator.value)
         try:
-            response = requests.get(url, params=params, timeout=REQUESTS_TIMEOUT)
+            response = session.get(url, params=params, timeout=REQUESTS_TIMEOUT)
             response.raise_for_status()
             data = response.json()
             if data["total"] > 0:
@@ -157,7 +161,6 @@ def process_periods(library, unit):
                            closed=day_closed)
 
     print("Periods processed for", unit)
-    unit.update_opening_hours()
 
 
 def parse_schedule(day_schedule: Dict[str, any]) -> Dict[str, any]:
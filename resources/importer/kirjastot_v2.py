@@ -10,12 +10,16 @@ from django.db import transaction
 from django.db.models import Q
 
 from resources.models import Unit, UnitIdentifier
-from .base import Importer, register_importer
+from .base import Importer, create_requests_session, fetch_timetables, register_importer
 
 from raven import Client
 
 from django.conf import settings
 
+REQUESTS_TIMEOUT = 10
+
+session = create_requests_session()
+
 ProxyPeriod = namedtuple("ProxyPeriod",
                          ['start',
                           'end',
@@ -53,12 +57,14 @@ def process_varaamo_libraries():
 
     :return: None
     """
-    varaamo_units = Unit.objects.filter(identifiers__namespace="kirjastot.fi").exclude(resources__isnull=True)
+    varaamo_units = list(
+        Unit.objects.filter(identifiers__namespace="kirjastot.fi").exclude(resources__isnull=True)
+        .distinct().prefetch_related('identifiers')
+    )
 
     start, end = get_time_range()
     problems = []
-    for varaamo_unit in varaamo_units:
-        data = timetable_fetcher(varaamo_unit, start, end)
+    for varaamo_unit, data in zip(varaamo_units, fetch_timetables(timetable_fetcher, varaamo_units, start, end)):
         if data:
             try:
                 with transaction.atomic():
@@ -89,7 +95,7 @@ def get_helmet_timetables():
     :return:None
     """
     url = "https://api.kirjastot.fi/v2/search/libraries?consortium=helmet&with=periods"
-    resp = requests.get(url)
+    resp = session.get(url, timeout=REQUESTS_TIMEOUT)
     assert resp.status_code == 200
     data = resp.json()  # ??
 
@@ -203,7 +209,7 @@ def timetable_fetcher(unit, start='2016-07-01', end='2016-12-31'):
             # At this stage no support for other identifier namespaces
             continue
 
-        resp = requests.get(base, params=params)
+        resp = session.get(base, params=params, timeout=REQUESTS_TIMEOUT)
 
         if resp.status_code == 200:
             data = resp.json()
@@ -273,7 +279,6 @@ def process_periods(data, unit):
         nper.save()
 
     print("Periods processed for ", unit)
-    unit.update_opening_hours()
 
 
 def get_time_range(start=None, back=1, forward=12):
@@ -2,6 +2,7 @@ class ModelSyncher(object):
 
     def __init__(self, queryset, generate_obj_id):
         d = {}
+        self.model = queryset.model
         self.generate_obj_id = generate_obj_id
         # Generate a list of all objects
         for obj in queryset:
@@ -32,5 +33,5 @@ class ModelSyncher(object):
                 delete_list.append(obj)
         if len(delete_list) > 5 and len(delete_list) > len(self.obj_dict) * 0.4:
             raise Exception("Attempting to delete more than 40% of total items")
-        for obj in delete_list:
-            obj.delete()
+        if delete_list:
+            self.model.objects.filter(pk__in=[obj.pk for obj in delete_list]).delete()
@@ -12,7 +12,7 @@ from .sync import ModelSyncher
 
 
 def generate_tprek_id(obj):
-    return obj.identifiers.get(namespace='tprek').value
+    return next(identifier.value for identifier in obj.identifiers.all() if identifier.namespace == 'tprek')
 
 
 @register_importer
@@ -62,7 +62,7 @@ class TPRekImporter(Importer):
         assert resp.status_code == 200
         data = resp.json()
 
-        unit_list = Unit.objects.filter(identifiers__namespace='tprek').distinct()
+        unit_list = Unit.objects.filter(identifiers__namespace='tprek').distinct().prefetch_related('identifiers')
         syncher = ModelSyncher(unit_list, generate_tprek_id)
 
         if 'results' in data:
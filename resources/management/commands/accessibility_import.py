@@ -1,20 +1,24 @@
 # -*- coding: utf-8 -*-
 
 import logging
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
 from django.conf import settings
 from django.core.management.base import BaseCommand
 from django.db import transaction
 from django.utils.translation import override
 
+from resources.importer.base import create_requests_session
 from resources.models import (
     AccessibilityValue, AccessibilityViewpoint, Resource, ResourceAccessibility,
-    UnitAccessibility, UnitIdentifier
+    ResourceAccessibilityOrder, UnitAccessibility, UnitIdentifier
 )
 
 
 LOG = logging.getLogger(__name__)
 REQUESTS_TIMEOUT = 15
+DEFAULT_WORKERS = 8
 
 
 class Command(BaseCommand):
@@ -24,27 +28,73 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument('--url', action='store', dest='url', default=settings.RESPA_ACCESSIBILITY_API_BASE_URL,
                             help='Import from a given URL')
+        parser.add_argument('--workers', action='store', dest='workers', type=int, default=DEFAULT_WORKERS,
+                            help='Number of concurrent requests to the Accessibility API')
 
     def handle(self, *args, **options):
         url = options['url'].rstrip('/')
+        self.workers = max(options['workers'], 1)
+        self.session = create_requests_session(pool_size=self.workers)
+
+        # Fetch everything before writing anything, so that a failing request
+        # does not leave the data half updated.
+        viewpoint_data = self.fetch_viewpoints(url)
+        resource_data = self.fetch_resource_accessibility_data(url)
+        unit_data = self.fetch_unit_accessibility_data(url)
 
         # Activate the default language for the duration of the import
         # to make sure translated fields are populated correctly.
         default_language = settings.LANGUAGE_CODE
 
         with override(default_language), transaction.atomic():
-            self.fetch_viewpoints(url)
-        with override(default_language), transaction.atomic():
-            self.fetch_resource_accessibility_data(url)
-        with override(default_language), transaction.atomic():
-            self.fetch_unit_accessibility_data(url)
+            self.import_viewpoints(viewpoint_data)
+            self.values = {value.value: value for value in AccessibilityValue.objects.all()}
+            self.import_resource_accessibility_data(resource_data)
+            self.import_unit_accessibility_data(unit_data)
+            # bulk writes do not send the signals that keep the ordering up to date
+            ResourceAccessibilityOrder.refresh()
         self.stdout.write('Finished.')
 
     def fetch_viewpoints(self, base_url):
-        """ Populate accessibility viewpoints from the accessibility API """
+        """ Fetch accessibility viewpoints from the accessibility API """
         url = '{}/api/v1/accessibility/viewpoints'.format(base_url)
-        data = self.make_request(url)
+        return self.make_request(url)
+
+    def fetch_resource_accessibility_data(self, base_url):
+        """ Fetch resource accessibility data from the accessibility API """
+        url = "{base_url}/api/v1/accessibility/targets/{system_id}/summary".format(
+            base_url=base_url, system_id=settings.RESPA_ACCESSIBILITY_API_SYSTEM_ID)
+        return self.make_request(url)
+
+    def fetch_unit_accessibility_data(self, base_url):
+        """ Fetch unit accessibility data from the accessibility API concurrently.
+            Requests only servicepoints we have, the api contains lots of stuff we don't care about.
+
+            Returns a list of (unit id, data) tuples.
+        """
+        url = "{base_url}/api/v1/accessibility/servicepoints/{system_id}/{{servicepoint_id}}/summary".format(
+            base_url=base_url, system_id=settings.RESPA_ACCESSIBILITY_API_UNIT_SYSTEM_ID)
+        unit_identifiers = list(
+            UnitIdentifier.objects.filter(namespace='internal').values_list('unit_id', 'value')
+        )
+
+        def fetch(unit_identifier):
+            unit_id, servicepoint_id = unit_identifier
+            try:
+                return unit_id, self.make_request(url.format(servicepoint_id=servicepoint_id))
+            except requests.exceptions.HTTPError as e:
+                if e.response.status_code == 404:
+                    # no accessibility data available
+                    return unit_id, []
+                raise e
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            return list(executor.map(fetch, unit_identifiers))
+
+    def import_viewpoints(self, data):
+        """ Populate accessibility viewpoints from the accessibility API data """
         vp_ids = []
+        existing_viewpoints = AccessibilityViewpoint.objects.in_bulk()
 
         for viewpoint_data in data:
             vp_id = viewpoint_data['viewpointId']
@@ -60,11 +110,9 @@ class Command(BaseCommand):
                 if name_translation['language'] in enabled_languages:
                     vp_attributes['name_%s' % name_translation['language']] = name_translation['value']
 
-            vp, created = AccessibilityViewpoint.objects.get_or_create(
-                id=vp_id,
-                defaults=vp_attributes
-            )
-            if created:
+            vp = existing_viewpoints.get(str(vp_id))
+            if vp is None:
+                vp = AccessibilityViewpoint.objects.create(id=vp_id, **vp_attributes)
                 self.stdout.write('Created AccessibilityViewpoint {}'.format(vp.name_en))
             else:
                 dirty_fields = self.update_model_attributes(vp, vp_attributes)
@@ -76,79 +124,70 @@ class Command(BaseCommand):
         # remove viewpoints which did not exist in the source anymore
         AccessibilityViewpoint.objects.exclude(id__in=vp_ids).delete()
 
-    def fetch_resource_accessibility_data(self, base_url):
-        """ Populate resource accessibility data from the accessibility API """
-        url = "{base_url}/api/v1/accessibility/targets/{system_id}/summary".format(
-            base_url=base_url, system_id=settings.RESPA_ACCESSIBILITY_API_SYSTEM_ID)
-        data = self.make_request(url)
-
+    def import_resource_accessibility_data(self, data):
+        """ Populate resource accessibility data from the accessibility API data """
+        resource_ids = set(Resource.objects.values_list('id', flat=True))
+        rows = {}
         for accessibility_data in data:
-            try:
-                resource = Resource.objects.get(id=accessibility_data['servicePointId'])
-                viewpoint = AccessibilityViewpoint.objects.get(id=accessibility_data['viewpointId'])
-            except Resource.DoesNotExist:
+            resource_id = accessibility_data['servicePointId']
+            if resource_id not in resource_ids:
                 # this is normal, the database might contain servicepoints we don't
                 # know of
                 continue
-            except AccessibilityViewpoint.DoesNotExist:
-                self.stdout.write('Received unknown Accessibility viewpoint id from API: {}. Skipping.'.format(
-                    accessibility_data['viewpointId']))
-                continue
-            value = self.get_or_create_value(accessibility_data['isAccessible'])
-            resource_accessibility, created = ResourceAccessibility.objects.get_or_create(
-                resource=resource, viewpoint=viewpoint, defaults={'value': value}
-            )
-            if created:
-                self.stdout.write('Created ResourceAccessibility {}'.format(str(resource_accessibility)))
-            else:
-                dirty_fields = self.update_model_attributes(resource_accessibility, {'value': value})
-                if len(dirty_fields) > 0:
-                    resource_accessibility.save()
-                    self.stdout.write('Updated ResourceAccessibility {}: {}'.format(
-                        str(resource_accessibility), ', '.join(dirty_fields)
-                    ))
+            rows[(resource_id, str(accessibility_data['viewpointId']))] = accessibility_data['isAccessible']
 
-    def fetch_unit_accessibility_data(self, base_url):
-        """ Populate unit accessibility data from the accessibility API.
-            Requests only servicepoints we have, the api contains lots of stuff we don't care about.
-        """
-        url = "{base_url}/api/v1/accessibility/servicepoints/{system_id}/{{servicepoint_id}}/summary".format(
-            base_url=base_url, system_id=settings.RESPA_ACCESSIBILITY_API_UNIT_SYSTEM_ID)
+        self.save_accessibility_data(ResourceAccessibility, 'resource', rows)
 
-        for unit_identifier in UnitIdentifier.objects.filter(namespace='internal').select_related('unit'):
-            unit = unit_identifier.unit
-            try:
-                data = self.make_request(url.format(servicepoint_id=unit_identifier.value))
-            except requests.exceptions.HTTPError as e:
-                if e.response.status_code == 404:
-                    # no accessibility data available
-                    continue
-                raise e
+    def import_unit_accessibility_data(self, data):
+        """ Populate unit accessibility data from the accessibility API data """
+        rows = {}
+        for unit_id, unit_data in data:
+            for viewpoint_data in unit_data:
+                rows[(unit_id, str(viewpoint_data['viewpointId']))] = viewpoint_data['isAccessible']
+
+        self.save_accessibility_data(UnitAccessibility, 'unit', rows)
 
-            for viewpoint_data in data:
-                try:
-                    viewpoint = AccessibilityViewpoint.objects.get(id=viewpoint_data['viewpointId'])
-                except AccessibilityViewpoint.DoesNotExist:
-                    self.stdout.write('Received unknown Accessibility viewpoint id from API: {}. Skipping.'.format(
-                        viewpoint_data['viewpointId']))
-                    continue
-                value = self.get_or_create_value(viewpoint_data['isAccessible'])
-                unit_accessibility, created = UnitAccessibility.objects.get_or_create(
-                    unit=unit, viewpoint=viewpoint, defaults={'value': value}
-                )
-                if created:
-                    self.stdout.write('Created UnitAccessibility {}'.format(str(unit_accessibility)))
-                else:
-                    dirty_fields = self.update_model_attributes(unit_accessibility, {'value': value})
-                    if len(dirty_fields) > 0:
-                        unit_accessibility.save()
-                        self.stdout.write('Updated UnitAccessibility {}: {}'.format(
-                            str(unit_accessibility), ', '.join(dirty_fields)
-                        ))
+    def save_accessibility_data(self, model, target_field, rows):
+        """
+        Create or update the accessibility summaries of the given model in bulk.
+
+        :param rows: accessibility values keyed by (target id, viewpoint id)
+        """
+        viewpoint_ids = set(AccessibilityViewpoint.objects.values_list('id', flat=True))
+        existing = {
+            (target_id, viewpoint_id): value_id for target_id, viewpoint_id, value_id
+            in model.objects.values_list('%s_id' % target_field, 'viewpoint_id', 'value_id')
+        }
+
+        objs = []
+        for (target_id, viewpoint_id), value_data in rows.items():
+            if viewpoint_id not in viewpoint_ids:
+                self.stdout.write('Received unknown Accessibility viewpoint id from API: {}. Skipping.'.format(
+                    viewpoint_id))
+                continue
+            value = self.get_or_create_value(value_data)
+            # skip the rows that would not change
+            if existing.get((target_id, viewpoint_id)) == value.id:
+                continue
+            objs.append(model(**{
+                '%s_id' % target_field: target_id,
+                'viewpoint_id': viewpoint_id,
+                'value': value,
+                'order': value.order,
+            }))
+
+        model.objects.bulk_create(
+            objs, batch_size=1000, update_conflicts=True,
+            unique_fields=['viewpoint', target_field], update_fields=['value', 'order', 'modified_at'],
+        )
+        created = sum(1 for obj in objs if (getattr(obj, '%s_id' % target_field), obj.viewpoint_id) not in existing)
+        self.stdout.write('{}: created {}, updated {}, unchanged {}'.format(
+            model._meta.verbose_name_plural, created, len(objs) - created, len(rows) - len(objs)
+        ))
 
     def make_request(self, url):
         try:
-            response = requests.get(url, timeout=REQUESTS_TIMEOUT)
+            response = self.session.get(url, timeout=REQUESTS_TIMEOUT)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -168,6 +207,9 @@ class Command(BaseCommand):
         These can be changed later in django admin. Resources which don't have data in Accessibility database
         are considered to have an ordering priority of 0.
         """
+        accessibility_value = self.values.get(value_data)
+        if accessibility_value is not None:
+            return accessibility_value
         accessibility_value, created = AccessibilityValue.objects.get_or_create(value=value_data)
         if created:
             if accessibility_value.value == 'green':
@@ -176,6 +218,7 @@ class Command(BaseCommand):
             elif accessibility_value.value == 'red':
                 accessibility_value.order = -10
                 accessibility_value.save()
+        self.values[value_data] = accessibility_value
         return accessibility_value
 
     def update_model_attributes(self, instance, attributes):
@@ -0,0 +1,31 @@
+import datetime
+import logging
+
+from django.core.management.base import BaseCommand, CommandError
+
+from resources.partitioning import archive_partitions
+
+logger = logging.getLogger(__name__)
+
+
+def parse_date(value):
+    try:
+        return datetime.datetime.strptime(value, '%Y-%m-%d').replace(tzinfo=datetime.timezone.utc)
+    except ValueError:
+        raise CommandError('Dates must be of ISO format (YYYY-MM-DD)')
+
+
+class Command(BaseCommand):
+    help = "Moves the reservation partitions that end before the given date to another tablespace."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', type=parse_date, required=True,
+                            help='Archive partitions ending on or before this date (YYYY-MM-DD)')
+        parser.add_argument('--tablespace', required=True, help='Tablespace the partitions are moved to')
+        parser.add_argument('--dry-run', action='store_true', help='Only list the partitions to archive')
+
+    def handle(self, *args, **options):
+        partitions = archive_partitions(options['before'], options['tablespace'], dry_run=options['dry_run'])
+        for partition in partitions:
+            self.stdout.write('%s %s' % ('Would archive' if options['dry_run'] else 'Archived', partition.name))
+        logger.info('Archived %d reservation partitions.' % (0 if options['dry_run'] else len(partitions)))
@@ -0,0 +1,19 @@
+import logging
+
+from django.core.management.base import BaseCommand
+
+from resources.partitioning import ensure_partitions
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Creates the yearly partitions of the reservation table in advance."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--years-ahead', type=int, default=2,
+                            help='Create partitions up to this many years from now')
+
+    def handle(self, *args, **options):
+        created = ensure_partitions(years_ahead=max(options['years_ahead'], 0))
+        logger.info('Created %d reservation partitions.' % len(created))
@@ -0,0 +1,236 @@
+import datetime
+import logging
+import random
+import uuid
+from decimal import Decimal
+
+import factory.random
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from payments.factories import ProductFactory
+from payments.models import Product, TimeSlotPrice
+from resources.benchmark import FREE_DAYS, ID_PREFIX, get_benchmark_units
+from resources.enums import UnitAuthorizationLevel, UnitGroupAuthorizationLevel
+from resources.models import (
+    Day, Period, Reservation, Resource, ResourceType, Unit, UnitAuthorization, UnitGroup, UnitGroupAuthorization
+)
+
+logger = logging.getLogger(__name__)
+
+# Reservations start at these local hours and last one or two hours, so
+# that the reservations of a resource never overlap
+RESERVATION_HOURS = (8, 10, 12, 14, 16, 18, 20)
+
+UNIT_LEVELS = (UnitAuthorizationLevel.admin, UnitAuthorizationLevel.manager, UnitAuthorizationLevel.viewer)
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates a synthetic dataset for the run_benchmarks command: units with regular and "
+        "exceptional opening hours, resources, reservations, priced products and staff users "
+        "with mixed authorizations. Meant to be run against an empty database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--units', type=int, default=50)
+        parser.add_argument('--resources', type=int, default=5000)
+        parser.add_argument('--reservations', type=int, default=2000000, help='Total number of reservations')
+        parser.add_argument('--users', type=int, default=2000, help='Number of reserving users')
+        parser.add_argument('--staff-users', type=int, default=200)
+        parser.add_argument('--days', type=int, default=365, help='Length of the reservation period in days')
+        parser.add_argument('--priced-ratio', type=float, default=0.2,
+                            help='Share of resources that have a rent product')
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if get_benchmark_units().exists():
+            raise CommandError('The database already contains benchmark data')
+
+        self.rng = random.Random(options['seed'])
+        factory.random.reseed_random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.first_date = datetime.date.today() - datetime.timedelta(days=options['days'] // 2)
+        self.last_reserved_date = self.first_date + datetime.timedelta(days=options['days'] - 1)
+        self.last_date = self.last_reserved_date + datetime.timedelta(days=FREE_DAYS)
+
+        with transaction.atomic():
+            units = self.create_units(options['units'])
+            resources = self.create_resources(units, options['resources'])
+            users = self.create_users(options['users'])
+            self.create_staff_users(units, options['staff_users'])
+            self.create_products(resources, options['priced_ratio'])
+        # reservations are committed a batch at a time, a single transaction would get huge
+        self.create_reservations(resources, users, options['reservations'])
+        self.update_opening_hours(resources)
+        logger.info('Benchmark data generated.')
+
+    def create_units(self, count):
+        units = []
+        for i in range(count):
+            unit = Unit.objects.create(
+                id='%s:unit-%d' % (ID_PREFIX, i), name_fi='Benchmark-toimipiste %d' % i,
+                name_en='Benchmark unit %d' % i, time_zone='Europe/Helsinki',
+            )
+            self.create_periods(unit)
+            units.append(unit)
+
+        for i in range(max(count // 10, 1)):
+            group = UnitGroup.objects.create(name='%s unit group %d' % (ID_PREFIX, i))
+            group.members.set(self.rng.sample(units, min(len(units), 10)))
+
+        logger.info('Created %d units.' % len(units))
+        return units
+
+    def create_periods(self, unit, resource=None):
+        owner = {'resource': resource} if resource else {'unit': unit}
+        period = Period.objects.create(start=self.first_date, end=self.last_date, name='regular hours', **owner)
+        for weekday in range(7):
+            if weekday < 5:
+                opens, closes = datetime.time(8), datetime.time(22)
+            else:
+                opens, closes = datetime.time(10), datetime.time(18)
+            Day.objects.create(period=period, weekday=weekday, opens=opens, closes=closes)
+        period.save_closedness()
+
+        # Shorter periods take precedence, so these are exceptions to the regular hours
+        days = (self.last_reserved_date - self.first_date).days
+        summer_start = self.first_date + datetime.timedelta(days=self.rng.randint(0, max(days - 60, 0)))
+        summer = Period.objects.create(
+            start=summer_start, end=summer_start + datetime.timedelta(days=59), name='summer hours', **owner
+        )
+        for weekday in range(7):
+            Day.objects.create(period=summer, weekday=weekday, opens=datetime.time(10), closes=datetime.time(18))
+        summer.save_closedness()
+
+        for i in range(5):
+            date = self.first_date + datetime.timedelta(days=self.rng.randint(0, days))
+            holiday = Period.objects.create(start=date, end=date, name='holiday %d' % i, **owner)
+            Day.objects.create(period=holiday, weekday=date.weekday(), closed=True)
+            holiday.save_closedness()
+
+    def create_resources(self, units, count):
+        space_type = ResourceType.objects.get_or_create(
+            id='%s:space' % ID_PREFIX, defaults=dict(name='benchmark space', main_type='space')
+        )[0]
+        resources = []
+        for i in range(count):
+            unit = units[i % len(units)]
+            resources.append(Resource(
+                id='%s:resource-%d' % (ID_PREFIX, i), unit=unit, type=space_type,
+                name_fi='Benchmark-tila %d' % i, name_en='Benchmark space %d' % i,
+                authentication=self.rng.choice(('none', 'none', 'none', 'weak')),
+                reservable=True, need_manual_confirmation=self.rng.random() < 0.1,
+                max_period=datetime.timedelta(hours=self.rng.choice((2, 4, 8))),
+                people_capacity=self.rng.randint(1, 100),
+            ))
+        Resource.objects.bulk_create(resources, batch_size=self.batch_size)
+
+        # some of the resources have their own opening hours
+        for resource in self.rng.sample(resources, len(resources) // 10):
+            self.create_periods(resource.unit, resource=resource)
+
+        logger.info('Created %d resources.' % len(resources))
+        return resources
+
+    def create_users(self, count):
+        User = get_user_model()
+        password = make_password(None)
+        users = [
+            User(
+                username='%s-user-%d' % (ID_PREFIX, i), uuid=uuid.UUID(int=self.rng.getrandbits(128)),
+                email='user-%d@benchmark.invalid' % i, password=password,
+            ) for i in range(count)
+        ]
+        User.objects.bulk_create(users, batch_size=self.batch_size)
+        return list(User.objects.filter(username__startswith='%s-user-' % ID_PREFIX))
+
+    def create_staff_users(self, units, count):
+        User = get_user_model()
+        groups = list(UnitGroup.objects.filter(members__in=units).distinct())
+        password = make_password(None)
+        unit_auths = []
+        group_auths = []
+        for i in range(count):
+            user = User.objects.create(
+                username='%s-staff-%d' % (ID_PREFIX, i), uuid=uuid.UUID(int=self.rng.getrandbits(128)),
+                email='staff-%d@benchmark.invalid' % i, password=password, is_staff=True,
+                is_general_admin=(i % 10 == 0),
+            )
+            if user.is_general_admin:
+                continue
+            for unit in self.rng.sample(units, min(len(units), self.rng.randint(1, 3))):
+                unit_auths.append(UnitAuthorization(subject=unit, authorized=user, level=self.rng.choice(UNIT_LEVELS)))
+            if groups and self.rng.random() < 0.2:
+                group_auths.append(UnitGroupAuthorization(
+                    subject=self.rng.choice(groups), authorized=user, level=UnitGroupAuthorizationLevel.admin
+                ))
+        UnitAuthorization.objects.bulk_create(unit_auths)
+        UnitGroupAuthorization.objects.bulk_create(group_auths)
+        logger.info('Created %d staff users.' % count)
+
+    def create_products(self, resources, ratio):
+        priced = self.rng.sample(resources, int(len(resources) * ratio))
+        for resource in priced:
+            product = ProductFactory(
+                resources=[resource], type=Product.RENT, price_type=Product.PRICE_PER_PERIOD,
+                price_period=datetime.timedelta(hours=1),
+            )
+            # evenings and early mornings are priced differently
+            TimeSlotPrice.objects.create(
+                product=product, begin=datetime.time(8), end=datetime.time(12),
+                price=(product.price * Decimal('0.8')).quantize(Decimal('0.01')),
+            )
+            TimeSlotPrice.objects.create(
+                product=product, begin=datetime.time(17), end=datetime.time(22),
+                price=(product.price * Decimal('1.5')).quantize(Decimal('0.01')),
+            )
+        logger.info('Created products for %d resources.' % len(priced))
+
+    def create_reservations(self, resources, users, count):
+        tz = resources[0].unit.get_tz()
+        days = (self.last_reserved_date - self.first_date).days + 1
+        per_resource = min(count // len(resources), days * len(RESERVATION_HOURS))
+        extra = count - per_resource * len(resources)
+        created = 0
+        pending = []
+
+        for i, resource in enumerate(resources):
+            n = per_resource + (1 if i < extra else 0)
+            if resource.need_manual_confirmation:
+                states = (Reservation.CONFIRMED, Reservation.REQUESTED, Reservation.DENIED, Reservation.CANCELLED)
+                weights = (6, 2, 1, 1)
+            else:
+                states = (Reservation.CONFIRMED, Reservation.CANCELLED)
+                weights = (88, 12)
+            slots = self.rng.sample(range(days * len(RESERVATION_HOURS)), min(n, days * len(RESERVATION_HOURS)))
+            for slot in slots:
+                date = self.first_date + datetime.timedelta(days=slot // len(RESERVATION_HOURS))
+                begin = tz.localize(datetime.datetime.combine(
+                    date, datetime.time(RESERVATION_HOURS[slot % len(RESERVATION_HOURS)])
+                ))
+                user = self.rng.choice(users)
+                reservation = Reservation(
+                    resource=resource, begin=begin, end=begin + datetime.timedelta(hours=self.rng.choice((1, 2))),
+                    user=user, state=self.rng.choices(states, weights)[0],
+                    event_subject='Benchmark reservation', reserver_name=user.username,
+                    reserver_email_address=user.email,
+                )
+                reservation.populate_derived_fields()
+                pending.append(reservation)
+
+            if len(pending) >= self.batch_size or i == len(resources) - 1:
+                Reservation.objects.bulk_create(pending, batch_size=self.batch_size)
+                created += len(pending)
+                pending = []
+                logger.info('Created %d reservations.' % created)
+
+    def update_opening_hours(self, resources):
+        for i, resource in enumerate(resources):
+            with transaction.atomic():
+                resource.update_opening_hours()
+            if i % 100 == 99:
+                logger.info('Updated opening hours of %d resources.' % (i + 1))
@@ -0,0 +1,24 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from resources.models import ResourceImage
+
+
+class Command(BaseCommand):
+    help = "Generates the derivative sizes of the resource images, so that they don't need to be generated on request."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--minutes', type=int, default=None,
+                            help='Only process the images modified within this many minutes')
+
+    def handle(self, *args, **options):
+        images = ResourceImage.objects.order_by('pk')
+        if options['minutes'] is not None:
+            images = images.filter(modified_at__gte=timezone.now() - datetime.timedelta(minutes=options['minutes']))
+        count = 0
+        for image in images.iterator():
+            image.generate_derivatives()
+            count += 1
+        self.stdout.write('Generated the derivatives of %d images.' % count)
@@ -0,0 +1,21 @@
+import logging
+
+from django.core.management.base import BaseCommand
+from tendo import singleton
+
+from resources.models import ReservationCancellationJob
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Sends the notifications and syncs of pending bulk reservation cancellations."
+
+    def handle(self, *args, **options):
+        try:
+            me = singleton.SingleInstance(flavor_id="process_reservation_cancellation_jobs")
+        except singleton.SingleInstanceException:
+            return
+        for job in ReservationCancellationJob.objects.claimable().order_by('created_at'):
+            logger.info('Processing reservation cancellation job %s.' % job.pk)
+            job.process()
@@ -0,0 +1,16 @@
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from resources.models import ChangeFeedEntry
+
+
+class Command(BaseCommand):
+    help = "Removes the change feed entries older than RESPA_CHANGE_FEED_RETENTION_DAYS."
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - datetime.timedelta(days=settings.RESPA_CHANGE_FEED_RETENTION_DAYS)
+        deleted, _ = ChangeFeedEntry.objects.filter(created_at__lt=cutoff).delete()
+        self.stdout.write('Removed %d change feed entries.' % deleted)
@@ -0,0 +1,46 @@
+import datetime
+import logging
+
+from django.core.management.base import BaseCommand, CommandError
+
+from resources.models import Resource, ResourceDailyUtilization
+
+logger = logging.getLogger(__name__)
+
+
+def parse_date(value):
+    try:
+        return datetime.datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError('Dates must be of ISO format (YYYY-MM-DD)')
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the daily utilization statistics of resources for the given date range."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=parse_date, required=True, help='First date (YYYY-MM-DD)')
+        parser.add_argument('--end', type=parse_date, help='Last date (YYYY-MM-DD), defaults to today')
+        parser.add_argument('--resource', nargs='+', help='Rebuild only these resources')
+        parser.add_argument('--chunk-days', type=int, default=31, help='Days recalculated at a time')
+
+    def handle(self, *args, **options):
+        start = options['start']
+        end = options['end'] or datetime.date.today()
+        if end < start:
+            raise CommandError('End must not be before start')
+        chunk_days = max(options['chunk_days'], 1)
+
+        resources = Resource.objects.all().select_related('unit').order_by('pk')
+        if options['resource']:
+            resources = resources.filter(pk__in=options['resource'])
+
+        for resource in resources:
+            date = start
+            while date <= end:
+                chunk_end = min(date + datetime.timedelta(days=chunk_days - 1), end)
+                ResourceDailyUtilization.update_for_dates(
+                    resource, [date + datetime.timedelta(days=i) for i in range((chunk_end - date).days + 1)]
+                )
+                date = chunk_end + datetime.timedelta(days=1)
+            logger.info('Rebuilt daily utilization of resource %s.' % resource.pk)
@@ -59,3 +59,4 @@ class Command(BaseCommand):
                     if url:
                         kwargs['url'] = url
                     method(**kwargs)
+                    importer.flush_saves()
@@ -0,0 +1,52 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from resources.benchmark import BenchmarkRunner, compare_results, scenarios
+
+
+class Command(BaseCommand):
+    help = (
+        "Times the benchmark scenarios against the data of generate_benchmark_data and writes "
+        "the results as JSON. Available scenarios: %s" % ', '.join(scenarios.keys())
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenarios', nargs='*', help='Scenarios to run, defaults to all of them')
+        parser.add_argument('--output', help='File to write the JSON results to, defaults to stdout')
+        parser.add_argument('--compare', help='Earlier JSON results to compare the median durations with')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per scenario')
+        parser.add_argument('--warmup', type=int, default=1, help='Untimed runs per scenario before the timed ones')
+        parser.add_argument('--concurrency', type=int, default=8, help='Concurrent reservation requests')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        previous = None
+        if options['compare']:
+            with open(options['compare']) as f:
+                previous = json.load(f)
+
+        try:
+            runner = BenchmarkRunner(
+                repeat=max(options['repeat'], 1), warmup=max(options['warmup'], 0),
+                concurrency=max(options['concurrency'], 1), seed=options['seed'],
+            )
+            results = runner.run(options['scenarios'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        output = json.dumps(results, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+        if previous:
+            for name, old_ms, new_ms, change in compare_results(previous, results):
+                self.stderr.write('%-24s %10s %10s %8s' % (
+                    name,
+                    '%.1f' % old_ms if old_ms is not None else '-',
+                    '%.1f' % new_ms,
+                    '%+.1f%%' % change if change is not None else '-',
+                ))
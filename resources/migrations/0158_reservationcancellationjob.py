@@ -0,0 +1,34 @@
+# Generated by Django 4.2.13 on 2026-10-19 09:12
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('resources', '0157_missing_migrations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReservationCancellationJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Time of creation')),
+                ('modified_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Time of modification')),
+                ('state', models.CharField(choices=[('pending', 'pending'), ('done', 'done')], db_index=True, default='pending', max_length=16, verbose_name='State')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='Time of processing')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='%(class)s_created', to=settings.AUTH_USER_MODEL, verbose_name='Created by')),
+                ('modified_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='%(class)s_modified', to=settings.AUTH_USER_MODEL, verbose_name='Modified by')),
+                ('reservations', models.ManyToManyField(blank=True, related_name='cancellation_jobs', to='resources.reservation', verbose_name='Reservations')),
+            ],
+            options={
+                'verbose_name': 'Reservation cancellation job',
+                'verbose_name_plural': 'Reservation cancellation jobs',
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.15 on 2026-10-19 10:04
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resources', '0158_reservationcancellationjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResourceDailyUtilization',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Date')),
+                ('reservation_count', models.PositiveIntegerField(default=0, verbose_name='Reservation count')),
+                ('booked_minutes', models.PositiveIntegerField(default=0, verbose_name='Booked minutes')),
+                ('open_minutes', models.PositiveIntegerField(default=0, verbose_name='Open minutes')),
+                ('cancelled_count', models.PositiveIntegerField(default=0, verbose_name='Cancelled reservation count')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Time of update')),
+                ('resource', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_utilizations', to='resources.resource', verbose_name='Resource')),
+            ],
+            options={
+                'verbose_name': 'Resource daily utilization',
+                'verbose_name_plural': 'Resource daily utilizations',
+                'indexes': [models.Index(fields=['date', 'resource'], name='resources_utilization_date_idx')],
+                'unique_together': {('resource', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.15 on 2026-10-19 11:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resources', '0159_resourcedailyutilization'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reservationreminder',
+            name='reservation',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='Reservations', to='resources.reservation', verbose_name='Reservation'),
+        ),
+        migrations.AlterField(
+            model_name='reservationcancellationjob',
+            name='reservations',
+            field=models.ManyToManyField(blank=True, db_constraint=False, related_name='cancellation_jobs', to='resources.reservation', verbose_name='Reservations'),
+        ),
+    ]
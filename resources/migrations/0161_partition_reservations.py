@@ -0,0 +1,131 @@
+# Generated by Django 4.2.15 on 2026-10-19 11:40
+
+from django.db import migrations
+from django.db.migrations.exceptions import IrreversibleError
+
+# Turns resources_reservation into a table partitioned by range on "begin".
+# The existing rows up to the start of the current year stay where they are
+# and the table is attached as the first partition, the rest of the rows are
+# moved to yearly partitions. The primary key of a partitioned table has to
+# include the partition key, so the key becomes (id, begin) and the foreign
+# keys referencing reservations are kept on the ORM level only, see the
+# db_constraint=False migrations this one depends on.
+PARTITION_RESERVATIONS_SQL = """
+DO $$
+DECLARE
+    boundary timestamptz := date_trunc('year', now() AT TIME ZONE 'UTC') AT TIME ZONE 'UTC';
+    first_year integer := extract(year FROM now() AT TIME ZONE 'UTC');
+    index_defs text[];
+    fk_defs text[];
+    fk_names text[];
+    index_name text;
+    seq_name text;
+    next_id bigint;
+    partition_year integer;
+    i integer;
+BEGIN
+    SELECT coalesce(array_agg(pg_get_indexdef(indexrelid)), '{}') INTO index_defs
+        FROM pg_index WHERE indrelid = 'resources_reservation'::regclass AND NOT indisprimary;
+    SELECT coalesce(array_agg(conname::text ORDER BY conname), '{}'),
+           coalesce(array_agg(pg_get_constraintdef(oid) ORDER BY conname), '{}')
+        INTO fk_names, fk_defs
+        FROM pg_constraint WHERE conrelid = 'resources_reservation'::regclass AND contype = 'f';
+
+    seq_name := pg_get_serial_sequence('resources_reservation', 'id');
+    SELECT coalesce(max(id), 0) + 1 INTO next_id FROM resources_reservation;
+    IF seq_name IS NOT NULL THEN
+        EXECUTE format('SELECT greatest(%s, last_value + 1) FROM %s', next_id, seq_name) INTO next_id;
+    END IF;
+
+    ALTER TABLE resources_reservation RENAME TO resources_reservation_history;
+    FOR index_name IN
+        SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE i.indrelid = 'resources_reservation_history'::regclass AND NOT i.indisprimary
+    LOOP
+        EXECUTE format('ALTER INDEX %I RENAME TO %I', index_name, left(index_name, 58) || '_hist');
+    END LOOP;
+    FOR i IN 1 .. coalesce(array_length(fk_names, 1), 0) LOOP
+        EXECUTE format('ALTER TABLE resources_reservation_history DROP CONSTRAINT %I', fk_names[i]);
+    END LOOP;
+    EXECUTE (
+        SELECT format('ALTER TABLE resources_reservation_history DROP CONSTRAINT %I', conname)
+        FROM pg_constraint WHERE conrelid = 'resources_reservation_history'::regclass AND contype = 'p'
+    );
+    IF (SELECT attidentity FROM pg_attribute
+            WHERE attrelid = 'resources_reservation_history'::regclass AND attname = 'id') <> '' THEN
+        ALTER TABLE resources_reservation_history ALTER COLUMN id DROP IDENTITY;
+    ELSE
+        ALTER TABLE resources_reservation_history ALTER COLUMN id DROP DEFAULT;
+        IF seq_name IS NOT NULL THEN
+            EXECUTE format('DROP SEQUENCE %s', seq_name);
+        END IF;
+    END IF;
+
+    CREATE TABLE resources_reservation (LIKE resources_reservation_history INCLUDING CONSTRAINTS)
+        PARTITION BY RANGE ("begin");
+    CREATE SEQUENCE resources_reservation_id_seq AS integer OWNED BY resources_reservation.id;
+    PERFORM setval('resources_reservation_id_seq', next_id, false);
+    ALTER TABLE resources_reservation ALTER COLUMN id SET DEFAULT nextval('resources_reservation_id_seq');
+    ALTER TABLE resources_reservation ADD CONSTRAINT resources_reservation_pkey PRIMARY KEY (id, "begin");
+    FOR i IN 1 .. coalesce(array_length(fk_names, 1), 0) LOOP
+        EXECUTE format('ALTER TABLE resources_reservation ADD CONSTRAINT %I %s', fk_names[i], fk_defs[i]);
+    END LOOP;
+    FOR i IN 1 .. coalesce(array_length(index_defs, 1), 0) LOOP
+        EXECUTE index_defs[i];
+    END LOOP;
+
+    FOR partition_year IN first_year .. first_year + 2 LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF resources_reservation FOR VALUES FROM (%L) TO (%L)',
+            'resources_reservation_y' || partition_year,
+            make_timestamptz(partition_year, 1, 1, 0, 0, 0, 'UTC'),
+            make_timestamptz(partition_year + 1, 1, 1, 0, 0, 0, 'UTC')
+        );
+    END LOOP;
+    CREATE TABLE resources_reservation_default PARTITION OF resources_reservation DEFAULT;
+
+    INSERT INTO resources_reservation SELECT * FROM resources_reservation_history WHERE "begin" >= boundary;
+    DELETE FROM resources_reservation_history WHERE "begin" >= boundary;
+
+    -- lets ATTACH PARTITION skip the scan of the table
+    EXECUTE format(
+        'ALTER TABLE resources_reservation_history ADD CONSTRAINT resources_reservation_history_bound '
+        'CHECK ("begin" IS NOT NULL AND "begin" < %L)', boundary
+    );
+    EXECUTE format(
+        'ALTER TABLE resources_reservation ATTACH PARTITION resources_reservation_history '
+        'FOR VALUES FROM (MINVALUE) TO (%L)', boundary
+    );
+    ALTER TABLE resources_reservation_history DROP CONSTRAINT resources_reservation_history_bound;
+END
+$$;
+"""
+
+
+def partition_reservations(apps, schema_editor):
+    schema_editor.execute(PARTITION_RESERVATIONS_SQL, None)
+
+
+def unpartition_reservations(apps, schema_editor):
+    raise IrreversibleError(
+        'Migration resources.0161 cannot be reversed automatically: resources_reservation is a partitioned '
+        'table. Copy the reservations to a regular table and replace resources_reservation with it by hand '
+        'before migrating further back.'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resources', '0160_reservation_foreign_keys_db_constraint'),
+        ('payments', '0016_order_reservation_db_constraint'),
+        ('caterings', '0008_cateringorder_reservation_db_constraint'),
+        ('kulkunen', '0006_accesscontrolgrant_reservation_db_constraint'),
+        ('respa_exchange', '0011_exchangereservation_reservation_db_constraint'),
+        ('respa_o365', '0008_outlookcalendarreservation_reservation_db_constraint'),
+        ('respa_outlook', '0004_respaoutlookreservation_reservation_db_constraint'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_reservations, unpartition_reservations),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.15 on 2026-10-19 12:10
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('resources', '0161_partition_reservations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResourcePermissionIndexState',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('permission', models.CharField(max_length=100, verbose_name='Permission')),
+                ('built_at', models.DateTimeField(auto_now=True, verbose_name='Time of build')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='User')),
+            ],
+            options={
+                'verbose_name': 'Resource permission index state',
+                'verbose_name_plural': 'Resource permission index states',
+                'unique_together': {('user', 'permission')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ResourcePermissionIndex',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('permission', models.CharField(max_length=100, verbose_name='Permission')),
+                ('resource', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='resources.resource', verbose_name='Resource')),
+                ('unit', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='resources.unit', verbose_name='Unit')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='User')),
+            ],
+            options={
+                'verbose_name': 'Resource permission index entry',
+                'verbose_name_plural': 'Resource permission index entries',
+                'indexes': [models.Index(fields=['user', 'permission', 'unit'], name='resources_perm_index_unit_idx'), models.Index(fields=['user', 'permission', 'resource'], name='resources_perm_index_res_idx')],
+            },
+        ),
+    ]
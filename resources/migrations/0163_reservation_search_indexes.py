@@ -0,0 +1,51 @@
+# Generated by Django 4.2.15 on 2026-10-19 14:20
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+import django.db.models.functions.text
+
+from resources.models.utils import normalize_phone_number
+
+
+def populate_normalized_phone_numbers(apps, schema_editor):
+    Reservation = apps.get_model('resources', 'Reservation')
+    reservations = Reservation.objects.exclude(reserver_phone_number='').only('id', 'reserver_phone_number')
+    batch = []
+    for reservation in reservations.iterator(chunk_size=2000):
+        reservation.reserver_phone_number_normalized = normalize_phone_number(reservation.reserver_phone_number)
+        batch.append(reservation)
+        if len(batch) >= 2000:
+            Reservation.objects.bulk_update(batch, ['reserver_phone_number_normalized'])
+            batch = []
+    if batch:
+        Reservation.objects.bulk_update(batch, ['reserver_phone_number_normalized'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resources', '0162_resourcepermissionindex'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='reservation',
+            name='reserver_phone_number_normalized',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=30, verbose_name='Normalized reserver phone number'),
+        ),
+        migrations.RunPython(populate_normalized_phone_numbers, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('event_subject'), name='gin_trgm_ops'), name='resources_res_subject_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('host_name'), name='gin_trgm_ops'), name='resources_res_host_name_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('reserver_name'), name='gin_trgm_ops'), name='resources_res_reserver_trgm'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.15 on 2026-10-19 15:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# The worse of the resource and unit accessibility orders for every viewpoint
+# the resource or its unit has data for, see ResourceAccessibilityOrder.refresh.
+POPULATE_ORDERS_SQL = """
+INSERT INTO resources_resourceaccessibilityorder (resource_id, viewpoint_id, "order")
+SELECT r.id, vp.viewpoint_id, LEAST(COALESCE(ra."order", 0), COALESCE(ua."order", 0))
+FROM resources_resource r
+JOIN (
+    SELECT resource_id, viewpoint_id FROM resources_resourceaccessibility
+    UNION
+    SELECT r2.id, ua2.viewpoint_id FROM resources_unitaccessibility ua2
+    JOIN resources_resource r2 ON r2.unit_id = ua2.unit_id
+) vp ON vp.resource_id = r.id
+LEFT JOIN resources_resourceaccessibility ra ON ra.resource_id = r.id AND ra.viewpoint_id = vp.viewpoint_id
+LEFT JOIN resources_unitaccessibility ua ON ua.unit_id = r.unit_id AND ua.viewpoint_id = vp.viewpoint_id
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resources', '0163_reservation_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResourceAccessibilityOrder',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order', models.IntegerField(verbose_name='Resource ordering priority')),
+                ('resource', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='accessibility_orders', to='resources.resource', verbose_name='Resource')),
+                ('viewpoint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='resources.accessibilityviewpoint', verbose_name='Accessibility viewpoint')),
+            ],
+            options={
+                'verbose_name': 'resource accessibility order',
+                'verbose_name_plural': 'resource accessibility orders',
+                'unique_together': {('resource', 'viewpoint')},
+                'indexes': [models.Index(fields=['viewpoint', 'order', 'resource'], name='resources_acc_order_idx')],
+            },
+        ),
+        migrations.RunSQL(POPULATE_ORDERS_SQL, migrations.RunSQL.noop),
+    ]
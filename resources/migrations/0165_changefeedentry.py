@@ -0,0 +1,31 @@
+# Generated by Django 4.2.15 on 2026-10-19 16:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resources', '0164_resourceaccessibilityorder'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeFeedEntry',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Time of creation')),
+                ('object_type', models.CharField(choices=[('reservation', 'Reservation'), ('opening_hours', 'Opening hours')], max_length=32, verbose_name='Object type')),
+                ('object_id', models.CharField(max_length=100, verbose_name='Object ID')),
+                ('action', models.CharField(choices=[('created', 'Created'), ('updated', 'Updated'), ('deleted', 'Deleted')], max_length=16, verbose_name='Action')),
+                ('resource', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='resources.resource', verbose_name='Resource')),
+                ('unit', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='resources.unit', verbose_name='Unit')),
+            ],
+            options={
+                'verbose_name': 'change feed entry',
+                'verbose_name_plural': 'change feed entries',
+                'ordering': ('id',),
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.15 on 2026-10-19 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resources', '0165_changefeedentry'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reservationcancellationjob',
+            name='state',
+            field=models.CharField(choices=[('pending', 'pending'), ('processing', 'processing'), ('done', 'done')], db_index=True, default='pending', max_length=16, verbose_name='State'),
+        ),
+    ]
@@ -1,9 +1,11 @@
-from .accessibility import AccessibilityValue, AccessibilityViewpoint, ResourceAccessibility, UnitAccessibility
+from .accessibility import (
+    AccessibilityValue, AccessibilityViewpoint, ResourceAccessibility, ResourceAccessibilityOrder, UnitAccessibility
+)
 from .availability import Day, Period, get_opening_hours
 from .reservation import (
     ReservationMetadataField, ReservationMetadataSet, ReservationHomeMunicipalityField, ReservationHomeMunicipalitySet,
     Reservation, RESERVATION_EXTRA_FIELDS,
-    ReservationBulk, ReservationReminder, ReservationQuerySet,
+    ReservationBulk, ReservationReminder, ReservationQuerySet, ReservationCancellationJob,
 )
 from .resource import (
     Purpose, Resource, ResourceType, ResourceImage, ResourceEquipment, ResourceGroup,
@@ -16,10 +18,14 @@ from .unit_group import UnitGroup, UnitGroupAuthorization
 from .resource_field import UniversalFormFieldType
 
 from .timmi import TimmiPayload
+from .utilization import ResourceDailyUtilization
+from .permission_index import ResourcePermissionIndex, ResourcePermissionIndexState
+from .change_feed import ChangeFeedEntry
 
 __all__ = [
     'AccessibilityValue',
     'AccessibilityViewpoint',
+    'ChangeFeedEntry',
     'Day',
     'Equipment',
     'EquipmentAlias',
@@ -34,14 +40,19 @@ __all__ = [
     'ReservationHomeMunicipalitySet',
     'ReservationBulk',
     'ReservationReminder',
+    'ReservationCancellationJob',
     'ReservationQuerySet',
     'Resource',
     'ResourceTag',
     'ResourceAccessibility',
+    'ResourceAccessibilityOrder',
     'ResourceDailyOpeningHours',
+    'ResourceDailyUtilization',
     'ResourceEquipment',
     'ResourceGroup',
     'ResourceImage',
+    'ResourcePermissionIndex',
+    'ResourcePermissionIndexState',
     'ResourceType',
     'TermsOfUse',
     'Unit',
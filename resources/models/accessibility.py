@@ -1,4 +1,6 @@
-from django.db import models
+import collections
+
+from django.db import models, transaction
 from django.utils import timezone
 from django.utils.translation import gettext as _
 from .base import AutoIdentifiedModel
@@ -35,10 +37,15 @@ class AccessibilityValue(AutoIdentifiedModel):
         verbose_name_plural = _('accessibility values')
 
     def save(self, *args, **kwargs):
-        """ Update the cached ordering of related ResourceAccessibility objects """
-        if self.id:
+        """ Update the cached ordering of related accessibility objects """
+        existing = bool(self.id)
+        if existing:
             ResourceAccessibility.objects.filter(value=self).update(order=self.order)
-        return super().save(*args, **kwargs)
+            UnitAccessibility.objects.filter(value=self).update(order=self.order)
+        ret = super().save(*args, **kwargs)
+        if existing:
+            ResourceAccessibilityOrder.refresh()
+        return ret
 
     def __str__(self):
         return self.value
@@ -92,3 +99,68 @@ class UnitAccessibility(AutoIdentifiedModel):
 
     def __str__(self):
         return '{} / {}: {}'.format(self.unit, self.viewpoint, self.value)
+
+
+class ResourceAccessibilityOrder(models.Model):
+    """
+    The accessibility ordering priority of a resource from a viewpoint, used
+    for ordering the resource list by accessibility.
+
+    The priority is the worse of the resource and unit accessibility values.
+    Rows exist only for the viewpoints the resource or its unit has data
+    for, a missing row means AccessibilityValue.UNKNOWN_ORDERING. The rows
+    are refreshed when the accessibility data changes, see resources.signals,
+    and by the accessibility_import command.
+    """
+    resource = models.ForeignKey('resources.Resource', related_name='accessibility_orders',
+                                 verbose_name=_('Resource'), on_delete=models.CASCADE)
+    viewpoint = models.ForeignKey(AccessibilityViewpoint, related_name='+',
+                                  verbose_name=_('Accessibility viewpoint'), on_delete=models.CASCADE)
+    order = models.IntegerField(verbose_name=_('Resource ordering priority'))
+
+    class Meta:
+        unique_together = ('resource', 'viewpoint')
+        indexes = [
+            models.Index(fields=['viewpoint', 'order', 'resource'], name='resources_acc_order_idx'),
+        ]
+        verbose_name = _('resource accessibility order')
+        verbose_name_plural = _('resource accessibility orders')
+
+    def __str__(self):
+        return '{} / {}: {}'.format(self.resource, self.viewpoint, self.order)
+
+    @classmethod
+    @transaction.atomic
+    def refresh(cls, resources=None):
+        """
+        Recompute the ordering priorities of the given resources, or of all
+        the resources.
+        """
+        from .resource import Resource
+
+        if resources is None:
+            resources = Resource.objects.all()
+        units_by_resource = dict(resources.values_list('id', 'unit_id'))
+        if not units_by_resource:
+            return
+
+        resource_orders = collections.defaultdict(dict)
+        for resource_id, viewpoint_id, order in ResourceAccessibility.objects.filter(
+                resource__in=units_by_resource.keys()).values_list('resource_id', 'viewpoint_id', 'order'):
+            resource_orders[resource_id][viewpoint_id] = order
+        unit_orders = collections.defaultdict(dict)
+        for unit_id, viewpoint_id, order in UnitAccessibility.objects.filter(
+                unit__in=set(units_by_resource.values())).values_list('unit_id', 'viewpoint_id', 'order'):
+            unit_orders[unit_id][viewpoint_id] = order
+
+        unknown = AccessibilityValue.UNKNOWN_ORDERING
+        rows = []
+        for resource_id, unit_id in units_by_resource.items():
+            by_resource = resource_orders.get(resource_id, {})
+            by_unit = unit_orders.get(unit_id, {})
+            for viewpoint_id in set(by_resource) | set(by_unit):
+                order = min(by_resource.get(viewpoint_id, unknown), by_unit.get(viewpoint_id, unknown))
+                rows.append(cls(resource_id=resource_id, viewpoint_id=viewpoint_id, order=order))
+
+        cls.objects.filter(resource__in=units_by_resource.keys()).delete()
+        cls.objects.bulk_create(rows, batch_size=1000)
@@ -0,0 +1,102 @@
+from django.db import models, transaction
+from django.utils.translation import gettext_lazy as _
+
+from .resource import Resource
+from .unit import Unit
+
+# key of the advisory lock that serializes writing the entries
+CHANGE_FEED_LOCK_ID = 0x72657370
+
+
+class ChangeFeedEntry(models.Model):
+    """
+    An append-only log of changes to reservations and opening hours, read by
+    the clients of the /v1/changes/ endpoint instead of polling the resources
+    and reservations for changes.
+
+    The entries of a transaction are written together after it has committed,
+    under an advisory lock, so that the ids are assigned in commit order and a
+    client that has seen an id never misses a smaller one.
+    The entries only tell what changed, the clients fetch the objects through
+    the API. They are removed after RESPA_CHANGE_FEED_RETENTION_DAYS by the
+    prune_change_feed command.
+    """
+    RESERVATION = 'reservation'
+    OPENING_HOURS = 'opening_hours'
+    OBJECT_TYPE_CHOICES = (
+        (RESERVATION, _('Reservation')),
+        (OPENING_HOURS, _('Opening hours')),
+    )
+
+    CREATED = 'created'
+    UPDATED = 'updated'
+    DELETED = 'deleted'
+    ACTION_CHOICES = (
+        (CREATED, _('Created')),
+        (UPDATED, _('Updated')),
+        (DELETED, _('Deleted')),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    created_at = models.DateTimeField(verbose_name=_('Time of creation'), auto_now_add=True, db_index=True)
+    object_type = models.CharField(verbose_name=_('Object type'), max_length=32, choices=OBJECT_TYPE_CHOICES)
+    object_id = models.CharField(verbose_name=_('Object ID'), max_length=100)
+    action = models.CharField(verbose_name=_('Action'), max_length=16, choices=ACTION_CHOICES)
+    # the entries outlive deleted resources and units, so no constraints or cascades
+    resource = models.ForeignKey(Resource, verbose_name=_('Resource'), null=True, blank=True, related_name='+',
+                                 on_delete=models.DO_NOTHING, db_constraint=False)
+    unit = models.ForeignKey(Unit, verbose_name=_('Unit'), null=True, blank=True, related_name='+',
+                             on_delete=models.DO_NOTHING, db_constraint=False)
+
+    class Meta:
+        verbose_name = _('change feed entry')
+        verbose_name_plural = _('change feed entries')
+        ordering = ('id',)
+
+    def __str__(self):
+        return '%s: %s %s %s' % (self.id, self.object_type, self.object_id, self.action)
+
+    @classmethod
+    def record(cls, object_type, object_id, action, resource_id=None, unit_id=None):
+        """
+        Add an entry to the feed when the current transaction commits.
+        """
+        entry = cls(object_type=object_type, object_id=str(object_id), action=action,
+                    resource_id=resource_id, unit_id=unit_id)
+        connection = transaction.get_connection()
+        pending = getattr(connection, 'change_feed_entries', None)
+        # the entries of a rolled back transaction are left behind without their callback
+        if pending is None or not any(func == pending.write for _, func, _ in connection.run_on_commit):
+            pending = connection.change_feed_entries = PendingChangeFeedEntries(connection)
+            pending.append(entry)
+            transaction.on_commit(pending.write, robust=True)
+        else:
+            pending.append(entry)
+
+    @classmethod
+    def get_latest_id(cls):
+        return cls.objects.aggregate(latest=models.Max('id'))['latest'] or 0
+
+
+class PendingChangeFeedEntries(list):
+    """
+    The change feed entries of a transaction, written in one go when it commits.
+    """
+    def __init__(self, connection):
+        super().__init__()
+        self.connection = connection
+
+    def write(self):
+        if getattr(self.connection, 'change_feed_entries', None) is self:
+            self.connection.change_feed_entries = None
+        missing_units = {entry.resource_id for entry in self if entry.unit_id is None and entry.resource_id}
+        with transaction.atomic(using=self.connection.alias):
+            with self.connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_xact_lock(%s)', [CHANGE_FEED_LOCK_ID])
+            if missing_units:
+                units = dict(Resource.objects.using(self.connection.alias).filter(pk__in=missing_units)
+                             .values_list('id', 'unit_id'))
+                for entry in self:
+                    if entry.unit_id is None and entry.resource_id:
+                        entry.unit_id = units.get(entry.resource_id)
+            ChangeFeedEntry.objects.using(self.connection.alias).bulk_create(self)
@@ -0,0 +1,130 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.gis.db import models
+from django.db import router, transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils.translation import gettext_lazy as _
+from guardian.shortcuts import get_objects_for_user
+
+from ..auth import is_authenticated_user
+from .permissions import UNIT_ROLE_PERMISSIONS
+from .resource import Resource, ResourceGroup
+from .unit import Unit
+
+
+def compute_permission_targets(perm, user):
+    """
+    Return the ids of the units and the resources on which the user has the
+    given resource permission through unit permissions, unit or unit group
+    authorizations or resource group permissions.
+
+    :rtype: tuple[set, set]
+    """
+    units = get_objects_for_user(user, 'unit:%s' % perm, klass=Unit, with_superuser=False)
+    resource_groups = get_objects_for_user(user, 'group:%s' % perm, klass=ResourceGroup, with_superuser=False)
+    units_where_role = Unit.objects.by_roles(user, UNIT_ROLE_PERMISSIONS.get(perm))
+
+    unit_ids = set(units.values_list('pk', flat=True)) | set(units_where_role.values_list('pk', flat=True))
+    resource_ids = set(
+        ResourceGroup.resources.through.objects.filter(resourcegroup__in=resource_groups)
+        .values_list('resource_id', flat=True)
+    )
+    return unit_ids, resource_ids
+
+
+class ResourcePermissionIndexState(models.Model):
+    """
+    Marks the index of a user and a permission as built.
+
+    The states are removed when the authorizations or permissions they
+    depend on change, see resources.signals, and the index is rebuilt the
+    next time it is needed.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, verbose_name=_('User'), related_name='+', on_delete=models.CASCADE
+    )
+    permission = models.CharField(verbose_name=_('Permission'), max_length=100)
+    built_at = models.DateTimeField(verbose_name=_('Time of build'), auto_now=True)
+
+    class Meta:
+        verbose_name = _('Resource permission index state')
+        verbose_name_plural = _('Resource permission index states')
+        unique_together = [
+            ('user', 'permission')
+        ]
+
+
+class ResourcePermissionIndex(models.Model):
+    """
+    A unit or a resource on which a user has a resource permission, used by
+    ResourceQuerySet.with_perm instead of resolving the permissions again.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, verbose_name=_('User'), related_name='+', on_delete=models.CASCADE
+    )
+    permission = models.CharField(verbose_name=_('Permission'), max_length=100)
+    unit = models.ForeignKey(
+        Unit, verbose_name=_('Unit'), related_name='+', null=True, blank=True, on_delete=models.CASCADE
+    )
+    resource = models.ForeignKey(
+        Resource, verbose_name=_('Resource'), related_name='+', null=True, blank=True, on_delete=models.CASCADE
+    )
+
+    class Meta:
+        verbose_name = _('Resource permission index entry')
+        verbose_name_plural = _('Resource permission index entries')
+        indexes = [
+            models.Index(fields=['user', 'permission', 'unit'], name='resources_perm_index_unit_idx'),
+            models.Index(fields=['user', 'permission', 'resource'], name='resources_perm_index_res_idx'),
+        ]
+
+    @classmethod
+    def build(cls, perm, user):
+        """
+        Rebuild the index of the user for the given permission.
+
+        The index is written to the primary even when the current request
+        reads from the replica.
+
+        :return: ids of the units and the resources, see compute_permission_targets
+        :rtype: tuple[set, set]
+        """
+        db = router.db_for_write(cls)
+        with transaction.atomic(using=db):
+            # serialize concurrent builds for the same user
+            User = get_user_model()
+            User.objects.using(router.db_for_write(User)).select_for_update().filter(pk=user.pk).first()
+            unit_ids, resource_ids = compute_permission_targets(perm, user)
+            cls.objects.using(db).filter(user=user, permission=perm).delete()
+            cls.objects.using(db).bulk_create(
+                [cls(user=user, permission=perm, unit_id=unit_id) for unit_id in unit_ids] +
+                [cls(user=user, permission=perm, resource_id=resource_id) for resource_id in resource_ids]
+            )
+            ResourcePermissionIndexState.objects.using(db).update_or_create(user=user, permission=perm)
+        return unit_ids, resource_ids
+
+    @classmethod
+    def get_filter(cls, perm, user, using=None):
+        """
+        Return a filter for the resources on which the user has the given
+        permission, building the index of the user first if needed.
+        """
+        if not is_authenticated_user(user):
+            unit_ids, resource_ids = compute_permission_targets(perm, user)
+        elif ResourcePermissionIndexState.objects.using(using).filter(user=user, permission=perm).exists():
+            entries = cls.objects.filter(user=user, permission=perm)
+            return Q(Exists(entries.filter(unit=OuterRef('unit')))) | Q(Exists(entries.filter(resource=OuterRef('pk'))))
+        else:
+            # the new entries may not have reached the read replica yet
+            unit_ids, resource_ids = cls.build(perm, user)
+        return Q(unit__in=unit_ids) | Q(pk__in=resource_ids)
+
+    @classmethod
+    def invalidate(cls, users=None):
+        """
+        Mark the index of the given users, or of everyone, to be rebuilt.
+        """
+        states = ResourcePermissionIndexState.objects.all()
+        if users is not None:
+            states = states.filter(user__in=users)
+        states.delete()
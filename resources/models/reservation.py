@@ -12,7 +12,9 @@ from django.utils import translation
 from django.utils.timezone import now
 from django.utils.translation import gettext_lazy as _
 from django.core.exceptions import ValidationError, ObjectDoesNotExist
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db.models import Q
+from django.db.models.functions import Upper
 from psycopg2.extras import DateTimeTZRange
 
 from notifications.models import NotificationTemplate, NotificationTemplateException, NotificationType, NotificationTemplateGroup
@@ -26,7 +28,7 @@ from .utils import (
     get_dt, save_dt, is_valid_time_slot, humanize_duration, send_respa_mail, send_respa_sms,
     DEFAULT_LANG, localize_datetime, format_dt_range, format_dt_range_alt, build_reservations_ical_file,
     get_order_quantity, get_order_tax_price, get_order_pretax_price, get_payment_requested_waiting_time,
-    calculate_final_product_sums, calculate_final_order_sums
+    calculate_final_product_sums, calculate_final_order_sums, normalize_phone_number
 )
 from ..enums import UnitAuthorizationLevel
 
@@ -90,11 +92,51 @@ class ReservationQuerySet(models.QuerySet):
         return self.filter(Q(user=user) | Q(resource__in=allowed_resources))
 
     def cancel(self, user):
-        for reservation in self:
-            reservation.set_state(Reservation.CANCELLED, user)
-            if reservation.has_order():
-                order = reservation.get_order()
-                order.set_state('cancelled', 'Order reservation was cancelled.')
+        """
+        Cancel the reservations with set-based updates.
+
+        Reservation and order states are updated in bulk and order log entries
+        are bulk-created. Notifications, calendar syncs and access control
+        revocations are left to the returned ReservationCancellationJob,
+        which is processed either after the transaction commits or by the
+        process_reservation_cancellation_jobs management command. Unlike with
+        Reservation.set_state(), the reservations are already cancelled when
+        the reservation_cancelled signal is sent.
+
+        :type user: users.models.User
+        :rtype: ReservationCancellationJob|None
+        """
+        from payments.models import Order, OrderLogEntry
+
+        reservation_ids = list(self.exclude(state=Reservation.CANCELLED).values_list('pk', flat=True))
+        if not reservation_ids:
+            return None
+
+        modified_by = user if user and user.is_authenticated else None
+        Reservation.objects.filter(pk__in=reservation_ids).update(
+            state=Reservation.CANCELLED, modified_at=timezone.now(), modified_by=modified_by
+        )
+
+        # lock the orders so that a concurrent payment callback cannot move them
+        # out of the states that may transition to cancelled
+        cancellable_states = (Order.WAITING, Order.CONFIRMED)
+        order_ids = list(Order.objects.select_for_update().filter(
+            reservation__in=reservation_ids, state__in=cancellable_states
+        ).values_list('pk', flat=True))
+        if order_ids:
+            Order.objects.filter(pk__in=order_ids, state__in=cancellable_states).update(state=Order.CANCELLED)
+            OrderLogEntry.objects.bulk_create([
+                OrderLogEntry(order_id=order_id, state_change=Order.CANCELLED,
+                              message='Order reservation was cancelled.')
+                for order_id in order_ids
+            ])
+
+        job = ReservationCancellationJob.objects.create(created_by=modified_by, modified_by=modified_by)
+        job.reservations.set(reservation_ids)
+        job.reservation_count = len(reservation_ids)
+        return job
+
+
 class ReservationBulkQuerySet(models.QuerySet):
     def current(self):
         return self
@@ -183,6 +225,10 @@ class Reservation(ModifiableModel):
     reserver_id = models.CharField(verbose_name=_('Reserver ID (business)'), max_length=30, blank=True)
     reserver_email_address = models.EmailField(verbose_name=_('Reserver email address'), blank=True)
     reserver_phone_number = models.CharField(verbose_name=_('Reserver phone number'), max_length=30, blank=True)
+    # reserver_phone_number in E.164 format for lookups, see populate_derived_fields
+    reserver_phone_number_normalized = models.CharField(
+        verbose_name=_('Normalized reserver phone number'), max_length=30, blank=True, db_index=True, editable=False
+    )
     reserver_address_street = models.CharField(verbose_name=_('Reserver address street'), max_length=100, blank=True)
     reserver_address_zip = models.CharField(verbose_name=_('Reserver address zip'), max_length=30, blank=True)
     reserver_address_city = models.CharField(verbose_name=_('Reserver address city'), max_length=100, blank=True)
@@ -213,10 +259,19 @@ class Reservation(ModifiableModel):
 
     objects = ReservationQuerySet.as_manager()
 
+    # The table is partitioned by begin (see resources.partitioning), so any
+    # unique constraint added here has to include begin and the foreign keys
+    # pointing to reservations must use db_constraint=False.
     class Meta:
         verbose_name = _("reservation")
         verbose_name_plural = _("reservations")
         ordering = ('id',)
+        # trigram indexes for the icontains filters of the API, which compare UPPER(field)
+        indexes = [
+            GinIndex(OpClass(Upper('event_subject'), name='gin_trgm_ops'), name='resources_res_subject_trgm'),
+            GinIndex(OpClass(Upper('host_name'), name='gin_trgm_ops'), name='resources_res_host_name_trgm'),
+            GinIndex(OpClass(Upper('reserver_name'), name='gin_trgm_ops'), name='resources_res_reserver_trgm'),
+        ]
 
     def _save_dt(self, attr, dt):
         """
@@ -443,6 +498,10 @@ class Reservation(ModifiableModel):
         If this reservation isn't yet saved and it will modify an existing reservation,
         the original reservation need to be provided in kwargs as 'original_reservation', so
         that it can be excluded when checking if the resource is available.
+
+        When validating many reservations at once, the resource's opening hours can be
+        provided in kwargs as 'opening_hours' and its active reservations covering the
+        reservation (including cooldown) as 'active_reservations' to avoid per reservation queries.
         """
 
         if 'user' in kwargs:
@@ -456,7 +515,9 @@ class Reservation(ModifiableModel):
             raise ValidationError(_("You must end the reservation after it has begun"))
 
         # Check that begin and end times are on valid time slots.
-        opening_hours = self.resource.get_opening_hours(self.begin.date(), self.end.date())
+        opening_hours = kwargs.get('opening_hours')
+        if opening_hours is None:
+            opening_hours = self.resource.get_opening_hours(self.begin.date(), self.end.date())
         for dt in (self.begin, self.end):
             days = opening_hours.get(dt.date(), [])
             day = next((day for day in days if day['opens'] is not None and day['opens'] <= dt <= day['closes']), None)
@@ -493,15 +554,16 @@ class Reservation(ModifiableModel):
                 )
 
         original_reservation = self if self.pk else kwargs.get('original_reservation', None)
-        if self.resource.check_reservation_collision(self.begin, self.end, original_reservation):
+        active_reservations = kwargs.get('active_reservations')
+        if self.resource.check_reservation_collision(self.begin, self.end, original_reservation, active_reservations):
             raise ValidationError({'period': _("The resource is already reserved for some of the period")}, code='invalid_period_range')
 
 
-        user_unit_auth_level = self.resource.unit.get_highest_authorization_level_for_user(user)
-        is_at_least_viewer = user_unit_auth_level >= UnitAuthorizationLevel.viewer if user_unit_auth_level else None
-        
         if self.resource.cooldown:
-            if not is_at_least_viewer and self.resource.check_cooldown_collision(self.begin, self.end, original_reservation):
+            user_unit_auth_level = self.resource.unit.get_highest_authorization_level_for_user(user)
+            is_at_least_viewer = user_unit_auth_level >= UnitAuthorizationLevel.viewer if user_unit_auth_level else None
+            if not is_at_least_viewer and self.resource.check_cooldown_collision(
+                    self.begin, self.end, original_reservation, active_reservations):
                 raise ValidationError({ 'cooldown': _("Cannot be reserved during cooldown") }, code='cooldown_collision')
 
         if not user_is_admin:
@@ -857,14 +919,30 @@ class Reservation(ModifiableModel):
     def send_access_code_created_mail(self):
         self.send_reservation_mail(NotificationType.RESERVATION_ACCESS_CODE_CREATED)
 
-    def save(self, *args, **kwargs):
+    def populate_derived_fields(self):
+        """
+        Set the fields derived from the other fields, done on every save.
+
+        Must be called explicitly for reservations inserted with bulk_create().
+        """
         self.duration = DateTimeTZRange(self.begin, self.end, '[)')
+        self.reserver_phone_number_normalized = normalize_phone_number(self.reserver_phone_number)
 
         if not self.access_code:
             access_code_type = self.resource.access_code_type
             if self.resource.is_access_code_enabled() and self.resource.generate_access_codes:
                 self.access_code = generate_access_code(access_code_type)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # remember the stored period so that the statistics of the days it was moved away from can be updated
+        if 'begin' in field_names and 'end' in field_names:
+            instance._loaded_period = (instance.begin, instance.end)
+        return instance
+
+    def save(self, *args, **kwargs):
+        self.populate_derived_fields()
         return super().save(*args, **kwargs)
 
 
@@ -1003,7 +1081,7 @@ class ReservationReminderQuerySet(models.QuerySet):
 
 class ReservationReminder(models.Model):
     reservation = models.ForeignKey('Reservation', verbose_name=_('Reservation'), db_index=True, related_name='Reservations',
-                                 on_delete=models.CASCADE)
+                                 on_delete=models.CASCADE, db_constraint=False)
     reminder_date = models.DateTimeField(verbose_name=_('Reminder date'))
 
 
@@ -1028,3 +1106,89 @@ class ReservationReminder(models.Model):
 
     def __str__(self):
         return '%s - %s' % (self.reservation, self.reservation.reserver_email_address)
+
+
+class ReservationCancellationJobQuerySet(models.QuerySet):
+    def pending(self):
+        return self.filter(state=ReservationCancellationJob.PENDING)
+
+    def claimable(self):
+        """
+        Jobs that can be claimed for processing: the pending ones and the ones
+        left processing for longer than the timeout, e.g. by a crashed process.
+        """
+        m = ReservationCancellationJob
+        stale = timezone.now() - m.PROCESSING_TIMEOUT
+        return self.filter(Q(state=m.PENDING) | Q(state=m.PROCESSING, modified_at__lt=stale))
+
+
+class ReservationCancellationJob(ModifiableModel):
+    PENDING = 'pending'
+    PROCESSING = 'processing'
+    DONE = 'done'
+    STATE_CHOICES = (
+        (PENDING, _('pending')),
+        (PROCESSING, _('processing')),
+        (DONE, _('done')),
+    )
+
+    PROCESSING_TIMEOUT = datetime.timedelta(hours=1)
+
+    state = models.CharField(max_length=16, verbose_name=_('State'), choices=STATE_CHOICES,
+                             default=PENDING, db_index=True)
+    reservations = models.ManyToManyField('Reservation', verbose_name=_('Reservations'),
+                                          related_name='cancellation_jobs', blank=True, db_constraint=False)
+    processed_at = models.DateTimeField(verbose_name=_('Time of processing'), null=True, blank=True)
+
+    objects = ReservationCancellationJobQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = _('Reservation cancellation job')
+        verbose_name_plural = _('Reservation cancellation jobs')
+
+    def __str__(self):
+        return '%s <%s>' % (_('Reservation cancellation job'), self.created_by)
+
+    def claim(self):
+        """
+        Mark the job as being processed, unless another process has claimed it.
+
+        :return: whether the job was claimed
+        :rtype: bool
+        """
+        modified_at = timezone.now()
+        claimed = ReservationCancellationJob.objects.claimable().filter(pk=self.pk).update(
+            state=ReservationCancellationJob.PROCESSING, modified_at=modified_at
+        )
+        if claimed:
+            self.state = ReservationCancellationJob.PROCESSING
+            self.modified_at = modified_at
+        return bool(claimed)
+
+    def process(self):
+        """
+        Emit the side effects of the bulk cancellation for every reservation
+        in the job: cancellation signals, calendar syncs and notifications.
+
+        The job is claimed first, so that the request that created it and
+        process_reservation_cancellation_jobs never both process it.
+        """
+        from django.db.models.signals import post_save
+
+        if not self.claim():
+            return
+
+        user = self.created_by
+        reservations = self.reservations.select_related('resource', 'resource__unit', 'user', 'order')
+        for reservation in reservations.iterator(chunk_size=100):
+            try:
+                reservation_cancelled.send(sender=Reservation, instance=reservation, user=user)
+                post_save.send(sender=Reservation, instance=reservation, created=False,
+                               update_fields=None, raw=False, using=self._state.db)
+                reservation.handle_notification(Reservation.CANCELLED, user, None)
+            except Exception:
+                logger.exception('Failed to handle cancellation of reservation %s' % reservation.pk)
+
+        self.state = ReservationCancellationJob.DONE
+        self.processed_at = timezone.now()
+        self.save(update_fields=['state', 'processed_at', 'modified_at'])
@@ -8,6 +8,7 @@ from decimal import Decimal
 
 import arrow
 import django.db.models as dbm
+from django.db import transaction
 from django.db.models import Q
 from django.apps import apps
 from django.conf import settings
@@ -24,9 +25,11 @@ from django.utils.text import format_lazy
 from django.utils.translation import pgettext_lazy, gettext_lazy as _
 from django.contrib.postgres.fields import DateTimeRangeField
 from .gistindex import GistIndex
+from easy_thumbnails.files import get_thumbnailer
 from image_cropping import ImageRatioField
 from PIL import Image
-from guardian.shortcuts import get_objects_for_user, get_users_with_perms
+from guardian.shortcuts import get_users_with_perms
+from respa.instrumentation import timed
 from guardian.core import ObjectPermissionChecker
 
 
@@ -188,15 +191,9 @@ class ResourceQuerySet(models.QuerySet):
         return self.filter(unit__in=units)
 
     def with_perm(self, perm, user):
-        units = get_objects_for_user(user, 'unit:%s' % perm, klass=Unit,
-                                     with_superuser=False)
-        resource_groups = get_objects_for_user(user, 'group:%s' % perm, klass=ResourceGroup,
-                                               with_superuser=False)
+        from .permission_index import ResourcePermissionIndex
 
-        allowed_roles = UNIT_ROLE_PERMISSIONS.get(perm)
-        units_where_role = Unit.objects.by_roles(user, allowed_roles)
-
-        return self.filter(Q(unit__in=list(units) + list(units_where_role)) | Q(groups__in=resource_groups)).distinct()
+        return self.filter(ResourcePermissionIndex.get_filter(perm, user, using=self.db))
 
     def external(self):
         return self.filter(is_external=True)
@@ -421,6 +418,14 @@ class Resource(ModifiableModel, AutoIdentifiedModel, ValidatedIdentifier):
     def __str__(self):
         return "%s (%s)/%s" % (get_translated(self, 'name'), self.id, self.unit)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # remember the stored unit so that a move to another unit can be noticed on save
+        if 'unit_id' in field_names:
+            instance._loaded_unit_id = instance.unit_id
+        return instance
+
     def save(self, *args, **kwargs):
         if getattr(self, '_clean_func_lock', False):
             return
@@ -432,6 +437,20 @@ class Resource(ModifiableModel, AutoIdentifiedModel, ValidatedIdentifier):
             return self.publish_date.public
         return self._public
 
+    @staticmethod
+    def get_public_query(now=None):
+        """
+        Q matching resources that are currently public, taking publish dates
+        into account in the database (see ResourcePublishDate._get_public).
+        """
+        now = now or timezone.now()
+        return (
+            Q(_publish_date__begin__isnull=True, _publish_date__end__isnull=True, _public=True) |
+            Q(_publish_date__begin__lt=now, _publish_date__end__gt=now) |
+            Q(_publish_date__begin__lt=now, _publish_date__end__isnull=True) |
+            Q(_publish_date__begin__isnull=True, _publish_date__end__gt=now)
+        )
+
     @public.setter
     def public(self, value):
         if not isinstance(value, bool):
@@ -460,7 +479,7 @@ class Resource(ModifiableModel, AutoIdentifiedModel, ValidatedIdentifier):
                 or self.unit.get_disabled_fields()
         return disabled_fields
 
-    def validate_reservation_period(self, reservation, user, data=None):
+    def validate_reservation_period(self, reservation, user, data=None, opening_hours=None):
         """
         Check that given reservation if valid for given user.
 
@@ -470,6 +489,9 @@ class Resource(ModifiableModel, AutoIdentifiedModel, ValidatedIdentifier):
         or None if we are creating a new reservation.
         If the reservation is not valid raises a ValidationError.
 
+        Opening hours prefetched with get_opening_hours() for a range covering
+        the reservation may be given to avoid querying them again.
+
         Staff members have no restrictions at least for now.
 
         Normal users cannot make multi day reservations or reservations
@@ -519,7 +541,8 @@ class Resource(ModifiableModel, AutoIdentifiedModel, ValidatedIdentifier):
                 raise ValidationError(_("Reservation start and end must match the given overnight reservation start and end values"))
 
         if not self.can_ignore_opening_hours(user):
-            opening_hours = self.get_opening_hours(begin.date(), end.date())
+            if opening_hours is None:
+                opening_hours = self.get_opening_hours(begin.date(), end.date())
             days = opening_hours.get(begin.date(), None)
             if not is_multiday_reservation and (days is None or not any(day['opens'] and begin >= day['opens'] and end <= day['closes'] for day in days)):
                 raise ValidationError(_("You must start and end the reservation during opening hours"))
@@ -546,16 +569,39 @@ class Resource(ModifiableModel, AutoIdentifiedModel, ValidatedIdentifier):
             if reservation_count >= max_count:
                 raise ValidationError(_("Maximum number of active reservations for this resource exceeded."))
 
-    def check_reservation_collision(self, begin, end, reservation):
+    def check_reservation_collision(self, begin, end, reservation, active_reservations=None):
+        """
+        Check if the given period collides with an active reservation of the resource.
+
+        If active_reservations, a list of the resource's active reservations
+        covering the period, is given, the check is done without a query.
+        """
+        if active_reservations is not None:
+            return any(
+                rv.end > begin and rv.begin < end and not (reservation and rv.pk == reservation.pk)
+                for rv in active_reservations
+            )
         overlapping = self.reservations.filter(end__gt=begin, begin__lt=end).active()
         if reservation:
             overlapping = overlapping.exclude(pk=reservation.pk)
         return overlapping.exists()
 
-    def check_cooldown_collision(self, begin, end, reservation) -> bool:
+    def check_cooldown_collision(self, begin, end, reservation, active_reservations=None) -> bool:
         from .reservation import Reservation
         cooldown_start = begin - self.cooldown
         cooldown_end = end + self.cooldown
+
+        if active_reservations is not None:
+            return any(
+                (
+                    cooldown_start < rv.begin < cooldown_end or
+                    cooldown_start < rv.end < cooldown_end or
+                    (rv.begin < cooldown_start and rv.end > begin) or
+                    (rv.begin < end and rv.end > cooldown_end)
+                ) and rv.type != Reservation.TYPE_BLOCKED and not (reservation and rv.pk == reservation.pk)
+                for rv in active_reservations
+            )
+
         query = (
             Q(begin__gt=cooldown_start, begin__lt=cooldown_end) |
             Q(end__gt=cooldown_start, end__lt=cooldown_end) |
@@ -658,6 +704,7 @@ class Resource(ModifiableModel, AutoIdentifiedModel, ValidatedIdentifier):
         hours_list[-1]['ends'] = end
         return hours_list
 
+    @timed('opening_hours')
     def get_opening_hours(self, begin=None, end=None, opening_hours_cache=None):
         """
         :rtype : dict[str, datetime.datetime]
@@ -748,6 +795,16 @@ class Resource(ModifiableModel, AutoIdentifiedModel, ValidatedIdentifier):
         if add_objs:
             ResourceDailyOpeningHours.objects.bulk_create(add_objs)
 
+        changed_hours = list(to_delete.items()) + list(to_add.items())
+        if changed_hours:
+            from .utilization import ResourceDailyUtilization
+            tz = self.unit.get_tz()
+            dates = set()
+            for opens, closes in changed_hours:
+                dates.add(opens.astimezone(tz).date())
+                dates.add(closes.astimezone(tz).date())
+            ResourceDailyUtilization.update_for_dates(self, dates)
+
     def is_admin(self, user):
         """
         Check if the given user is an administrator of this resource.
@@ -1120,9 +1177,15 @@ class ResourcePublishDate(models.Model):
 
 
     def _update_states(self):
-        self.resource.public = self._get_public()
-        self.resource.reservable = self.reservable
-        self.resource.save()
+        # runs on every Resource.objects access, so save only when the states
+        # change; every resource save invalidates the resource fragment cache
+        resource = self.resource
+        is_public = self._get_public()
+        if resource._public == is_public and resource.reservable == self.reservable:
+            return
+        resource._public = is_public
+        resource.reservable = self.reservable
+        resource.save(update_fields=['_public', 'reservable', 'modified_at'])
 
     def __str__(self):
         return f'{self.resource.name}: {self.format_begin_end()}'
@@ -1207,12 +1270,67 @@ class ResourceImage(ModifiableModel):
                 # lead to a more awkward API experience (having to first patch other
                 # images for the resource, then fix the last one).
                 other_main_images.update(type="other")
-        if not self.stamp:
+        # A new image file gets a new stamp so that cached derivatives are invalidated
+        image_changed = not self.stamp or (self.image and not self.image._committed)
+        if image_changed:
             stamp = generate_id()
             while ResourceImage.objects.filter(stamp=stamp).exists():
                 stamp = generate_id()
             self.stamp = stamp
-        return super(ResourceImage, self).save(*args, **kwargs)
+        ret = super(ResourceImage, self).save(*args, **kwargs)
+        if image_changed:
+            # generated after the commit, so that the transaction is not held open meanwhile
+            transaction.on_commit(self.generate_derivatives, using=kwargs.get('using'))
+        return ret
+
+    @staticmethod
+    def get_derivative_sizes():
+        """
+        Return the allowed derivative dimensions as a set of (width, height) tuples.
+        """
+        sizes = set()
+        for size in getattr(settings, 'RESPA_IMAGE_DERIVATIVE_SIZES', []):
+            width, height = size.split('x')
+            sizes.add((int(width), int(height)))
+        return sizes
+
+    def get_derivative(self, width, height, webp=False, generate=True):
+        """
+        Return a cropped thumbnail of the image, generating and storing it if needed.
+
+        :param webp: Return a WebP encoded derivative instead of JPEG/PNG
+        :param generate: Generate the derivative if it does not exist yet
+        :rtype: easy_thumbnails.files.ThumbnailFile|None
+        """
+        thumbnailer = get_thumbnailer(self.image)
+        if webp:
+            thumbnailer.thumbnail_preserve_extensions = False
+            thumbnailer.thumbnail_extension = 'webp'
+            thumbnailer.thumbnail_transparency_extension = 'webp'
+        return thumbnailer.get_thumbnail({
+            'size': (width, height),
+            'box': self.cropping,
+            'crop': True,
+            'detail': True,
+        }, generate=generate)
+
+    def generate_derivatives(self):
+        """
+        Generate all the allowed derivative sizes of the image, and their WebP
+        variants if enabled, so that they don't need to be generated on request.
+
+        This is done after a new image file has been saved, and by the
+        generate_image_derivatives command for images saved before that.
+        """
+        if not self.image:
+            return
+        webp_variants = [False, True] if getattr(settings, 'RESPA_IMAGE_WEBP_ENABLED', False) else [False]
+        for width, height in self.get_derivative_sizes():
+            for webp in webp_variants:
+                try:
+                    self.get_derivative(width, height, webp=webp)
+                except Exception:
+                    logger.exception('Could not generate %dx%d derivative for %s' % (width, height, self.image.name))
 
     def full_clean(self, exclude=(), validate_unique=True):
         if "image" not in exclude:
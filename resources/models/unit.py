@@ -7,7 +7,7 @@ from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from enumfields import EnumField
 
-from ..auth import is_authenticated_user, is_general_admin, is_unit_admin, is_unit_manager, is_unit_viewer, is_superuser
+from ..auth import get_authorization_profile, is_authenticated_user, is_general_admin, is_superuser
 from ..enums import UnitAuthorizationLevel, UnitGroupAuthorizationLevel
 from .base import AutoIdentifiedModel, ModifiableModel
 from .utils import create_datetime_days_from_now, get_translated, get_translated_name
@@ -182,15 +182,20 @@ class Unit(ModifiableModel, AutoIdentifiedModel):
         return create_datetime_days_from_now(self.reservable_min_days_in_advance)
 
     def is_admin(self, user):
-        return is_authenticated_user(user) and (
-            is_general_admin(user) or
-            is_unit_admin(user.unit_authorizations.all(), user.unit_group_authorizations.all(), self))
+        if not is_authenticated_user(user):
+            return False
+        if is_general_admin(user):
+            return True
+        profile = get_authorization_profile(user)
+        return UnitAuthorizationLevel.admin in profile.get_unit_levels(self.pk) or profile.is_unit_group_admin(self.pk)
 
     def is_manager(self, user):
-        return is_authenticated_user(user) and is_unit_manager(user.unit_authorizations.all(), self)
+        return is_authenticated_user(user) and \
+            UnitAuthorizationLevel.manager in get_authorization_profile(user).get_unit_levels(self.pk)
 
     def is_viewer(self, user):
-        return is_authenticated_user(user) and is_unit_viewer(user.unit_authorizations.all(), self)
+        return is_authenticated_user(user) and \
+            UnitAuthorizationLevel.viewer in get_authorization_profile(user).get_unit_levels(self.pk)
 
     def has_imported_data(self):
         return self.data_source != ''
@@ -219,8 +224,8 @@ class Unit(ModifiableModel, AutoIdentifiedModel):
             return None
         if user.is_superuser:
             return UnitAuthorizationLevel.admin
-        unit_auths = self.authorizations.filter(authorized=user)
-        return max(unit_auths).level if unit_auths else None
+        levels = get_authorization_profile(user).get_unit_levels(self.pk)
+        return max(levels) if levels else None
 
 
 class UnitAuthorizationQuerySet(models.QuerySet):
@@ -0,0 +1,118 @@
+import datetime
+
+from django.contrib.gis.db import models
+from django.utils.translation import gettext_lazy as _
+
+from .resource import Resource
+
+
+def _overlap_minutes(begin, end, window_begin, window_end):
+    overlap = min(end, window_end) - max(begin, window_begin)
+    return max(int(overlap.total_seconds() // 60), 0)
+
+
+class ResourceDailyUtilization(models.Model):
+    """
+    Reservation statistics of a resource for one day in the unit's time zone.
+
+    Kept up to date when reservations are saved and when the resource's
+    opening hours are recalculated, rebuilt with the rebuild_daily_utilization
+    management command.
+    """
+    resource = models.ForeignKey(
+        Resource, verbose_name=_('Resource'), related_name='daily_utilizations', on_delete=models.CASCADE
+    )
+    date = models.DateField(verbose_name=_('Date'))
+    reservation_count = models.PositiveIntegerField(verbose_name=_('Reservation count'), default=0)
+    booked_minutes = models.PositiveIntegerField(verbose_name=_('Booked minutes'), default=0)
+    open_minutes = models.PositiveIntegerField(verbose_name=_('Open minutes'), default=0)
+    cancelled_count = models.PositiveIntegerField(verbose_name=_('Cancelled reservation count'), default=0)
+    updated_at = models.DateTimeField(verbose_name=_('Time of update'), auto_now=True)
+
+    class Meta:
+        verbose_name = _('Resource daily utilization')
+        verbose_name_plural = _('Resource daily utilizations')
+        unique_together = [
+            ('resource', 'date')
+        ]
+        indexes = [
+            models.Index(fields=['date', 'resource'], name='resources_utilization_date_idx')
+        ]
+
+    def __str__(self):
+        return '%s: %s' % (self.resource, self.date)
+
+    @classmethod
+    def update_for_dates(cls, resource, dates):
+        """
+        Recalculate the rows of the given local dates of the resource.
+
+        :type resource: Resource
+        :type dates: iterable[datetime.date]
+        """
+        from .reservation import Reservation
+
+        dates = sorted(set(dates))
+        if not dates:
+            return
+
+        tz = resource.unit.get_tz()
+
+        def day_begin(date):
+            return tz.localize(datetime.datetime.combine(date, datetime.time.min))
+
+        rows = {date: cls(resource=resource, date=date) for date in dates}
+        begin = day_begin(dates[0])
+        end = day_begin(dates[-1] + datetime.timedelta(days=1))
+
+        def each_day(period_begin, period_end):
+            date = max(period_begin.astimezone(tz).date(), dates[0])
+            while date <= dates[-1]:
+                window_begin = day_begin(date)
+                if window_begin >= period_end:
+                    break
+                if date in rows:
+                    yield rows[date], window_begin, day_begin(date + datetime.timedelta(days=1))
+                date += datetime.timedelta(days=1)
+
+        reservations = resource.reservations.filter(
+            begin__lt=end, end__gt=begin, type=Reservation.TYPE_NORMAL
+        ).exclude(state=Reservation.DENIED).values_list('begin', 'end', 'state')
+        for rv_begin, rv_end, state in reservations:
+            begin_date = rv_begin.astimezone(tz).date()
+            if state == Reservation.CANCELLED:
+                if begin_date in rows:
+                    rows[begin_date].cancelled_count += 1
+                continue
+            if begin_date in rows:
+                rows[begin_date].reservation_count += 1
+            for row, window_begin, window_end in each_day(rv_begin, rv_end):
+                row.booked_minutes += _overlap_minutes(rv_begin, rv_end, window_begin, window_end)
+
+        opening_hours = resource.opening_hours.filter(
+            open_between__overlap=(begin, end, '[)')
+        ).values_list('open_between', flat=True)
+        for open_between in opening_hours:
+            for row, window_begin, window_end in each_day(open_between.lower, open_between.upper):
+                row.open_minutes += _overlap_minutes(
+                    open_between.lower, open_between.upper, window_begin, window_end
+                )
+
+        cls.objects.bulk_create(
+            rows.values(), update_conflicts=True, unique_fields=['resource', 'date'],
+            update_fields=['reservation_count', 'booked_minutes', 'open_minutes', 'cancelled_count', 'updated_at']
+        )
+
+    @classmethod
+    def update_for_period(cls, resource, begin, end):
+        """
+        Recalculate the rows of the local dates the given period touches.
+        """
+        tz = resource.unit.get_tz()
+        date = begin.astimezone(tz).date()
+        last = end.astimezone(tz).date()
+        dates = []
+        while date <= last:
+            dates.append(date)
+            date += datetime.timedelta(days=1)
+        cls.update_for_dates(resource, dates)
@@ -6,6 +6,7 @@ import time
 import io
 import logging
 from munigeo.models import Municipality
+import phonenumbers
 import pytz
 
 import arrow
@@ -753,3 +754,21 @@ def has_reservation_data_changed(data, instance) -> bool:
             return True
 
     return False
+
+
+def normalize_phone_number(phone_number):
+    """
+    Return the phone number in E.164 format, e.g. +358401234567.
+
+    Numbers without a country code are assumed to be from
+    RESPA_PHONE_NUMBER_DEFAULT_REGION. Numbers that cannot be parsed are
+    returned stripped of whitespace, so that they can still be matched exactly.
+    """
+    phone_number = (phone_number or '').strip()
+    if not phone_number:
+        return ''
+    try:
+        parsed = phonenumbers.parse(phone_number, settings.RESPA_PHONE_NUMBER_DEFAULT_REGION)
+    except phonenumbers.NumberParseException:
+        return ''.join(phone_number.split())
+    return phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.E164)
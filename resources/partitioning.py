@@ -0,0 +1,158 @@
+"""
+Maintenance of the partitions of the reservation table.
+
+Since migration 0161 resources_reservation is partitioned by range on the
+begin time, one partition per year. Reservations from before partitioning
+live in the resources_reservation_history partition and reservations that
+do not fall into any yearly partition end up in the default partition.
+
+The yearly partitions have to be created in advance with the
+create_reservation_partitions management command. Old partitions can be
+moved to cheaper storage with archive_reservation_partitions; they stay
+attached, so reports and the API still see the reservations in them.
+"""
+import datetime
+import logging
+import re
+
+from django.db import connection, transaction
+from django.utils.dateparse import parse_datetime
+
+logger = logging.getLogger(__name__)
+
+TABLE = 'resources_reservation'
+DEFAULT_PARTITION = '%s_default' % TABLE
+
+BOUND_RE = re.compile(r"FROM \((?:'([^']+)'|MINVALUE)\) TO \((?:'([^']+)'|MAXVALUE)\)")
+
+
+class Partition:
+    def __init__(self, name, start, end, tablespace):
+        self.name = name
+        # None stands for an unbounded start or end
+        self.start = start
+        self.end = end
+        self.tablespace = tablespace
+
+    @property
+    def is_default(self):
+        return self.name == DEFAULT_PARTITION
+
+    def __repr__(self):
+        return '<Partition %s [%s, %s)>' % (self.name, self.start, self.end)
+
+
+def get_partition_name(year):
+    return '%s_y%d' % (TABLE, year)
+
+
+def get_partitions():
+    """
+    Return the partitions of the reservation table ordered by their start.
+
+    :rtype: list[Partition]
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), t.spcname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            LEFT JOIN pg_tablespace t ON t.oid = c.reltablespace
+            WHERE i.inhparent = %s::regclass
+        """, [TABLE])
+        rows = cursor.fetchall()
+
+    partitions = []
+    for name, bound, tablespace in rows:
+        match = BOUND_RE.search(bound)
+        start = end = None
+        if match:
+            start = parse_datetime(match.group(1)) if match.group(1) else None
+            end = parse_datetime(match.group(2)) if match.group(2) else None
+        partitions.append(Partition(name, start, end, tablespace))
+
+    def sort_key(partition):
+        if partition.is_default:
+            return (2, datetime.datetime.max)
+        if partition.start is None:
+            return (0, datetime.datetime.min)
+        return (1, partition.start.replace(tzinfo=None))
+    return sorted(partitions, key=sort_key)
+
+
+@transaction.atomic
+def create_partition(year):
+    """
+    Create the partition of the given year.
+
+    Reservations of the year that have already been saved to the default
+    partition are moved to the new partition. The default partition is
+    detached meanwhile, which locks the whole reservation table, so the
+    partitions should be created ahead of time while the default partition
+    is still empty.
+    """
+    name = get_partition_name(year)
+    start = datetime.datetime(year, 1, 1, tzinfo=datetime.timezone.utc)
+    end = datetime.datetime(year + 1, 1, 1, tzinfo=datetime.timezone.utc)
+    condition = '"begin" >= %s AND "begin" < %s'
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute('ALTER TABLE %s DETACH PARTITION %s' % (qn(TABLE), qn(DEFAULT_PARTITION)))
+        cursor.execute(
+            'CREATE TABLE %s PARTITION OF %s FOR VALUES FROM (%%s) TO (%%s)' % (qn(name), qn(TABLE)), [start, end]
+        )
+        cursor.execute(
+            'INSERT INTO %s SELECT * FROM %s WHERE %s' % (qn(name), qn(DEFAULT_PARTITION), condition), [start, end]
+        )
+        moved = cursor.rowcount
+        cursor.execute('DELETE FROM %s WHERE %s' % (qn(DEFAULT_PARTITION), condition), [start, end])
+        cursor.execute('ALTER TABLE %s ATTACH PARTITION %s DEFAULT' % (qn(TABLE), qn(DEFAULT_PARTITION)))
+    logger.info('Created reservation partition %s, moved %d reservations to it.' % (name, moved))
+    return name
+
+
+def ensure_partitions(years_ahead=2, today=None):
+    """
+    Make sure that the partitions from the current year up to years_ahead
+    years from now exist.
+
+    :return: names of the created partitions
+    :rtype: list[str]
+    """
+    today = today or datetime.date.today()
+    existing = set(partition.name for partition in get_partitions())
+    created = []
+    for year in range(today.year, today.year + years_ahead + 1):
+        if get_partition_name(year) not in existing:
+            created.append(create_partition(year))
+    return created
+
+
+def archive_partitions(before, tablespace, dry_run=False):
+    """
+    Move the partitions that end before the given datetime and their
+    indexes to the given tablespace.
+
+    :return: the archived partitions
+    :rtype: list[Partition]
+    """
+    partitions = [
+        partition for partition in get_partitions()
+        if not partition.is_default and partition.end is not None and partition.end <= before and
+        partition.tablespace != tablespace
+    ]
+    if dry_run:
+        return partitions
+
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        for partition in partitions:
+            cursor.execute('ALTER TABLE %s SET TABLESPACE %s' % (qn(partition.name), qn(tablespace)))
+            cursor.execute("""
+                SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+                WHERE i.indrelid = %s::regclass
+            """, [partition.name])
+            for (index_name,) in cursor.fetchall():
+                cursor.execute('ALTER INDEX %s SET TABLESPACE %s' % (qn(index_name), qn(tablespace)))
+            logger.info('Moved reservation partition %s to tablespace %s.' % (partition.name, tablespace))
+    return partitions
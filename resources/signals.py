@@ -1,6 +1,11 @@
 import django.dispatch
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
 
+from resources.auth import clear_authorization_profiles
+
 reservation_confirmed = django.dispatch.Signal(['instance', 'user'])
 reservation_modified = django.dispatch.Signal(['instance', 'user'])
 reservation_cancelled = django.dispatch.Signal(['instance', 'user'])
@@ -25,3 +30,207 @@ def handle_reservation_modified(sender, instance, user, **kwargs):
 
     if instance.resource.configuration:
         instance.resource.configuration.handle_modify(instance)
+
+
+def _update_daily_utilization(instance, periods):
+    from resources.models import ResourceDailyUtilization
+
+    def update():
+        # read the saved period after commit, the instance may still hold unparsed values
+        current = type(instance).objects.filter(pk=instance.pk).values_list('begin', 'end').first()
+        instance._loaded_period = current
+        for begin, end in set(periods + [current] if current else periods):
+            ResourceDailyUtilization.update_for_period(instance.resource, begin, end)
+    transaction.on_commit(update, robust=True)
+
+
+@receiver(post_save, sender='resources.Reservation')
+def handle_reservation_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    loaded_period = getattr(instance, '_loaded_period', None)
+    _update_daily_utilization(instance, [loaded_period] if loaded_period else [])
+
+
+@receiver(post_delete, sender='resources.Reservation')
+def handle_reservation_deleted(sender, instance, **kwargs):
+    loaded_period = getattr(instance, '_loaded_period', None)
+    if loaded_period:
+        _update_daily_utilization(instance, [loaded_period])
+
+
+# models the cached resource representations are built from, see resources.fragment_cache
+RESOURCE_FRAGMENT_MODELS = (
+    'Resource', 'ResourceImage', 'ResourceEquipment', 'Equipment', 'Purpose', 'ResourceType', 'TermsOfUse',
+    'ResourceTag', 'CleanResourceID', 'ResourceUniversalField', 'ResourceUniversalFormOption',
+    'UniversalFormFieldType', 'ReservationMetadataSet', 'ReservationMetadataField',
+    'ReservationHomeMunicipalitySet', 'ReservationHomeMunicipalityField', 'Unit',
+)
+
+
+def invalidate_resource_fragments(sender, **kwargs):
+    from resources import fragment_cache
+
+    if kwargs.get('raw'):
+        return
+    fragment_cache.invalidate()
+
+
+for model_name in RESOURCE_FRAGMENT_MODELS:
+    post_save.connect(invalidate_resource_fragments, sender='resources.%s' % model_name,
+                      dispatch_uid='resource_fragment_save_%s' % model_name)
+    post_delete.connect(invalidate_resource_fragments, sender='resources.%s' % model_name,
+                        dispatch_uid='resource_fragment_delete_%s' % model_name)
+
+
+@receiver(m2m_changed)
+def handle_resource_fragment_m2m_changed(sender, instance, action, **kwargs):
+    # favorites do not affect the cached fields, is_favorite is computed per request
+    if not action.startswith('post_') or sender._meta.app_label != 'resources':
+        return
+    if instance._meta.app_label == 'resources' and instance._meta.object_name in RESOURCE_FRAGMENT_MODELS:
+        invalidate_resource_fragments(sender)
+
+
+def _invalidate_permission_index(users=None):
+    from resources.models import ResourcePermissionIndex
+
+    ResourcePermissionIndex.invalidate(users)
+
+
+@receiver([post_save, post_delete], sender='resources.UnitAuthorization')
+@receiver([post_save, post_delete], sender='resources.UnitGroupAuthorization')
+def handle_authorization_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    clear_authorization_profiles()
+    _invalidate_permission_index([instance.authorized_id])
+
+
+@receiver([post_save, post_delete], sender='guardian.UserObjectPermission')
+@receiver([post_save, post_delete], sender='guardian.GroupObjectPermission')
+def handle_object_permission_changed(sender, instance, raw=False, **kwargs):
+    from django.contrib.contenttypes.models import ContentType
+
+    if raw:
+        return
+    content_type = ContentType.objects.get_for_id(instance.content_type_id)
+    if content_type.app_label != 'resources' or content_type.model not in ('unit', 'resourcegroup'):
+        return
+    # group permissions concern all the members of the group
+    _invalidate_permission_index([instance.user_id] if hasattr(instance, 'user_id') else None)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def handle_user_saved(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+    # superuser and general admin status affect the permissions, logins only update last_login
+    if raw or created or (update_fields and set(update_fields) <= {'last_login'}):
+        return
+    _invalidate_permission_index([instance.pk])
+
+
+@receiver(post_save, sender='resources.Unit')
+def handle_unit_saved(sender, instance, created=False, raw=False, **kwargs):
+    # superusers and general admins have permissions on every unit
+    if created and not raw:
+        _invalidate_permission_index()
+
+
+@receiver(post_delete, sender='resources.UnitGroup')
+@receiver(post_delete, sender='resources.ResourceGroup')
+def handle_permission_group_deleted(sender, instance, **kwargs):
+    clear_authorization_profiles()
+    _invalidate_permission_index()
+
+
+@receiver(m2m_changed)
+def handle_permission_m2m_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.models import Group
+    from resources.models import ResourceGroup, UnitGroup
+
+    if not action.startswith('post_'):
+        return
+    user_model = get_user_model()
+    if sender in (user_model.groups.through, user_model.user_permissions.through):
+        if not reverse:
+            _invalidate_permission_index([instance.pk])
+        else:
+            _invalidate_permission_index(pk_set or None)
+    elif sender in (Group.permissions.through, UnitGroup.members.through, ResourceGroup.resources.through):
+        clear_authorization_profiles()
+        _invalidate_permission_index()
+
+
+def _refresh_accessibility_orders(resources, deleted=False):
+    from resources.models import ResourceAccessibilityOrder
+
+    if deleted:
+        # the resources themselves may be being deleted in the same cascade
+        transaction.on_commit(lambda: ResourceAccessibilityOrder.refresh(resources))
+    else:
+        ResourceAccessibilityOrder.refresh(resources)
+
+
+@receiver([post_save, post_delete], sender='resources.ResourceAccessibility')
+def handle_resource_accessibility_changed(sender, instance, signal, raw=False, **kwargs):
+    from resources.models import Resource
+
+    if raw:
+        return
+    _refresh_accessibility_orders(Resource.objects.filter(pk=instance.resource_id), deleted=signal is post_delete)
+
+
+@receiver(post_save, sender='resources.Resource')
+def handle_resource_unit_changed(sender, instance, created=False, raw=False, **kwargs):
+    from resources.models import Resource
+
+    if raw:
+        return
+    # the ordering depends on the unit's accessibility, so only new and moved resources need a refresh
+    if not created and hasattr(instance, '_loaded_unit_id') and instance._loaded_unit_id == instance.unit_id:
+        return
+    instance._loaded_unit_id = instance.unit_id
+    _refresh_accessibility_orders(Resource.objects.filter(pk=instance.pk))
+
+
+@receiver([post_save, post_delete], sender='resources.UnitAccessibility')
+def handle_unit_accessibility_changed(sender, instance, signal, raw=False, **kwargs):
+    from resources.models import Resource
+
+    if raw:
+        return
+    _refresh_accessibility_orders(Resource.objects.filter(unit=instance.unit_id), deleted=signal is post_delete)
+
+
+@receiver([post_save, post_delete], sender='resources.Reservation')
+def record_reservation_change(sender, instance, signal, created=False, raw=False, **kwargs):
+    from resources.models import ChangeFeedEntry
+
+    if raw:
+        return
+    if signal is post_delete:
+        action = ChangeFeedEntry.DELETED
+    else:
+        action = ChangeFeedEntry.CREATED if created else ChangeFeedEntry.UPDATED
+    ChangeFeedEntry.record(ChangeFeedEntry.RESERVATION, instance.pk, action, resource_id=instance.resource_id)
+
+
+@receiver([post_save, post_delete], sender='resources.Period')
+@receiver([post_save, post_delete], sender='resources.Day')
+def record_opening_hours_change(sender, instance, signal, raw=False, **kwargs):
+    from resources.models import ChangeFeedEntry, Day, Period
+
+    if raw:
+        return
+    if isinstance(instance, Day):
+        # the period may already be gone when its days are deleted in a cascade
+        period = Period.objects.filter(pk=instance.period_id).values('id', 'resource_id', 'unit_id').first()
+        if period is None:
+            return
+    else:
+        period = {'id': instance.pk, 'resource_id': instance.resource_id, 'unit_id': instance.unit_id}
+    ChangeFeedEntry.record(
+        ChangeFeedEntry.OPENING_HOURS, period['id'], ChangeFeedEntry.UPDATED,
+        resource_id=period['resource_id'], unit_id=period['unit_id']
+    )
@@ -0,0 +1,72 @@
+from unittest import mock
+
+import pytest
+from django.core import management
+from django.test import override_settings
+
+from resources.management.commands.accessibility_import import Command
+from resources.models import ResourceAccessibility, ResourceAccessibilityOrder, UnitAccessibility, UnitIdentifier
+
+API_URL = 'https://accessibility.example.com'
+
+
+def get_api_data(resource, unit_servicepoint_id):
+    return {
+        API_URL + '/api/v1/accessibility/viewpoints': [
+            {'viewpointId': 0, 'viewpointOrderText': '0', 'names': []},
+            {'viewpointId': 10, 'viewpointOrderText': '10',
+             'names': [{'language': 'en', 'value': 'I am a wheelchair user'}]},
+        ],
+        API_URL + '/api/v1/accessibility/targets/system/summary': [
+            {'servicePointId': resource.id, 'viewpointId': 10, 'isAccessible': 'green'},
+            {'servicePointId': 'unknown', 'viewpointId': 10, 'isAccessible': 'green'},
+            {'servicePointId': resource.id, 'viewpointId': 99, 'isAccessible': 'green'},
+        ],
+        API_URL + '/api/v1/accessibility/servicepoints/unit-system/%s/summary' % unit_servicepoint_id: [
+            {'viewpointId': 10, 'isAccessible': 'red'},
+        ],
+    }
+
+
+@pytest.mark.django_db
+@override_settings(RESPA_ACCESSIBILITY_API_SYSTEM_ID='system', RESPA_ACCESSIBILITY_API_UNIT_SYSTEM_ID='unit-system')
+def test_accessibility_import(resource_in_unit):
+    UnitIdentifier.objects.create(unit=resource_in_unit.unit, namespace='internal', value='123')
+    api_data = get_api_data(resource_in_unit, '123')
+
+    with mock.patch.object(Command, 'make_request', side_effect=lambda url: api_data[url]):
+        management.call_command('accessibility_import', url=API_URL)
+
+    resource_accessibility = ResourceAccessibility.objects.get(resource=resource_in_unit)
+    assert resource_accessibility.viewpoint_id == '10'
+    assert resource_accessibility.value.value == 'green'
+    assert resource_accessibility.order == 10
+    assert UnitAccessibility.objects.get(unit=resource_in_unit.unit).order == -10
+    assert ResourceAccessibilityOrder.objects.get(resource=resource_in_unit, viewpoint_id='10').order == -10
+
+    # unchanged rows are not written again
+    api_data[API_URL + '/api/v1/accessibility/targets/system/summary'][0]['isAccessible'] = 'red'
+    with mock.patch.object(Command, 'make_request', side_effect=lambda url: api_data[url]):
+        management.call_command('accessibility_import', url=API_URL)
+
+    assert ResourceAccessibility.objects.get(pk=resource_accessibility.pk).order == -10
+    assert UnitAccessibility.objects.get(unit=resource_in_unit.unit).modified_at < \
+        ResourceAccessibility.objects.get(pk=resource_accessibility.pk).modified_at
+
+
+@pytest.mark.django_db
+@override_settings(RESPA_ACCESSIBILITY_API_SYSTEM_ID='system', RESPA_ACCESSIBILITY_API_UNIT_SYSTEM_ID='unit-system')
+def test_accessibility_import_failure_does_not_write(resource_in_unit):
+    UnitIdentifier.objects.create(unit=resource_in_unit.unit, namespace='internal', value='123')
+    api_data = get_api_data(resource_in_unit, '123')
+
+    def make_request(url):
+        if 'servicepoints' in url:
+            raise ValueError('invalid JSON')
+        return api_data[url]
+
+    with mock.patch.object(Command, 'make_request', side_effect=make_request):
+        with pytest.raises(ValueError):
+            management.call_command('accessibility_import', url=API_URL)
+
+    assert not ResourceAccessibility.objects.exists()
@@ -0,0 +1,105 @@
+import pytest
+
+from resources.models import (
+    AccessibilityValue, Resource, ResourceAccessibility, ResourceAccessibilityOrder, UnitAccessibility
+)
+
+
+def get_orders(resource):
+    return dict(
+        ResourceAccessibilityOrder.objects.filter(resource=resource).values_list('viewpoint_id', 'order')
+    )
+
+
+@pytest.mark.django_db
+def test_accessibility_order_refresh(resource_with_accessibility_data, accessibility_viewpoint_wheelchair,
+                                     accessibility_viewpoint_hearing):
+    # the worse of the resource's and its unit's accessibility counts
+    assert get_orders(resource_with_accessibility_data) == {
+        accessibility_viewpoint_wheelchair.pk: 10,
+        accessibility_viewpoint_hearing.pk: -10,
+    }
+
+    ResourceAccessibilityOrder.objects.all().delete()
+    ResourceAccessibilityOrder.refresh()
+    assert get_orders(resource_with_accessibility_data) == {
+        accessibility_viewpoint_wheelchair.pk: 10,
+        accessibility_viewpoint_hearing.pk: -10,
+    }
+
+
+@pytest.mark.django_db
+def test_accessibility_order_resource_accessibility_changed(django_capture_on_commit_callbacks,
+                                                            resource_with_accessibility_data,
+                                                            accessibility_viewpoint_wheelchair,
+                                                            accessibility_value_red):
+    resource_accessibility = ResourceAccessibility.objects.get(
+        resource=resource_with_accessibility_data, viewpoint=accessibility_viewpoint_wheelchair
+    )
+    resource_accessibility.value = accessibility_value_red
+    resource_accessibility.save()
+    assert get_orders(resource_with_accessibility_data)[accessibility_viewpoint_wheelchair.pk] == -10
+
+    # deletions are refreshed after the commit
+    with django_capture_on_commit_callbacks(execute=True):
+        resource_accessibility.delete()
+    assert get_orders(resource_with_accessibility_data)[accessibility_viewpoint_wheelchair.pk] == 10
+
+
+@pytest.mark.django_db
+def test_accessibility_order_unit_accessibility_changed(resource_with_accessibility_data,
+                                                        accessibility_viewpoint_wheelchair, accessibility_value_red):
+    unit_accessibility = UnitAccessibility.objects.get(
+        unit=resource_with_accessibility_data.unit, viewpoint=accessibility_viewpoint_wheelchair
+    )
+    unit_accessibility.value = accessibility_value_red
+    unit_accessibility.save()
+    assert get_orders(resource_with_accessibility_data)[accessibility_viewpoint_wheelchair.pk] == -10
+
+
+@pytest.mark.django_db
+def test_accessibility_order_value_changed(resource_with_accessibility_data, accessibility_viewpoint_wheelchair,
+                                           accessibility_viewpoint_hearing):
+    value = AccessibilityValue.objects.get(value='red')
+    value.order = -20
+    value.save()
+    assert get_orders(resource_with_accessibility_data) == {
+        accessibility_viewpoint_wheelchair.pk: 10,
+        accessibility_viewpoint_hearing.pk: -20,
+    }
+
+
+@pytest.mark.django_db
+def test_accessibility_order_resource_moved(resource_with_accessibility_data, resource_in_unit2,
+                                            accessibility_viewpoint_wheelchair, accessibility_value_red):
+    UnitAccessibility.objects.create(
+        unit=resource_in_unit2.unit,
+        viewpoint=accessibility_viewpoint_wheelchair,
+        value=accessibility_value_red
+    )
+
+    # saving a resource without moving it does not refresh its ordering
+    resource = Resource.objects.get(pk=resource_with_accessibility_data.pk)
+    ResourceAccessibilityOrder.objects.filter(resource=resource).delete()
+    resource.save()
+    assert get_orders(resource) == {}
+
+    resource.unit = resource_in_unit2.unit
+    resource.save()
+    assert get_orders(resource)[accessibility_viewpoint_wheelchair.pk] == -10
+
+
+@pytest.mark.django_db
+def test_accessibility_order_resource_created(resource_with_accessibility_data, space_resource_type,
+                                              accessibility_viewpoint_wheelchair, accessibility_viewpoint_hearing):
+    # a new resource gets the accessibility of its unit
+    resource = Resource.objects.create(
+        type=space_resource_type,
+        authentication='none',
+        name='new resource',
+        unit=resource_with_accessibility_data.unit,
+    )
+    assert get_orders(resource) == {
+        accessibility_viewpoint_wheelchair.pk: 10,
+        accessibility_viewpoint_hearing.pk: 10,
+    }
@@ -0,0 +1,50 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from resources.auth import (
+    AuthorizationProfileMiddleware, has_any_auth_equal_or_higher, has_auth_level, is_any_admin, is_any_manager
+)
+from resources.enums import UnitAuthorizationLevel, UnitGroupAuthorizationLevel
+from resources.models import UnitGroup
+
+
+@pytest.mark.django_db
+def test_authorization_profile_helpers(user, test_unit, test_unit2):
+    assert not is_any_admin(user)
+    assert not is_any_manager(user)
+
+    user.unit_authorizations.create(subject=test_unit, level=UnitAuthorizationLevel.manager)
+    assert is_any_manager(user)
+    assert not is_any_admin(user)
+    assert has_any_auth_equal_or_higher(user, UnitAuthorizationLevel.viewer)
+    assert not has_any_auth_equal_or_higher(user, UnitAuthorizationLevel.admin)
+    assert test_unit.is_manager(user)
+    assert not test_unit2.is_manager(user)
+    assert test_unit.get_highest_authorization_level_for_user(user) == UnitAuthorizationLevel.manager
+
+    unit_group = UnitGroup.objects.create(name='test group')
+    unit_group.members.add(test_unit2)
+    user.unit_group_authorizations.create(subject=unit_group, level=UnitGroupAuthorizationLevel.admin)
+    assert is_any_admin(user)
+    assert has_auth_level(user, UnitGroupAuthorizationLevel.admin)
+    assert test_unit2.is_admin(user)
+    assert not test_unit.is_admin(user)
+
+
+@pytest.mark.django_db
+def test_authorization_profile_is_memoized_per_request(rf, user, test_unit):
+    user.unit_authorizations.create(subject=test_unit, level=UnitAuthorizationLevel.admin)
+    results = {}
+
+    def view(request):
+        with CaptureQueriesContext(connection) as context:
+            results['is_admin'] = is_any_admin(user) and test_unit.is_admin(user) and is_any_admin(user)
+        results['queries'] = len(context)
+        user.unit_authorizations.all().delete()
+        results['is_admin_after_delete'] = is_any_admin(user)
+
+    AuthorizationProfileMiddleware(view)(rf.get('/'))
+    assert results['is_admin']
+    assert results['queries'] == 2
+    assert not results['is_admin_after_delete']
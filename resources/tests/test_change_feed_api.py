@@ -0,0 +1,104 @@
+import pytest
+from django.urls import reverse
+
+from resources.models import ChangeFeedEntry, Period, Reservation, Resource
+
+
+@pytest.fixture
+def list_url():
+    return reverse('changes-list')
+
+
+def create_reservation(resource, user):
+    return Reservation.objects.create(
+        resource=resource,
+        begin='2115-04-04T09:00:00+02:00',
+        end='2115-04-04T10:00:00+02:00',
+        user=user,
+        state=Reservation.CONFIRMED
+    )
+
+
+@pytest.mark.django_db
+def test_change_feed_records_changes(django_capture_on_commit_callbacks, resource_in_unit, user):
+    with django_capture_on_commit_callbacks(execute=True):
+        reservation = create_reservation(resource_in_unit, user)
+    with django_capture_on_commit_callbacks(execute=True):
+        reservation.delete()
+    with django_capture_on_commit_callbacks(execute=True):
+        Period.objects.create(unit=resource_in_unit.unit, start='2115-01-01', end='2115-12-31')
+
+    entries = list(ChangeFeedEntry.objects.values_list('object_type', 'action', 'resource', 'unit'))
+    assert entries == [
+        (ChangeFeedEntry.RESERVATION, ChangeFeedEntry.CREATED, resource_in_unit.pk, resource_in_unit.unit_id),
+        (ChangeFeedEntry.RESERVATION, ChangeFeedEntry.DELETED, resource_in_unit.pk, resource_in_unit.unit_id),
+        (ChangeFeedEntry.OPENING_HOURS, ChangeFeedEntry.UPDATED, None, resource_in_unit.unit_id),
+    ]
+
+
+@pytest.mark.django_db
+def test_change_feed_recorded_after_commit(django_capture_on_commit_callbacks, resource_in_unit, user):
+    with django_capture_on_commit_callbacks(execute=False):
+        create_reservation(resource_in_unit, user)
+    assert not ChangeFeedEntry.objects.exists()
+
+
+@pytest.mark.django_db
+def test_change_feed_list(django_capture_on_commit_callbacks, api_client, list_url, resource_in_unit,
+                          resource_in_unit2, user):
+    response = api_client.get(list_url)
+    assert response.status_code == 200
+    assert response.data == {'last': 0, 'more': False, 'results': []}
+
+    with django_capture_on_commit_callbacks(execute=True):
+        reservation = create_reservation(resource_in_unit, user)
+        create_reservation(resource_in_unit2, user)
+
+    response = api_client.get(list_url, {'since': 0, 'limit': 1})
+    assert response.status_code == 200
+    assert response.data['more']
+    assert [(entry['object_id'], entry['action']) for entry in response.data['results']] == [
+        (str(reservation.pk), ChangeFeedEntry.CREATED)
+    ]
+
+    response = api_client.get(list_url, {'since': response.data['last']})
+    assert not response.data['more']
+    assert [entry['resource'] for entry in response.data['results']] == [resource_in_unit2.pk]
+
+    response = api_client.get(list_url, {'since': 0, 'resource': resource_in_unit2.pk})
+    assert [entry['resource'] for entry in response.data['results']] == [resource_in_unit2.pk]
+
+    # the changes of hidden resources are skipped, but the position still advances
+    last = response.data['last']
+    Resource.objects.filter(pk=resource_in_unit2.pk).update(_public=False)
+    response = api_client.get(list_url, {'since': 0, 'resource': resource_in_unit2.pk})
+    assert response.data['results'] == []
+    assert response.data['last'] == last
+
+
+@pytest.mark.django_db
+def test_change_feed_invalid_since(api_client, list_url):
+    response = api_client.get(list_url, {'since': 'foo'})
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_change_feed_long_poll_disabled(api_client, list_url):
+    response = api_client.get(reverse('changes-stream'))
+    assert response.status_code == 404
+
+    # the wait is ignored
+    response = api_client.get(list_url, {'since': 0, 'wait': 10})
+    assert response.status_code == 200
+    assert response.data['results'] == []
+
+
+@pytest.mark.django_db
+def test_change_feed_long_poll_connection_limit(api_client, list_url, settings):
+    settings.RESPA_CHANGE_FEED_LONG_POLL_ENABLED = True
+    settings.RESPA_CHANGE_FEED_MAX_CONNECTIONS = 0
+
+    response = api_client.get(list_url, {'since': 0, 'wait': 1})
+    assert response.status_code == 429
+    response = api_client.get(reverse('changes-stream'))
+    assert response.status_code == 429
@@ -0,0 +1,93 @@
+import datetime
+from unittest.mock import patch
+
+import pytest
+from django.db.models.signals import post_save, pre_save
+from django.utils import timezone
+
+from resources.importer import kirjastot
+from resources.importer.base import Importer
+from resources.models import Unit, UnitIdentifier
+
+
+class DummyImporter(Importer):
+    name = 'dummy'
+
+
+@pytest.fixture
+def unit_signals():
+    sent = []
+
+    def receiver(signal, sender, instance, update_fields, **kwargs):
+        sent.append((signal, instance.pk, update_fields))
+
+    pre_save.connect(receiver, sender=Unit, dispatch_uid='test_importer_pre_save')
+    post_save.connect(receiver, sender=Unit, dispatch_uid='test_importer_post_save')
+    yield sent
+    pre_save.disconnect(sender=Unit, dispatch_uid='test_importer_pre_save')
+    post_save.disconnect(sender=Unit, dispatch_uid='test_importer_post_save')
+
+
+@pytest.mark.django_db
+def test_importer_deferred_saves(test_unit, unit_signals):
+    UnitIdentifier.objects.create(unit=test_unit, namespace='kirkanta', value='1')
+    importer = DummyImporter({})
+    data = {
+        'id': test_unit.pk,
+        'name': {'fi': 'uusi nimi'},
+        'identifiers': [
+            {'namespace': 'kirkanta', 'value': '2'},
+            {'namespace': 'helmet', 'value': 'H1'},
+        ],
+    }
+    unit = importer.save_unit(data, Unit.objects.get(pk=test_unit.pk))
+    # the changes of existing objects are written only when flushed
+    test_unit.refresh_from_db()
+    assert test_unit.name_fi == 'unit'
+    assert not unit_signals
+
+    importer.flush_saves()
+    test_unit.refresh_from_db()
+    assert test_unit.name_fi == 'uusi nimi'
+    assert test_unit.modified_at == unit.modified_at
+    assert dict(test_unit.identifiers.values_list('namespace', 'value')) == {'kirkanta': '2', 'helmet': 'H1'}
+
+    # the save signals are sent for the updated objects
+    assert [(signal, pk) for signal, pk, __ in unit_signals] == [(pre_save, test_unit.pk), (post_save, test_unit.pk)]
+    update_fields = unit_signals[0][2]
+    assert 'name_fi' in update_fields and 'modified_at' in update_fields
+
+    # nothing is left to flush
+    unit_signals.clear()
+    importer.flush_saves()
+    assert not unit_signals
+
+
+@pytest.mark.django_db
+def test_kirjastot_import_updates_opening_hours(resource_in_unit, test_unit2):
+    unit = resource_in_unit.unit
+    UnitIdentifier.objects.create(unit=unit, namespace=kirjastot.KIRKANTA_NAMESPACE, value='1')
+    UnitIdentifier.objects.create(unit=test_unit2, namespace=kirjastot.KIRKANTA_NAMESPACE, value='2')
+    library = {'schedules': [{
+        'date': '2115-04-04',
+        'closed': False,
+        'info': '',
+        'times': [{'status': kirjastot.STAFFED_HOURS, 'from': '09:00', 'to': '17:00'}],
+    }]}
+
+    def timetable_fetcher(unit, start, end):
+        if unit.pk == test_unit2.pk:
+            raise Exception('fetch failed')
+        return library
+
+    # a failed fetch of one library does not prevent importing the others
+    with patch.object(kirjastot, 'timetable_fetcher', timetable_fetcher):
+        kirjastot.process_varaamo_libraries()
+
+    assert unit.periods.count() == 1
+    opening_hours = list(resource_in_unit.opening_hours.all())
+    assert len(opening_hours) == 1
+    opens = timezone.localtime(opening_hours[0].open_between.lower, unit.get_tz())
+    assert opens.date() == datetime.date(2115, 4, 4)
+    assert opens.time() == datetime.time(9, 0)
+    assert not test_unit2.periods.exists()
@@ -0,0 +1,51 @@
+import datetime
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+
+from resources.models import Reservation
+from resources.partitioning import DEFAULT_PARTITION, archive_partitions, get_partition_name, get_partitions
+
+
+def get_partition_of(reservation):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT tableoid::regclass::text FROM resources_reservation WHERE id = %s', [reservation.pk])
+        return cursor.fetchone()[0]
+
+
+@pytest.mark.django_db
+def test_reservations_are_partitioned_by_begin(resource_in_unit, user):
+    this_year = datetime.date.today().year
+    names = [partition.name for partition in get_partitions()]
+    assert names[-1] == DEFAULT_PARTITION
+    for year in range(this_year, this_year + 3):
+        assert get_partition_name(year) in names
+
+    begin = datetime.datetime(this_year + 1, 3, 1, 10, tzinfo=datetime.timezone.utc)
+    reservation = Reservation.objects.create(
+        resource=resource_in_unit, begin=begin, end=begin + datetime.timedelta(hours=1), user=user
+    )
+    assert get_partition_of(reservation) == get_partition_name(this_year + 1)
+
+    far_begin = datetime.datetime(this_year + 5, 3, 1, 10, tzinfo=datetime.timezone.utc)
+    far_reservation = Reservation.objects.create(
+        resource=resource_in_unit, begin=far_begin, end=far_begin + datetime.timedelta(hours=1), user=user
+    )
+    assert get_partition_of(far_reservation) == DEFAULT_PARTITION
+
+    # creating the partition moves the reservations of the year from the default partition
+    call_command('create_reservation_partitions', years_ahead=5)
+    assert get_partition_of(far_reservation) == get_partition_name(this_year + 5)
+    assert Reservation.objects.filter(begin__year=this_year + 5).count() == 1
+
+
+@pytest.mark.django_db
+def test_archive_partitions_dry_run():
+    this_year = datetime.date.today().year
+    before = datetime.datetime(this_year + 2, 1, 1, tzinfo=datetime.timezone.utc)
+    names = [partition.name for partition in archive_partitions(before, 'archive', dry_run=True)]
+    assert get_partition_name(this_year) in names
+    assert get_partition_name(this_year + 1) in names
+    assert get_partition_name(this_year + 2) not in names
+    assert DEFAULT_PARTITION not in names
@@ -0,0 +1,75 @@
+import pytest
+from django.core.cache import cache
+from django.urls import reverse
+
+from resources.models import Resource
+from respa import replica
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+
+@pytest.fixture
+def replica_reads(monkeypatch):
+    """
+    Pretend that a replica is configured and record the requests routed to it.
+    """
+    calls = []
+    monkeypatch.setattr(replica, 'is_replica_configured', lambda: True)
+    monkeypatch.setattr(replica, 'use_replica', lambda: calls.append(True))
+    return calls
+
+
+def test_router():
+    router = replica.ReplicaRouter()
+    assert router.db_for_read(Resource) == 'default'
+    token = replica._use_replica.set(True)
+    try:
+        assert router.db_for_read(Resource) == 'replica'
+        assert router.db_for_write(Resource) == 'default'
+    finally:
+        replica._use_replica.reset(token)
+    assert router.allow_migrate('default', 'resources')
+    assert not router.allow_migrate('replica', 'resources')
+
+
+@pytest.mark.django_db
+def test_safe_requests_use_replica(api_client, resource_in_unit, replica_reads):
+    response = api_client.get(reverse('resource-list'))
+    assert response.status_code == 200
+    assert len(replica_reads) == 1
+
+    response = api_client.get(reverse('unit-list'))
+    assert response.status_code == 200
+    assert len(replica_reads) == 2
+
+    # views not marked with ReadReplicaMixin keep reading from the primary
+    response = api_client.get(reverse('reservation-list'))
+    assert response.status_code == 200
+    assert len(replica_reads) == 2
+
+
+@pytest.mark.django_db
+def test_writes_pin_to_primary(user_api_client, user, resource_in_unit, replica_reads):
+    url = reverse('resource-favorite', kwargs={'pk': resource_in_unit.pk})
+    response = user_api_client.post(url)
+    assert response.status_code == 201
+    assert replica.PIN_COOKIE_NAME in response.cookies
+    assert cache.get('%s:%s' % (replica.PIN_CACHE_PREFIX, user.pk))
+
+    response = user_api_client.get(reverse('resource-list'))
+    assert response.status_code == 200
+    assert len(replica_reads) == 0
+
+    # the pin is per user even without the cookie
+    user_api_client.cookies.clear()
+    response = user_api_client.get(reverse('resource-list'))
+    assert response.status_code == 200
+    assert len(replica_reads) == 0
+
+    cache.clear()
+    response = user_api_client.get(reverse('resource-list'))
+    assert response.status_code == 200
+    assert len(replica_reads) == 1
@@ -0,0 +1,67 @@
+import logging
+
+import pytest
+from django.core.cache import cache
+from django.urls import reverse
+
+from respa import instrumentation
+from respa.instrumentation import clear_metrics, get_aggregated_metrics
+
+
+@pytest.fixture(autouse=True)
+def enable_metrics(settings):
+    settings.RESPA_REQUEST_METRICS_ENABLED = True
+    settings.RESPA_REQUEST_METRICS_FLUSH_INTERVAL = 0
+    cache.clear()
+    clear_metrics()
+
+
+@pytest.mark.django_db
+def test_server_timing_header_for_staff_only(api_client, staff_api_client, resource_in_unit):
+    url = reverse('resource-list')
+
+    response = api_client.get(url)
+    assert response.status_code == 200
+    assert 'Server-Timing' not in response
+
+    response = staff_api_client.get(url)
+    assert response.status_code == 200
+    server_timing = response['Server-Timing']
+    assert server_timing.startswith('total;dur=')
+    assert 'db;dur=' in server_timing
+    assert 'resource_serializer;dur=' in server_timing
+
+    metrics = get_aggregated_metrics()['resource-list']
+    assert metrics['requests'] == 2
+    assert metrics['queries'] > 0
+    assert metrics['over_budget'] == 0
+
+
+@pytest.mark.django_db
+def test_query_budget_warning(api_client, resource_in_unit, settings, caplog):
+    settings.RESPA_QUERY_BUDGETS = {'resource-list': 1}
+
+    with caplog.at_level(logging.WARNING, logger='respa.instrumentation'):
+        response = api_client.get(reverse('resource-list'))
+    assert response.status_code == 200
+    assert 'over its budget of 1' in caplog.text
+    assert get_aggregated_metrics()['resource-list']['over_budget'] == 1
+
+
+@pytest.mark.django_db
+def test_request_metrics_view(api_client, staff_api_client):
+    response = api_client.get(reverse('request-metrics'))
+    assert response.status_code in (401, 403)
+
+    response = staff_api_client.get(reverse('request-metrics'))
+    assert response.status_code == 200
+
+
+@pytest.mark.django_db
+def test_request_metrics_cache_errors(api_client, resource_in_unit, monkeypatch):
+    def fail(*args, **kwargs):
+        raise ValueError('cache down')
+
+    monkeypatch.setattr(instrumentation, '_get_slot_key', fail)
+    response = api_client.get(reverse('resource-list'))
+    assert response.status_code == 200
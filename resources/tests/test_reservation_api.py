@@ -2444,6 +2444,24 @@ def test_resource_name_filter(user_api_client, user, reservation, reservation2,
     assert_response_objects(response, (reservation2, reservation3))
 
 
+@pytest.mark.parametrize('phone_number, expected', (
+    ('0401234567', True),
+    ('358401234567', True),
+    ('0501234567', False),
+))
+@pytest.mark.django_db
+def test_reserver_phone_number_filter(staff_api_client, staff_user, reservation, list_url, phone_number, expected):
+    staff_user.is_superuser = True
+    staff_user.save()
+    reservation.reserver_phone_number = '+358 40 123 4567'
+    reservation.save()
+    assert reservation.reserver_phone_number_normalized == '+358401234567'
+
+    response = staff_api_client.get(list_url + '?reserver_phone_number=' + phone_number)
+    assert response.status_code == 200
+    assert_response_objects(response, [reservation] if expected else [])
+
+
 @pytest.mark.django_db
 def test_is_favorite_resource_filter(user_api_client, user, resource_in_unit, reservation, reservation2,
                                      reservation3, list_url):
@@ -3751,5 +3769,79 @@ def test_recurring_reservation_created_mail_attachments(
     response = staff_api_client.post(recurring_url, data=recurring_reservation_data, format='json')
     ical_files = [ical_file for _, ical_file, _ in mail.outbox[0].attachments]
     assert response.status_code == 201
-    assert len(ical_files) == 3
+    assert len(ical_files) == 1
+    assert ical_files[0].count(b'BEGIN:VEVENT') == 3
     assert len(mail.outbox) == 1
+
+
+@pytest.mark.django_db
+def test_recurring_reservation_overlapping_stack(
+    resource_in_unit4_1, recurring_reservation_data,
+    staff_api_client, staff_user, recurring_url):
+    UnitAuthorization.objects.create(subject=resource_in_unit4_1.unit,
+                                     level=UnitAuthorizationLevel.manager, authorized=staff_user)
+
+    recurring_reservation_data['reservation_stack'].append({
+        'begin': '2115-04-05T11:30:00+02:00',
+        'end': '2115-04-05T12:30:00+02:00',
+    })
+    response = staff_api_client.post(recurring_url, data=recurring_reservation_data, format='json')
+    assert response.status_code == 400
+    assert Reservation.objects.count() == 0
+
+
+@pytest.mark.django_db
+def test_recurring_reservation_collides_with_existing(
+    resource_in_unit4_1, recurring_reservation_data,
+    staff_api_client, staff_user, recurring_url):
+    UnitAuthorization.objects.create(subject=resource_in_unit4_1.unit,
+                                     level=UnitAuthorizationLevel.manager, authorized=staff_user)
+    Reservation.objects.create(
+        resource=resource_in_unit4_1,
+        begin='2115-04-05T11:00:00+02:00',
+        end='2115-04-05T12:00:00+02:00',
+        state=Reservation.CONFIRMED
+    )
+
+    response = staff_api_client.post(recurring_url, data=recurring_reservation_data, format='json')
+    assert response.status_code == 400
+    assert ReservationBulk.objects.count() == 0
+
+
+@pytest.mark.django_db
+def test_reservation_feasibility(resource_in_unit, user, api_client):
+    Reservation.objects.create(
+        resource=resource_in_unit,
+        begin='2115-04-04T09:00:00+02:00',
+        end='2115-04-04T10:00:00+02:00',
+        state=Reservation.CONFIRMED
+    )
+    api_client.force_authenticate(user=user)
+    data = {'slots': [
+        {'resource': resource_in_unit.pk, 'begin': '2115-04-04T11:00:00+02:00', 'end': '2115-04-04T12:00:00+02:00'},
+        {'resource': resource_in_unit.pk, 'begin': '2115-04-04T09:00:00+02:00', 'end': '2115-04-04T10:00:00+02:00'},
+    ]}
+
+    response = api_client.post(reverse('reservation_feasibility-list'), data=data, format='json')
+    assert response.status_code == 200
+    feasible, colliding = response.data['slots']
+    assert feasible['feasible'] is True
+    assert feasible['errors'] == []
+    assert colliding['feasible'] is False
+    assert len(colliding['errors']) == 1
+    assert Reservation.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_reservation_feasibility_hidden_resource(resource_in_unit, user, api_client):
+    Resource.objects.filter(pk=resource_in_unit.pk).update(_public=False)
+    api_client.force_authenticate(user=user)
+    data = {'slots': [
+        {'resource': resource_in_unit.pk, 'begin': '2115-04-04T11:00:00+02:00', 'end': '2115-04-04T12:00:00+02:00'},
+    ]}
+
+    response = api_client.post(reverse('reservation_feasibility-list'), data=data, format='json')
+    assert response.status_code == 200
+    slot = response.data['slots'][0]
+    assert slot['feasible'] is False
+    assert len(slot['errors']) == 1
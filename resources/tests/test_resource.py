@@ -6,10 +6,13 @@ from django.core.files.base import ContentFile
 from django.core.exceptions import ValidationError
 from django.utils.translation import activate
 from PIL import Image, UnidentifiedImageError
+from guardian.shortcuts import assign_perm
 
 from resources.enums import UnitAuthorizationLevel, UnitGroupAuthorizationLevel
 from resources.errors import InvalidImage
-from resources.models import ResourceImage, Resource
+from resources.models import (
+    ResourceGroup, ResourceImage, ResourcePermissionIndex, ResourcePermissionIndexState, Resource
+)
 from resources.tests.utils import create_resource_image, get_test_image_data, get_field_errors
 
 
@@ -194,6 +197,27 @@ def test_queryset_with_perm(resource_in_unit, user):
     assert resource_in_unit in resources
 
 
+@pytest.mark.django_db
+def test_queryset_with_perm_index(resource_in_unit, user):
+    perm = 'can_view_reservation_catering_orders'
+    assert not Resource.objects.with_perm(perm, user)
+    assert ResourcePermissionIndexState.objects.filter(user=user, permission=perm).exists()
+
+    # resource group permissions are indexed per resource
+    group = ResourceGroup.objects.create(identifier='test', name='test')
+    group.resources.add(resource_in_unit)
+    assign_perm('resources.group:%s' % perm, user, group)
+    assert not ResourcePermissionIndexState.objects.filter(user=user).exists()
+    assert list(Resource.objects.with_perm(perm, user)) == [resource_in_unit]
+    assert ResourcePermissionIndex.objects.filter(user=user, permission=perm, resource=resource_in_unit).exists()
+
+    # served from the index
+    assert list(Resource.objects.with_perm(perm, user)) == [resource_in_unit]
+
+    group.resources.remove(resource_in_unit)
+    assert not Resource.objects.with_perm(perm, user)
+
+
 @pytest.mark.django_db
 def test_soft_delete_and_restore_resource(resource_in_unit):
     pk = resource_in_unit.pk
@@ -1,6 +1,7 @@
 import datetime
 import pytest
 from copy import deepcopy
+from django.core.management import call_command
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Permission
@@ -9,16 +10,18 @@ from django.contrib.gis.geos import Point
 from django.utils import timezone, dateparse
 from rest_framework.test import APIClient
 from freezegun import freeze_time
+from unittest.mock import Mock
 from guardian.shortcuts import assign_perm, remove_perm
 
 from resources.models.resource import (
     Resource, InvalidImage
 )
+from resources import fragment_cache
 from ..enums import UnitAuthorizationLevel, UnitGroupAuthorizationLevel
 
 from resources.models import (
-    Day, Equipment, Period, Reservation,
-    ReservationMetadataSet, ResourceEquipment,
+    Day, Equipment, EquipmentCategory, Period, Reservation, ReservationCancellationJob,
+    ReservationMetadataSet, ResourceEquipment, ResourcePublishDate,
     ResourceType, Unit, UnitGroup
 )
 from .utils import (
@@ -1344,6 +1347,43 @@ def test_resource_mass_cancel_reservation_permitted_for_admin_user(
     assert resource_with_active_reservations.reservations.current().count() == 0
 
 
+@pytest.mark.django_db
+def test_resource_mass_cancel_large_range_returns_job(
+    staff_api_client, staff_user, settings,
+    resource_with_active_reservations):
+    settings.RESPA_CANCEL_RESERVATIONS_ASYNC_THRESHOLD = 5
+    resource_with_active_reservations.unit.create_authorization(staff_user, 'admin')
+    url = f"{reverse('resource-detail', kwargs={'pk': resource_with_active_reservations.pk})[:-1]}/cancel_reservations/"
+    staff_api_client.force_authenticate(user=staff_user)
+    payload = {
+        'begin': '2115-04-04T00:00:00+02:00',
+        'end': '2115-04-04T23:59:59+02:00'
+    }
+
+    response = staff_api_client.delete(url, data=payload, HTTP_ACCEPT_LANGUAGE='en')
+    assert response.status_code == 202
+    assert resource_with_active_reservations.reservations.current().count() == 0
+
+    job = ReservationCancellationJob.objects.get(pk=response.data['job'])
+    assert job.state == ReservationCancellationJob.PENDING
+    assert job.reservations.count() == 10
+
+    # a job claimed by another process is left alone, unless it has been stuck for long
+    ReservationCancellationJob.objects.filter(pk=job.pk).update(state=ReservationCancellationJob.PROCESSING)
+    call_command('process_reservation_cancellation_jobs')
+    job.refresh_from_db()
+    assert job.state == ReservationCancellationJob.PROCESSING
+    assert not job.claim()
+
+    ReservationCancellationJob.objects.filter(pk=job.pk).update(
+        modified_at=timezone.now() - ReservationCancellationJob.PROCESSING_TIMEOUT - datetime.timedelta(minutes=1)
+    )
+    call_command('process_reservation_cancellation_jobs')
+    job.refresh_from_db()
+    assert job.state == ReservationCancellationJob.DONE
+    assert not job.claim()
+
+
 @pytest.mark.django_db
 @pytest.mark.parametrize('image_size, gets_processed', (
     ((128, 128), False),
@@ -1480,3 +1520,51 @@ def test_api_resource_publish_date_not_public(
     assert response.status_code == 200
     response_data = response.json()
     assert not response_data['public']
+
+
+@pytest.mark.django_db
+def test_resource_fragment_cache(api_client, user_api_client, list_url, detail_url, resource_in_unit, user, settings):
+    settings.RESPA_RESOURCE_FRAGMENT_CACHE_TIMEOUT = 300
+    response = api_client.get(detail_url)
+    assert response.status_code == 200
+    assert response.data['is_favorite'] is False
+
+    # the static part is served from the cache, the dynamic fields are not
+    resource_in_unit.favorited_by.add(user)
+    response = user_api_client.get(detail_url)
+    assert response.data['is_favorite'] is True
+    assert response.data['name']['fi'] == resource_in_unit.name_fi
+    assert list(response.data.keys()) == list(api_client.get(detail_url).data.keys())
+
+    # changes of the resource and its related rows are visible at once
+    resource_in_unit.name_fi = 'uusi nimi'
+    resource_in_unit.save()
+    response = api_client.get(list_url)
+    assert response.data['results'][0]['name']['fi'] == 'uusi nimi'
+
+    equipment = Equipment.objects.create(name='test equipment', category=EquipmentCategory.objects.create(name='test'))
+    ResourceEquipment.objects.create(resource=resource_in_unit, equipment=equipment)
+    response = api_client.get(list_url)
+    assert len(response.data['results'][0]['equipment']) == 1
+
+
+@pytest.mark.django_db
+def test_resource_fragment_cache_with_publish_date(api_client, list_url, resource_in_unit, settings, monkeypatch):
+    settings.RESPA_RESOURCE_FRAGMENT_CACHE_TIMEOUT = 300
+    ResourcePublishDate.objects.create(
+        begin=timezone.now() - datetime.timedelta(days=1),
+        end=timezone.now() + datetime.timedelta(days=1),
+        reservable=True,
+        resource=resource_in_unit
+    )
+    response = api_client.get(list_url)
+    assert response.data['count'] == 1
+    generation = fragment_cache.get_generation()
+
+    # refreshing the publish states of unchanged resources does not invalidate the cache
+    set_fragment = Mock()
+    monkeypatch.setattr(fragment_cache, 'set_fragment', set_fragment)
+    response = api_client.get(list_url)
+    assert response.data['count'] == 1
+    assert fragment_cache.get_generation() == generation
+    assert not set_fragment.called
@@ -31,6 +31,62 @@ def test_resource_image_view_thumbing(client, space_resource):
     assert client.get(reverse("resource-image-view", kwargs={"pk": png.pk}), data={"dim": "-x3"}).status_code == 400
 
 
+@pytest.mark.django_db
+def test_resource_image_view_rejects_unknown_dimensions(client, space_resource, settings):
+    settings.RESPA_IMAGE_DERIVATIVE_SIZES = ['50x50']
+    png = create_resource_image(space_resource, size=(300, 300), format="PNG")
+    url = reverse("resource-image-view", kwargs={"pk": png.pk})
+    assert client.get(url, data={"dim": "50x50"}).status_code == 200
+    assert client.get(url, data={"dim": "51x50"}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_resource_image_view_cache_headers(client, space_resource):
+    jpeg = create_resource_image(space_resource, size=(300, 300), format="JPEG")
+    url = reverse("resource-image-view", kwargs={"pk": jpeg.pk})
+
+    resp = client.get(url, data={"dim": "50x50"})
+    assert resp.status_code == 200
+    assert jpeg.stamp in resp["ETag"]
+    assert "immutable" not in resp["Cache-Control"]
+
+    etag = resp["ETag"]
+    resp = client.get(url, data={"dim": "50x50"}, HTTP_IF_NONE_MATCH=etag)
+    assert resp.status_code == 304
+    resp = client.get(url, data={"dim": "50x50"}, HTTP_IF_NONE_MATCH='"foo", W/%s' % etag)
+    assert resp.status_code == 304
+    resp = client.get(url, data={"dim": "50x50"}, HTTP_IF_NONE_MATCH='"%s"' % jpeg.stamp)
+    assert resp.status_code == 200
+
+    versioned_url = reverse("resource-image-view-versioned", kwargs={"pk": jpeg.pk, "stamp": jpeg.stamp})
+    resp = client.get(versioned_url, data={"dim": "50x50"})
+    assert "immutable" in resp["Cache-Control"]
+    assert Image.open(BytesIO(resp.getvalue())).size == (50, 50)
+
+    # an outdated version is served with the current image, but not cached
+    resp = client.get(reverse("resource-image-view-versioned", kwargs={"pk": jpeg.pk, "stamp": "foo"}))
+    assert resp.status_code == 200
+    assert "immutable" not in resp["Cache-Control"]
+
+
+@pytest.mark.django_db
+def test_resource_image_derivatives_generated_on_save(space_resource, settings, django_capture_on_commit_callbacks):
+    settings.RESPA_IMAGE_DERIVATIVE_SIZES = ['50x50']
+    with django_capture_on_commit_callbacks(execute=True):
+        png = create_resource_image(space_resource, size=(300, 300), format="PNG")
+    assert png.get_derivative(50, 50, generate=False) is not None
+
+
+@pytest.mark.django_db
+def test_resource_image_view_sendfile(client, space_resource, settings):
+    settings.RESPA_IMAGE_SENDFILE_HEADER = "X-Accel-Redirect"
+    settings.RESPA_IMAGE_SENDFILE_PREFIX = "/protected/"
+    jpeg = create_resource_image(space_resource, size=(300, 300), format="JPEG")
+    resp = client.get(reverse("resource-image-view", kwargs={"pk": jpeg.pk}))
+    assert resp["X-Accel-Redirect"] == "/protected/" + jpeg.image.name
+    assert resp.content == b""
+
+
 def test_dimension_string_parsing():
     with pytest.raises(ValueError):
         parse_dimension_string("3x8x2")
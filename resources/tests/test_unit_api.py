@@ -184,3 +184,18 @@ def test_query_counts(user_api_client, staff_api_client, list_url, django_assert
 
     with django_assert_max_num_queries(MAX_QUERIES):
         staff_api_client.get(list_url)
+
+
+@freeze_time('2100-12-12 12:00:00')
+@pytest.mark.django_db
+def test_unit_hidden_follows_resource_publish_dates(api_client, detail_url, resource_with_reservable_publish_date):
+    """
+    Tests that a unit is hidden only when none of its resources are currently public.
+    """
+    response = api_client.get(detail_url)
+    assert response.status_code == 200
+    assert response.data['hidden'] is False
+
+    with freeze_time('2100-12-14'):
+        response = api_client.get(detail_url)
+    assert response.data['hidden'] is True
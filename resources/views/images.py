@@ -1,9 +1,11 @@
 import os
 from mimetypes import guess_type
+from urllib.parse import quote
 
-from django.http.response import FileResponse, HttpResponseBadRequest
+from django.conf import settings
+from django.http.response import FileResponse, HttpResponse, HttpResponseBadRequest, HttpResponseNotModified
+from django.utils.cache import parse_etags, patch_vary_headers
 from django.views.generic import DetailView
-from easy_thumbnails.files import get_thumbnailer
 
 from resources.models import ResourceImage
 
@@ -28,7 +30,6 @@ def parse_dimension_string(dim):
         width = height = 0
     if not (width > 0 and height > 0):
         raise ValueError("width and height must be positive integers")
-    # FIXME: Check allowed image dimensions better
     return (width, height)
 
 
@@ -44,26 +45,61 @@ class ResourceImageView(DetailView):
                 width, height = parse_dimension_string(dim)
             except ValueError as verr:
                 return HttpResponseBadRequest(str(verr))
+            if (width, height) not in ResourceImage.get_derivative_sizes():
+                return HttpResponseBadRequest('"dim" must be one of: %s' % ', '.join(
+                    '%dx%d' % size for size in sorted(ResourceImage.get_derivative_sizes())
+                ))
         else:
             width = height = None
 
+        webp = bool(width and settings.RESPA_IMAGE_WEBP_ENABLED and
+                    'image/webp' in request.META.get('HTTP_ACCEPT', ''))
+
+        # The stamp changes whenever the image file changes, so it identifies the content
+        etag = '"%s"' % '-'.join(filter(None, [
+            image.stamp or str(int(image.modified_at.timestamp())),
+            '%dx%d' % (width, height) if width else None,
+            'webp' if webp else None,
+        ]))
+        if_none_match = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+        # If-None-Match uses the weak comparison
+        if '*' in if_none_match or etag in (tag[2:] if tag.startswith('W/') else tag for tag in if_none_match):
+            resp = HttpResponseNotModified()
+            self._set_cache_headers(request, resp, image, etag)
+            return resp
+
         if not width:
             out_image = image.image
             filename = image.image.name
         else:
             try:
-                out_image = get_thumbnailer(image.image).get_thumbnail({
-                    'size': (width, height),
-                    'box': image.cropping,
-                    'crop': True,
-                    'detail': True,
-                })
+                out_image = image.get_derivative(width, height, webp=webp)
                 filename = "%s-%dx%d%s" % (image.image.name, width, height, os.path.splitext(out_image.name)[1])
             except:
                 return HttpResponseBadRequest()
 
-        # FIXME: Use SendFile headers instead of Django output when not in debug mode
-        out_image.seek(0)
-        resp = FileResponse(out_image, content_type=guess_type(filename, False)[0])
+        content_type = guess_type(filename, False)[0]
+        sendfile_header = settings.RESPA_IMAGE_SENDFILE_HEADER
+        if sendfile_header == 'X-Accel-Redirect':
+            resp = HttpResponse(content_type=content_type)
+            prefix = settings.RESPA_IMAGE_SENDFILE_PREFIX or settings.MEDIA_URL
+            resp['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(out_image.name)
+        elif sendfile_header == 'X-Sendfile':
+            resp = HttpResponse(content_type=content_type)
+            resp['X-Sendfile'] = out_image.storage.path(out_image.name)
+        else:
+            out_image.seek(0)
+            resp = FileResponse(out_image, content_type=content_type)
         resp["Content-Disposition"] = "attachment; filename=%s" % os.path.basename(filename)
+        self._set_cache_headers(request, resp, image, etag)
         return resp
+
+    def _set_cache_headers(self, request, resp, image, etag):
+        resp['ETag'] = etag
+        if image.stamp and self.kwargs.get('stamp') == image.stamp:
+            # The URL is versioned with the stamp, so the response never changes
+            resp['Cache-Control'] = 'public, max-age=31536000, immutable'
+        else:
+            resp['Cache-Control'] = 'public, no-cache'
+        if settings.RESPA_IMAGE_WEBP_ENABLED:
+            patch_vary_headers(resp, ('Accept',))
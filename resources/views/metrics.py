@@ -0,0 +1,15 @@
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from respa.instrumentation import get_aggregated_metrics
+
+
+class RequestMetricsView(APIView):
+    """
+    Aggregated request counts, durations and query counts per view.
+    """
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get(self, request, format=None):
+        return Response(get_aggregated_metrics())
@@ -0,0 +1,211 @@
+"""
+Per-request query and latency instrumentation.
+
+RequestMetricsMiddleware counts the SQL queries and measures the time spent
+in each request, and the timed() hooks measure named sections of code
+(serialization, pricing, opening hours...) inside it. Staff users get the
+numbers in a Server-Timing header, aggregates per view are kept in the
+cache (see resources.views.metrics), and requests exceeding their query
+budget are logged. Each process writes its totals under its own cache key,
+which requires a shared cache for the aggregates to cover all the processes.
+"""
+import collections
+import contextlib
+import contextvars
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = 'respa-request-metrics'
+METRIC_NAMES = ('requests', 'duration_ms', 'queries', 'query_ms', 'over_budget')
+# the metrics of at most this many most recently started processes are aggregated
+MAX_SLOTS = 1000
+
+_lock = threading.Lock()
+# totals of this process per view since the process started
+_totals = {}
+_slot = None
+_last_flush = 0.0
+
+_current_metrics = contextvars.ContextVar('respa_request_metrics', default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.duration = None
+        self.query_count = 0
+        self.query_duration = 0.0
+        self.sections = collections.OrderedDict()
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.query_count += 1
+            self.query_duration += time.perf_counter() - started
+
+    def add_section(self, name, duration):
+        count, total = self.sections.get(name, (0, 0.0))
+        self.sections[name] = (count + 1, total + duration)
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.started
+
+    def get_server_timing(self):
+        entries = [
+            'total;dur=%.1f' % (self.duration * 1000),
+            'db;dur=%.1f;desc="%d queries"' % (self.query_duration * 1000, self.query_count),
+        ]
+        for name, (count, duration) in self.sections.items():
+            entries.append('%s;dur=%.1f;desc="%d calls"' % (name, duration * 1000, count))
+        return ', '.join(entries)
+
+
+@contextlib.contextmanager
+def timed(name):
+    """
+    Measure the wrapped block or function as section `name` of the current request.
+
+    Usable both as a context manager and as a decorator. Does nothing outside
+    of an instrumented request.
+    """
+    metrics = _current_metrics.get()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add_section(name, time.perf_counter() - started)
+
+
+def get_query_budget(view_name):
+    budgets = getattr(settings, 'RESPA_QUERY_BUDGETS', {})
+    budget = budgets.get(view_name) or getattr(settings, 'RESPA_QUERY_BUDGET_DEFAULT', 0)
+    return int(budget) if budget else None
+
+
+def _get_slot_key():
+    """
+    Return the cache key of this process's metrics.
+
+    Every process writes only its own key, so the totals need no
+    read-modify-write between the processes.
+    """
+    global _slot
+    if _slot is None:
+        counter_key = '%s:slots' % CACHE_PREFIX
+        try:
+            _slot = cache.incr(counter_key)
+        except ValueError:
+            # the counter does not exist yet or has been evicted
+            cache.add(counter_key, 0, None)
+            _slot = cache.incr(counter_key)
+    return '%s:%d' % (CACHE_PREFIX, _slot)
+
+
+def record_metrics(view_name, metrics, over_budget):
+    """
+    Add the request to the totals of this process and write them to the
+    cache at most every RESPA_REQUEST_METRICS_FLUSH_INTERVAL seconds.
+    """
+    global _last_flush
+    values = {
+        'requests': 1,
+        'duration_ms': int(metrics.duration * 1000),
+        'queries': metrics.query_count,
+        'query_ms': int(metrics.query_duration * 1000),
+        'over_budget': int(over_budget),
+    }
+    with _lock:
+        totals = _totals.setdefault(view_name, dict.fromkeys(METRIC_NAMES, 0))
+        for metric, value in values.items():
+            totals[metric] += value
+        now = time.monotonic()
+        if now - _last_flush < settings.RESPA_REQUEST_METRICS_FLUSH_INTERVAL:
+            return
+        _last_flush = now
+        data = {view: dict(view_totals) for view, view_totals in _totals.items()}
+    try:
+        cache.set(_get_slot_key(), data, None)
+    except Exception:
+        # the metrics must never fail the request
+        logger.exception('Could not store the request metrics')
+
+
+def get_aggregated_metrics():
+    try:
+        slot_count = cache.get('%s:slots' % CACHE_PREFIX) or 0
+        keys = ['%s:%d' % (CACHE_PREFIX, slot)
+                for slot in range(max(slot_count - MAX_SLOTS, 0) + 1, slot_count + 1)]
+        processes = cache.get_many(keys).values()
+    except Exception:
+        logger.exception('Could not read the request metrics')
+        processes = []
+
+    ret = {}
+    for process_totals in processes:
+        for view_name, totals in process_totals.items():
+            view_metrics = ret.setdefault(view_name, dict.fromkeys(METRIC_NAMES, 0))
+            for metric in METRIC_NAMES:
+                view_metrics[metric] += totals.get(metric, 0)
+    return dict(sorted(ret.items()))
+
+
+def clear_metrics():
+    """
+    Forget the totals of this process, e.g. after the cache has been cleared.
+    """
+    global _slot, _last_flush
+    with _lock:
+        _totals.clear()
+        _slot = None
+        _last_flush = 0.0
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'RESPA_REQUEST_METRICS_ENABLED', False):
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = _current_metrics.set(metrics)
+        try:
+            with contextlib.ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics.execute_wrapper))
+                response = self.get_response(request)
+        finally:
+            _current_metrics.reset(token)
+        metrics.finish()
+
+        resolver_match = getattr(request, 'resolver_match', None)
+        view_name = resolver_match.view_name if resolver_match else None
+        if not view_name:
+            return response
+
+        budget = get_query_budget(view_name)
+        over_budget = budget is not None and metrics.query_count > budget
+        if over_budget:
+            logger.warning('%s %s made %d queries, over its budget of %d' % (
+                request.method, request.path, metrics.query_count, budget
+            ))
+        record_metrics(view_name, metrics, over_budget)
+
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated and user.is_staff:
+            response['Server-Timing'] = metrics.get_server_timing()
+        return response
+
@@ -0,0 +1,100 @@
+"""
+Routing of read-only API traffic to a read replica.
+
+When a replica database is configured (DATABASE_REPLICA_URL), the views
+using resources.api.base.ReadReplicaMixin serve their safe requests from
+it. Clients that have just written something are pinned to the primary for
+RESPA_REPLICA_PIN_SECONDS so that they read their own writes despite the
+replication lag: anonymous clients with a cookie, authenticated users also
+through the cache, as API tokens are not accompanied by cookies. The cache
+must therefore be shared by all the processes (see CACHE_URL).
+"""
+import contextvars
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+REPLICA_DB_ALIAS = 'replica'
+PIN_COOKIE_NAME = 'respa-primary-pin'
+PIN_CACHE_PREFIX = 'respa-primary-pin'
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_use_replica = contextvars.ContextVar('respa_use_replica', default=False)
+
+
+def is_replica_configured():
+    return REPLICA_DB_ALIAS in settings.DATABASES
+
+
+def use_replica():
+    """
+    Route the reads of the rest of the current request to the replica.
+    """
+    _use_replica.set(True)
+
+
+def is_pinned_to_primary(request):
+    try:
+        if float(request.COOKIES.get(PIN_COOKIE_NAME, 0)) > time.time():
+            return True
+    except ValueError:
+        pass
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return bool(cache.get('%s:%s' % (PIN_CACHE_PREFIX, user.pk)))
+    return False
+
+
+def pin_to_primary(request, response):
+    seconds = settings.RESPA_REPLICA_PIN_SECONDS
+    response.set_cookie(PIN_COOKIE_NAME, str(time.time() + seconds), max_age=seconds, httponly=True)
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        cache.set('%s:%s' % (PIN_CACHE_PREFIX, user.pk), True, seconds)
+
+
+class ReplicaRouter:
+    """
+    Send the reads of the requests marked with use_replica() to the replica
+    and everything else to the primary.
+    """
+    def db_for_read(self, model, **hints):
+        if _use_replica.get():
+            return REPLICA_DB_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # objects read from the replica are saved to the primary too
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db != REPLICA_DB_ALIAS
+
+
+class ReplicaMiddleware:
+    """
+    Scope use_replica() to a single request and pin the clients that
+    write something to the primary.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not is_replica_configured():
+            return self.get_response(request)
+
+        token = _use_replica.set(False)
+        try:
+            response = self.get_response(request)
+        finally:
+            _use_replica.reset(token)
+
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            pin_to_primary(request, response)
+        return response
@@ -20,6 +20,8 @@ env = environ.Env(
     ALLOWED_HOSTS=(list, ['*']),
     ADMINS=(list, []),
     DATABASE_URL=(str, 'postgis:///respa'),
+    DATABASE_REPLICA_URL=(str, ''),
+    CACHE_URL=(str, 'locmemcache://'),
     SECURE_PROXY_SSL_HEADER=(tuple, None),
     TOKEN_AUTH_ACCEPTED_AUDIENCE=(str, ''),
     TOKEN_AUTH_SHARED_SECRET=(str, ''),
@@ -39,6 +41,22 @@ env = environ.Env(
     MAIL_MAILGUN_API=(str, ''),
     USE_DJANGO_DEFAULT_EMAIL=(bool, False),
     RESPA_IMAGE_BASE_URL=(str, ''),
+    RESPA_IMAGE_DERIVATIVE_SIZES=(list, ['50x50', '100x100', '300x300', '600x600', '800x800', '1200x1200']),
+    RESPA_IMAGE_WEBP_ENABLED=(bool, False),
+    RESPA_IMAGE_SENDFILE_HEADER=(str, ''),
+    RESPA_IMAGE_SENDFILE_PREFIX=(str, ''),
+    RESPA_CANCEL_RESERVATIONS_ASYNC_THRESHOLD=(int, 50),
+    RESPA_REQUEST_METRICS_FLUSH_INTERVAL=(int, 10),
+    RESPA_QUERY_BUDGET_DEFAULT=(int, 0),
+    RESPA_QUERY_BUDGETS=(dict, {}),
+    RESPA_REPLICA_PIN_SECONDS=(int, 10),
+    RESPA_PHONE_NUMBER_DEFAULT_REGION=(str, 'FI'),
+    RESPA_CHANGE_FEED_LONG_POLL_ENABLED=(bool, False),
+    RESPA_CHANGE_FEED_MAX_CONNECTIONS=(int, 4),
+    RESPA_CHANGE_FEED_MAX_WAIT=(int, 25),
+    RESPA_CHANGE_FEED_POLL_INTERVAL=(float, 1),
+    RESPA_CHANGE_FEED_STREAM_TIMEOUT=(int, 300),
+    RESPA_CHANGE_FEED_RETENTION_DAYS=(int, 7),
     ACCESSIBILITY_API_BASE_URL=(str, 'https://asiointi.hel.fi/kapaesteettomyys/'),
     ACCESSIBILITY_API_SYSTEM_ID=(str, ''),
     ACCESSIBILITY_API_SECRET=(str, ''),
@@ -53,6 +71,12 @@ env = environ.Env(
     RESPA_PAYMENTS_PROVIDER_CLASS=(str, ''),
     RESPA_PAYMENTS_PAYMENT_WAITING_TIME=(int, 15),
     RESPA_PAYMENTS_PAYMENT_REQUESTED_WAITING_TIME=(int, 24),
+    RESPA_PAYMENTS_HTTP_CONNECT_TIMEOUT=(float, 3.05),
+    RESPA_PAYMENTS_HTTP_READ_TIMEOUT=(float, 10),
+    RESPA_PAYMENTS_HTTP_RETRIES=(int, 2),
+    RESPA_PAYMENTS_HTTP_POOL_SIZE=(int, 10),
+    RESPA_PAYMENTS_CIRCUIT_BREAKER_THRESHOLD=(int, 5),
+    RESPA_PAYMENTS_CIRCUIT_BREAKER_RESET_TIMEOUT=(int, 30),
     RESPA_ADMIN_LOGOUT_REDIRECT_URL=(str, 'https://hel.fi'),
     DJANGO_ADMIN_LOGOUT_REDIRECT_URL=(str, 'https://hel.fi'),
     TUNNISTAMO_BASE_URL=(str, ''),
@@ -74,6 +98,8 @@ env = environ.Env(
     HELUSERS_AUTHENTICATION_BACKEND=(str, 'helusers.tunnistamo_oidc.TunnistamoOIDCAuth'),
     USE_SWAGGER_OPENAPI_VIEW=(bool, False),
     USE_RESPA_EXCHANGE=(bool, False),
+    RESPA_EXCHANGE_UPLOAD_MAX_ATTEMPTS=(int, 8),
+    RESPA_EXCHANGE_UPLOAD_RETRY_DELAY=(int, 30),
     EMAIL_HOST=(str, ''),
     MACHINE_TO_MACHINE_AUTH_ENABLED=(bool, False),
     JWT_AUTH_HEADER_PREFIX=(str, "JWT"),
@@ -112,9 +138,59 @@ env = environ.Env(
     QUALITYTOOL_SFTP_PASSWORD=(str, '')
 )
 environ.Env.read_env()
+# the default local memory cache is private to each process, set CACHE_URL
+# (e.g. rediscache://127.0.0.1:6379/1) to share the cache between the processes
+CACHES = {
+    'default': env.cache('CACHE_URL')
+}
+# whether the cached state (request metrics, replica pinning...) is seen by all the processes
+RESPA_SHARED_CACHE = CACHES['default']['BACKEND'] not in (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
 # used for generating links to images, when no request context is available
 # reservation confirmation emails use this
 RESPA_IMAGE_BASE_URL = env('RESPA_IMAGE_BASE_URL')
+# resource image derivatives ("WxH") generated on save, other dimensions are rejected
+RESPA_IMAGE_DERIVATIVE_SIZES = env('RESPA_IMAGE_DERIVATIVE_SIZES')
+# generate and serve WebP variants of the derivatives to clients accepting them
+RESPA_IMAGE_WEBP_ENABLED = env('RESPA_IMAGE_WEBP_ENABLED')
+# let the web server send resource images: "X-Accel-Redirect" (nginx) or "X-Sendfile" (apache),
+# X-Accel-Redirect uses RESPA_IMAGE_SENDFILE_PREFIX (defaults to MEDIA_URL) as the internal location
+RESPA_IMAGE_SENDFILE_HEADER = env('RESPA_IMAGE_SENDFILE_HEADER')
+RESPA_IMAGE_SENDFILE_PREFIX = env('RESPA_IMAGE_SENDFILE_PREFIX')
+# range cancellations larger than this are left to the process_reservation_cancellation_jobs
+# command and the API responds with 202 and the job id
+RESPA_CANCEL_RESERVATIONS_ASYNC_THRESHOLD = env('RESPA_CANCEL_RESERVATIONS_ASYNC_THRESHOLD')
+# count queries and time requests per view, see respa.instrumentation; the aggregates
+# are kept in the cache, so this is enabled by default only with a shared cache
+RESPA_REQUEST_METRICS_ENABLED = env.bool('RESPA_REQUEST_METRICS_ENABLED', default=RESPA_SHARED_CACHE)
+# seconds between the writes of the request metrics of a process to the cache
+RESPA_REQUEST_METRICS_FLUSH_INTERVAL = env('RESPA_REQUEST_METRICS_FLUSH_INTERVAL')
+# log a warning when a request makes more queries than its view's budget,
+# e.g. RESPA_QUERY_BUDGETS=resource-list=40,reservation-list=30; 0 disables the default budget
+RESPA_QUERY_BUDGET_DEFAULT = env('RESPA_QUERY_BUDGET_DEFAULT')
+RESPA_QUERY_BUDGETS = env('RESPA_QUERY_BUDGETS')
+# clients that have written something read from the primary instead of the replica for this long
+RESPA_REPLICA_PIN_SECONDS = env('RESPA_REPLICA_PIN_SECONDS')
+# seconds the static parts of serialized resources are cached, see resources.fragment_cache; 0 disables.
+# Disabled by default without a shared cache, as the changes would only be noticed by the changing process
+RESPA_RESOURCE_FRAGMENT_CACHE_TIMEOUT = env.int('RESPA_RESOURCE_FRAGMENT_CACHE_TIMEOUT',
+                                                default=300 if RESPA_SHARED_CACHE else 0)
+# region of the phone numbers given without a country code, used to normalize them for searching
+RESPA_PHONE_NUMBER_DEFAULT_REGION = env('RESPA_PHONE_NUMBER_DEFAULT_REGION')
+# allow the /v1/changes/ long-polls (?wait=) and streams, each of which keeps a worker busy while waiting
+RESPA_CHANGE_FEED_LONG_POLL_ENABLED = env('RESPA_CHANGE_FEED_LONG_POLL_ENABLED')
+# most long-polls and streams waiting at a time over all the processes, the rest get 429
+RESPA_CHANGE_FEED_MAX_CONNECTIONS = env('RESPA_CHANGE_FEED_MAX_CONNECTIONS')
+# longest time in seconds a /v1/changes/ long-poll waits for new changes
+RESPA_CHANGE_FEED_MAX_WAIT = env('RESPA_CHANGE_FEED_MAX_WAIT')
+# seconds between the checks for new changes while a long-poll or a stream waits
+RESPA_CHANGE_FEED_POLL_INTERVAL = env('RESPA_CHANGE_FEED_POLL_INTERVAL')
+# seconds after which a change stream is closed, the clients reconnect with Last-Event-ID
+RESPA_CHANGE_FEED_STREAM_TIMEOUT = env('RESPA_CHANGE_FEED_STREAM_TIMEOUT')
+# days the change feed entries are kept, see the prune_change_feed command
+RESPA_CHANGE_FEED_RETENTION_DAYS = env('RESPA_CHANGE_FEED_RETENTION_DAYS')
 BASE_DIR = root()
 DEBUG_TOOLBAR_CONFIG = {
     'RESULTS_CACHE_SIZE': 100,
@@ -134,6 +210,15 @@ DATABASES = {
 }
 DATABASES['default']['ATOMIC_REQUESTS'] = True
 DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = env('DISABLE_SERVER_SIDE_CURSORS')
+# safe requests of the read-only API views are served from the replica, see respa.replica
+if env('DATABASE_REPLICA_URL'):
+    if not RESPA_SHARED_CACHE:
+        # the users are pinned to the primary through the cache after writing
+        raise ImproperlyConfigured('DATABASE_REPLICA_URL requires a shared cache, set CACHE_URL')
+    DATABASES['replica'] = env.db('DATABASE_REPLICA_URL')
+    DATABASES['replica']['DISABLE_SERVER_SIDE_CURSORS'] = env('DISABLE_SERVER_SIDE_CURSORS')
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+    DATABASE_ROUTERS = ['respa.replica.ReplicaRouter']
 
 SECURE_PROXY_SSL_HEADER = env('SECURE_PROXY_SSL_HEADER')
 
@@ -163,6 +248,10 @@ if USE_SWAGGER_OPENAPI_VIEW:
     }
 
 USE_RESPA_EXCHANGE = env('USE_RESPA_EXCHANGE')
+# failed uploads to Exchange are retried this many times, the first retry after
+# RESPA_EXCHANGE_UPLOAD_RETRY_DELAY seconds and each next one after twice as long
+RESPA_EXCHANGE_UPLOAD_MAX_ATTEMPTS = env('RESPA_EXCHANGE_UPLOAD_MAX_ATTEMPTS')
+RESPA_EXCHANGE_UPLOAD_RETRY_DELAY = env('RESPA_EXCHANGE_UPLOAD_RETRY_DELAY')
 
 TIMMI_API_URL = env('TIMMI_API_URL')
 TIMMI_ADMIN_ID = env('TIMMI_ADMIN_ID')
@@ -257,6 +346,8 @@ if env('SENTRY_DSN'):
     INSTALLED_APPS.append('raven.contrib.django.raven_compat')
 
 MIDDLEWARE = [
+    'respa.instrumentation.RequestMetricsMiddleware',
+    'respa.replica.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware',
@@ -264,6 +355,7 @@ MIDDLEWARE = [
     'django.middleware.csrf.CsrfViewMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'resources.auth.AuthorizationProfileMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -544,6 +636,19 @@ RESPA_PAYMENTS_PAYMENT_WAITING_TIME = env('RESPA_PAYMENTS_PAYMENT_WAITING_TIME')
 # amount of hours before manually confirmed / requested reservations will be expired
 RESPA_PAYMENTS_PAYMENT_REQUESTED_WAITING_TIME = env('RESPA_PAYMENTS_PAYMENT_REQUESTED_WAITING_TIME')
 
+# timeouts in seconds of the requests to the payment provider API, see payments.providers.http_client
+RESPA_PAYMENTS_HTTP_CONNECT_TIMEOUT = env('RESPA_PAYMENTS_HTTP_CONNECT_TIMEOUT')
+RESPA_PAYMENTS_HTTP_READ_TIMEOUT = env('RESPA_PAYMENTS_HTTP_READ_TIMEOUT')
+# retries of failed idempotent (e.g. GET) requests, payment creation POSTs are retried
+# only when the connection could not be opened, i.e. the provider never received them
+RESPA_PAYMENTS_HTTP_RETRIES = env('RESPA_PAYMENTS_HTTP_RETRIES')
+# kept-alive connections per provider host and process
+RESPA_PAYMENTS_HTTP_POOL_SIZE = env('RESPA_PAYMENTS_HTTP_POOL_SIZE')
+# after this many consecutive failures the provider is considered down and requests
+# fail immediately for RESPA_PAYMENTS_CIRCUIT_BREAKER_RESET_TIMEOUT seconds
+RESPA_PAYMENTS_CIRCUIT_BREAKER_THRESHOLD = env('RESPA_PAYMENTS_CIRCUIT_BREAKER_THRESHOLD')
+RESPA_PAYMENTS_CIRCUIT_BREAKER_RESET_TIMEOUT = env('RESPA_PAYMENTS_CIRCUIT_BREAKER_RESET_TIMEOUT')
+
 # local_settings.py can be used to override environment-specific settings
 # like database and email that differ between development and production.
 local_settings_path = os.path.join(BASE_DIR, "local_settings.py")
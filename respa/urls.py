@@ -8,6 +8,7 @@ from django.views.generic.base import RedirectView
 from resources.api import RespaAPIRouter
 from resources.views.images import ResourceImageView
 from resources.views.ical import ICalFeedView
+from resources.views.metrics import RequestMetricsView
 
 import accessibility.api
 import maintenance.api
@@ -31,6 +32,8 @@ urlpatterns = [
     path('accounts/', include('allauth.urls')),
     path('grappelli/', include('grappelli.urls')),
     path('resource_image/<int:pk>', ResourceImageView.as_view(), name='resource-image-view'),
+    path('resource_image/<int:pk>/<str:stamp>', ResourceImageView.as_view(), name='resource-image-view-versioned'),
+    path('v1/metrics/', RequestMetricsView.as_view(), name='request-metrics'),
     path('v1/', include('resources.urls')),
     path('v1/', include(router.urls)),
     path('v1/', include('accessibility.urls')),
@@ -41,10 +44,11 @@ urlpatterns = [
 ]
 
 if 'reports' in settings.INSTALLED_APPS:
-    from reports.api import DailyReservationsReport, ReservationDetailsReport
+    from reports.api import DailyReservationsReport, DailyUtilizationReport, ReservationDetailsReport
     urlpatterns.extend([
         path('reports/daily_reservations/', DailyReservationsReport.as_view(), name='daily-reservations-report'),
         path('reports/reservation_details/', ReservationDetailsReport.as_view(), name='reservation-details-report'),
+        path('reports/daily_utilization/', DailyUtilizationReport.as_view(), name='daily-utilization-report'),
     ])
 
 if settings.RESPA_PAYMENTS_ENABLED:
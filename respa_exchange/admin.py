@@ -1,7 +1,7 @@
 from django.contrib.admin import ModelAdmin, site
 from django.forms.widgets import PasswordInput
 
-from respa_exchange.models import ExchangeConfiguration, ExchangeReservation, ExchangeResource
+from respa_exchange.models import ExchangeConfiguration, ExchangeReservation, ExchangeResource, ExchangeUploadJob
 
 
 class ExchangeResourceAdmin(ModelAdmin):
@@ -21,6 +21,15 @@ class ExchangeReservationAdmin(ModelAdmin):
         return False  # pragma: no cover
 
 
+class ExchangeUploadJobAdmin(ModelAdmin):
+    list_display = ('reservation_id', 'operation', 'state', 'attempts', 'next_attempt_at', 'modified_at')
+    list_filter = ('state', 'operation')
+    readonly_fields = [f.attname for f in ExchangeUploadJob._meta.get_fields()]
+
+    def has_add_permission(self, request):
+        return False  # pragma: no cover
+
+
 class ExchangeConfigurationAdmin(ModelAdmin):
     list_display = ('name', 'url', 'enabled')
     list_filter = ('enabled',)
@@ -35,3 +44,4 @@ class ExchangeConfigurationAdmin(ModelAdmin):
 site.register(ExchangeReservation, ExchangeReservationAdmin)
 site.register(ExchangeResource, ExchangeResourceAdmin)
 site.register(ExchangeConfiguration, ExchangeConfigurationAdmin)
+site.register(ExchangeUploadJob, ExchangeUploadJobAdmin)
@@ -0,0 +1,23 @@
+import logging
+
+from django.core.management import BaseCommand
+from tendo import singleton
+
+from respa_exchange.management.base import configure_logging
+from respa_exchange.uploader import process_upload_jobs
+
+
+class Command(BaseCommand):
+    help = "Uploads the pending reservation changes to Exchange."
+
+    def handle(self, verbosity, *args, **options):
+        if verbosity >= 2:
+            configure_logging(level=logging.DEBUG)
+
+        try:
+            me = singleton.SingleInstance(flavor_id="respa_exchange_upload")
+        except singleton.SingleInstanceException:
+            return
+        processed = process_upload_jobs()
+        if verbosity >= 1:
+            self.stdout.write('Processed %d Exchange upload jobs.' % processed)
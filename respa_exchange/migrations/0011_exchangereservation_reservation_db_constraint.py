@@ -0,0 +1,20 @@
+# Generated by Django 4.2.15 on 2026-10-19 11:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('respa_exchange', '0010_add_exchange_user_updated_at_field'),
+        ('resources', '0159_resourcedailyutilization'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='exchangereservation',
+            name='reservation',
+            field=models.OneToOneField(db_constraint=False, editable=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='exchange_reservation', to='resources.reservation'),
+        ),
+    ]
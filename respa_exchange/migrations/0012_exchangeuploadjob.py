@@ -0,0 +1,43 @@
+# Generated by Django 4.2.15 on 2026-10-19 17:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resources', '0165_changefeedentry'),
+        ('respa_exchange', '0011_exchangereservation_reservation_db_constraint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExchangeUploadJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('operation', models.CharField(choices=[('upload', 'upload'), ('delete', 'delete')], max_length=16, verbose_name='operation')),
+                ('send_notifications', models.BooleanField(default=True, verbose_name='send notifications')),
+                ('state', models.CharField(choices=[('pending', 'pending'), ('processing', 'processing'), ('done', 'done'), ('failed', 'failed')], default='pending', max_length=16, verbose_name='state')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='attempts')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='time of next attempt')),
+                ('last_error', models.TextField(blank=True, verbose_name='last error')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='time of creation')),
+                ('modified_at', models.DateTimeField(auto_now=True, verbose_name='time of modification')),
+                ('reservation', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='resources.reservation', verbose_name='reservation')),
+            ],
+            options={
+                'verbose_name': 'Exchange upload job',
+                'verbose_name_plural': 'Exchange upload jobs',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='exchangeuploadjob',
+            index=models.Index(fields=['state', 'next_attempt_at'], name='respa_exchange_upload_due_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='exchangeuploadjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('state', 'pending')), fields=('reservation',), name='respa_exchange_upload_pending_uniq'),
+        ),
+    ]
@@ -1,6 +1,8 @@
+from datetime import timedelta
+
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.utils import timezone
 from django.utils.module_loading import import_string
 from django.utils.translation import gettext_lazy as _
@@ -145,6 +147,7 @@ class ExchangeReservation(models.Model):
         on_delete=models.DO_NOTHING,  # The signal will (hopefully) deal with this
         editable=False,
         related_name='exchange_reservation',
+        db_constraint=False,
     )
     item_id_hash = models.CharField(
         # The MD5 hash of the item ID; results in shorter (=faster) DB indexes
@@ -254,3 +257,117 @@ class ExchangeUserX500Address(models.Model):
 
     class Meta:
         unique_together = (('exchange', 'address'),)
+
+
+class ExchangeUploadJobQuerySet(models.QuerySet):
+    def due(self):
+        return self.filter(state=ExchangeUploadJob.PENDING, next_attempt_at__lte=timezone.now())
+
+
+class ExchangeUploadJob(models.Model):
+    """
+    A pending upload of a reservation's changes to Exchange.
+
+    The reservation signals only enqueue the jobs when the transaction
+    commits, and the respa_exchange_upload command sends them, so that
+    the EWS calls do not slow down or roll back the reservation saves.
+    There is at most one pending job per reservation; later changes are
+    merged into it and the worker uploads the reservation as it is then.
+    """
+    UPLOAD = 'upload'
+    DELETE = 'delete'
+    OPERATION_CHOICES = (
+        (UPLOAD, _('upload')),
+        (DELETE, _('delete')),
+    )
+
+    PENDING = 'pending'
+    PROCESSING = 'processing'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATE_CHOICES = (
+        (PENDING, _('pending')),
+        (PROCESSING, _('processing')),
+        (DONE, _('done')),
+        (FAILED, _('failed')),
+    )
+
+    reservation = models.ForeignKey(
+        Reservation,
+        verbose_name=_('reservation'),
+        on_delete=models.DO_NOTHING,  # Deletions are uploaded after the reservation is gone
+        related_name='+',
+        db_constraint=False,
+    )
+    operation = models.CharField(verbose_name=_('operation'), max_length=16, choices=OPERATION_CHOICES)
+    send_notifications = models.BooleanField(verbose_name=_('send notifications'), default=True)
+    state = models.CharField(verbose_name=_('state'), max_length=16, choices=STATE_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(verbose_name=_('attempts'), default=0)
+    next_attempt_at = models.DateTimeField(verbose_name=_('time of next attempt'), default=timezone.now)
+    last_error = models.TextField(verbose_name=_('last error'), blank=True)
+    created_at = models.DateTimeField(verbose_name=_('time of creation'), auto_now_add=True)
+    modified_at = models.DateTimeField(verbose_name=_('time of modification'), auto_now=True)
+
+    objects = ExchangeUploadJobQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = _("Exchange upload job")
+        verbose_name_plural = _("Exchange upload jobs")
+        indexes = [
+            models.Index(fields=['state', 'next_attempt_at'], name='respa_exchange_upload_due_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['reservation'], condition=models.Q(state='pending'), name='respa_exchange_upload_pending_uniq'
+            ),
+        ]
+
+    def __str__(self):
+        return "ExchangeUploadJob %s: %s reservation %s (%s)" % (
+            self.pk, self.operation, self.reservation_id, self.state
+        )
+
+    @classmethod
+    def enqueue(cls, reservation, operation):
+        """
+        Enqueue an upload of the reservation when the current transaction commits.
+
+        :type reservation: resources.models.Reservation
+        :param operation: UPLOAD or DELETE
+        """
+        reservation_id = reservation.pk
+        send_notifications = not getattr(reservation, '_skip_notifications', False)
+
+        def create():
+            # a merged job starts over, as it uploads the reservation as it is now
+            values = dict(operation=operation, send_notifications=send_notifications, next_attempt_at=timezone.now(),
+                          attempts=0, last_error='')
+            for _attempt in range(2):
+                try:
+                    with transaction.atomic():
+                        if cls.objects.filter(reservation_id=reservation_id, state=cls.PENDING).update(**values):
+                            return
+                        cls.objects.create(reservation_id=reservation_id, **values)
+                        return
+                except IntegrityError:
+                    # a concurrent transaction created the pending job first, merge into it
+                    continue
+        transaction.on_commit(create, robust=True)
+
+    def reschedule(self, error):
+        """
+        Schedule the job to be retried with an exponential backoff, or mark
+        it failed when it has been tried too many times.
+        """
+        self.attempts += 1
+        self.last_error = str(error)
+        if self.attempts >= settings.RESPA_EXCHANGE_UPLOAD_MAX_ATTEMPTS:
+            self.state = self.FAILED
+        else:
+            delay = settings.RESPA_EXCHANGE_UPLOAD_RETRY_DELAY * 2 ** (self.attempts - 1)
+            self.state = self.PENDING
+            self.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+            if ExchangeUploadJob.objects.filter(reservation_id=self.reservation_id, state=self.PENDING).exists():
+                # the reservation has changed since, the newer job uploads it as it is now
+                self.state = self.DONE
+        self.save()
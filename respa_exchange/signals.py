@@ -1,14 +1,14 @@
 from django.conf import settings
-from django.db import transaction
 
-from respa_exchange.models import ExchangeReservation, ExchangeResource
-from respa_exchange.uploader import create_on_remote, delete_on_remote, update_on_remote
+from respa_exchange.models import ExchangeResource, ExchangeUploadJob
 
 
 def handle_reservation_save(instance, **kwargs):
     """
     Django signal handler for updating changed/created reservations on remote Exchanges.
 
+    The upload itself is done by the respa_exchange_upload command, see ExchangeUploadJob.
+
     :param instance: A Reservation instance
     :type instance: resources.models.Reservation
     :param kwargs: The rest of the signal args
@@ -22,35 +22,19 @@ def handle_reservation_save(instance, **kwargs):
         # we don't want to push it back up!
         return
 
-    with transaction.atomic():
-        exchange_resource = ExchangeResource.objects.filter(
-            sync_from_respa=True, resource=instance.resource
-        ).select_for_update().select_related("exchange").first()
-        if not exchange_resource:  # Not an Exchange-enabled resource; never mind.
-            return
-
-        exchange_reservation = ExchangeReservation.objects.filter(
-            reservation=instance,
-            # If this reservation has come from Exchange,
-            # we don't want to upload changes made to it.
-            managed_in_exchange=False
-        ).first()
-        if not exchange_reservation:  # First sync? How exciting!
-            exchange_reservation = ExchangeReservation(
-                reservation=instance,
-                exchange=exchange_resource.exchange,
-                principal_email=exchange_resource.principal_email
-            )
+    if not ExchangeResource.objects.filter(sync_from_respa=True, resource=instance.resource_id).exists():
+        # Not an Exchange-enabled resource; never mind.
+        return
 
-            create_on_remote(exchange_reservation)
-        else:
-            update_on_remote(exchange_reservation)
+    ExchangeUploadJob.enqueue(instance, ExchangeUploadJob.UPLOAD)
 
 
 def handle_reservation_delete(instance, **kwargs):
     """
     Django signal handler for deleting reservation-related appointments from Exchange
 
+    The deletion itself is done by the respa_exchange_upload command, see ExchangeUploadJob.
+
     :param instance: A Reservation instance
     :type instance: resources.models.Reservation
     :param kwargs: The rest of the signal args
@@ -59,19 +43,8 @@ def handle_reservation_delete(instance, **kwargs):
     if not getattr(settings, "RESPA_EXCHANGE_ENABLED", True):
         return
 
-    with transaction.atomic():
-        exchange_resource = ExchangeResource.objects.filter(
-            sync_from_respa=True, resource=instance.resource
-        ).select_for_update().select_related("exchange").first()
-        if not exchange_resource:  # Not an Exchange-enabled resource; never mind.
-            return
+    if not ExchangeResource.objects.filter(sync_from_respa=True, resource=instance.resource_id).exists():
+        # Not an Exchange-enabled resource; never mind.
+        return
 
-        exchange_reservation = ExchangeReservation.objects.filter(
-            reservation=instance,
-            # If this reservation has come from Exchange,
-            # we don't want to upload deletions.
-            managed_in_exchange=False
-        ).first()
-        if exchange_reservation:
-            delete_on_remote(exchange_reservation)
-            assert not exchange_reservation.pk
+    ExchangeUploadJob.enqueue(instance, ExchangeUploadJob.DELETE)
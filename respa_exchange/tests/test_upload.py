@@ -1,13 +1,15 @@
 from datetime import timedelta
+from unittest import mock
 
 import pytest
 from django.utils.crypto import get_random_string
 from django.utils.timezone import now
 
 from resources.models.reservation import Reservation
-from respa_exchange.models import ExchangeReservation, ExchangeResource
+from respa_exchange.models import ExchangeReservation, ExchangeResource, ExchangeUploadJob
 from respa_exchange.tests.handlers import CRUDItemHandlers
 from respa_exchange.tests.session import SoapSeller
+from respa_exchange.uploader import process_upload_jobs
 
 
 @pytest.mark.django_db
@@ -17,7 +19,7 @@ from respa_exchange.tests.session import SoapSeller
 @pytest.mark.parametrize("cancel_instead_of_delete", (False, True))
 @pytest.mark.parametrize("update_too", (False, True))
 def test_crud_reservation(
-    settings, space_resource, exchange, admin_user,
+    settings, django_capture_on_commit_callbacks, space_resource, exchange, admin_user,
     master_switch, authed_res, is_exchange_resource, cancel_instead_of_delete, update_too
 ):
     settings.RESPA_EXCHANGE_ENABLED = master_switch
@@ -35,13 +37,16 @@ def test_crud_reservation(
         )
     # Signals are called at creation time...
 
-    res = Reservation.objects.create(
-        resource=space_resource,
-        begin=now(),
-        end=now() + timedelta(minutes=30),
-        user=(admin_user if authed_res else None),
-        state=Reservation.CONFIRMED
-    )
+    with django_capture_on_commit_callbacks(execute=True):
+        res = Reservation.objects.create(
+            resource=space_resource,
+            begin=now(),
+            end=now() + timedelta(minutes=30),
+            user=(admin_user if authed_res else None),
+            state=Reservation.CONFIRMED
+        )
+    # ... and the uploads are done by the worker
+    process_upload_jobs()
     if master_switch and is_exchange_resource:
         # so now we should have a reservation in Exchange
         ex_resv = ExchangeReservation.objects.get(
@@ -56,17 +61,63 @@ def test_crud_reservation(
     if update_too:
         res.end += timedelta(minutes=30)
         res.reserver_name = "John Doe"
-        res.save()
+        with django_capture_on_commit_callbacks(execute=True):
+            res.save()
+        process_upload_jobs()
         if master_switch and is_exchange_resource:
             # Our exchange reservation's change key should have changed
             ex_resv = ExchangeReservation.objects.get(reservation=res)
             assert ex_resv.item_id.change_key == delegate.update_change_key
 
-    if cancel_instead_of_delete:  # But let's cancel it...
-        res.set_state(Reservation.CANCELLED, user=admin_user)
-    else:  # But let's delete it...
-        res.delete()
+    with django_capture_on_commit_callbacks(execute=True):
+        if cancel_instead_of_delete:  # But let's cancel it...
+            res.set_state(Reservation.CANCELLED, user=admin_user)
+        else:  # But let's delete it...
+            res.delete()
+    process_upload_jobs()
 
     # ... so our Exchange reservation gets destroyed.
 
     assert not ExchangeReservation.objects.filter(reservation=res).exists()
+
+
+@pytest.mark.django_db
+def test_upload_jobs_are_coalesced_and_retried(django_capture_on_commit_callbacks, space_resource, exchange):
+    ExchangeResource.objects.create(
+        resource=space_resource,
+        principal_email="test@example.com",
+        exchange=exchange
+    )
+    with django_capture_on_commit_callbacks(execute=True):
+        res = Reservation.objects.create(
+            resource=space_resource,
+            begin=now(),
+            end=now() + timedelta(minutes=30),
+            state=Reservation.CONFIRMED
+        )
+    with django_capture_on_commit_callbacks(execute=True):
+        res.reserver_name = "John Doe"
+        res.save()
+    job = ExchangeUploadJob.objects.get(reservation=res)
+    assert job.state == ExchangeUploadJob.PENDING
+    assert job.operation == ExchangeUploadJob.UPLOAD
+
+    with mock.patch('respa_exchange.uploader.process_upload_job', side_effect=Exception('Exchange is down')):
+        assert process_upload_jobs() == 1
+    job.refresh_from_db()
+    assert job.state == ExchangeUploadJob.PENDING
+    assert job.attempts == 1
+    assert job.next_attempt_at > now()
+    assert job.last_error == 'Exchange is down'
+    assert not ExchangeReservation.objects.filter(reservation=res).exists()
+
+    # not due yet
+    assert process_upload_jobs() == 0
+
+    with django_capture_on_commit_callbacks(execute=True):
+        res.delete()
+    job.refresh_from_db()
+    assert job.operation == ExchangeUploadJob.DELETE
+    assert job.next_attempt_at <= now()
+    assert job.attempts == 0
+    assert ExchangeUploadJob.objects.count() == 1
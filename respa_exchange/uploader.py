@@ -3,10 +3,12 @@ Upload Respa reservations into Exchange as calendar events.
 """
 import logging
 
+from django.db import transaction
 from django.utils.encoding import force_str
 
 from resources.models import Reservation
 from respa_exchange.ews.calendar import CreateCalendarItemRequest, DeleteCalendarItemRequest, UpdateCalendarItemRequest
+from respa_exchange.models import ExchangeConfiguration, ExchangeReservation, ExchangeResource, ExchangeUploadJob
 
 log = logging.getLogger(__name__)
 
@@ -117,16 +119,19 @@ def update_on_remote(exres):
     log.info("Updated calendar item for %s", exres)
 
 
-def delete_on_remote(exres):
+def delete_on_remote(exres, send_notifications=None):
     """
     Delete the Exchange appointment for an ExchangeReservation.
 
     :param exres: Exchange Reservation
     :type exres: respa_exchange.models.ExchangeReservation
+    :param send_notifications: Whether to notify the attendees; by default
+                               decided from the reservation, which may
+                               already have been deleted
+    :type send_notifications: bool|None
     """
-    send_notifications = True
-    if getattr(exres.reservation, '_skip_notifications', False):
-        send_notifications = False
+    if send_notifications is None:
+        send_notifications = not getattr(exres.reservation, '_skip_notifications', False)
     dcir = DeleteCalendarItemRequest(
         principal=exres.principal_email,
         item_id=exres.item_id,
@@ -135,3 +140,87 @@ def delete_on_remote(exres):
     dcir.send(exres.exchange.get_ews_session())
     log.info("Deleted %s", exres)
     exres.delete()
+
+
+def process_upload_job(job, exchanges):
+    """
+    Upload the current state of the job's reservation to Exchange.
+
+    :type job: respa_exchange.models.ExchangeUploadJob
+    :param exchanges: Exchange configurations by id, reused between the jobs
+                      so that their EWS sessions keep their connections open
+    :type exchanges: dict[int, respa_exchange.models.ExchangeConfiguration]
+    """
+    def get_exchange(exchange_id):
+        if exchange_id not in exchanges:
+            exchanges[exchange_id] = ExchangeConfiguration.objects.get(pk=exchange_id)
+        return exchanges[exchange_id]
+
+    exchange_reservation = ExchangeReservation.objects.filter(
+        reservation=job.reservation_id,
+        # If this reservation has come from Exchange,
+        # we don't want to upload changes made to it.
+        managed_in_exchange=False
+    ).first()
+    if exchange_reservation:
+        exchange_reservation.exchange = get_exchange(exchange_reservation.exchange_id)
+
+    reservation = Reservation.objects.filter(pk=job.reservation_id).select_related(
+        'resource', 'resource__unit', 'user'
+    ).first()
+    if job.operation == ExchangeUploadJob.DELETE or reservation is None:
+        if exchange_reservation:
+            delete_on_remote(exchange_reservation, send_notifications=job.send_notifications)
+        return
+
+    exchange_resource = ExchangeResource.objects.filter(sync_from_respa=True, resource=reservation.resource).first()
+    if not exchange_resource:  # Not an Exchange-enabled resource (anymore); never mind.
+        return
+
+    reservation._skip_notifications = not job.send_notifications
+    if not exchange_reservation:  # First sync? How exciting!
+        exchange_reservation = ExchangeReservation(
+            reservation=reservation,
+            exchange=get_exchange(exchange_resource.exchange_id),
+            principal_email=exchange_resource.principal_email
+        )
+        create_on_remote(exchange_reservation)
+    else:
+        exchange_reservation.reservation = reservation
+        update_on_remote(exchange_reservation)
+
+
+def process_upload_jobs():
+    """
+    Process the due upload jobs, oldest first, retrying the failed ones later.
+
+    Must not be run concurrently, see the respa_exchange_upload command.
+
+    :return: number of jobs processed
+    """
+    # jobs left processing by an interrupted run are retried
+    for job in ExchangeUploadJob.objects.filter(state=ExchangeUploadJob.PROCESSING):
+        job.reschedule('Processing was interrupted')
+
+    exchanges = {}
+    processed = 0
+    while True:
+        with transaction.atomic():
+            job = ExchangeUploadJob.objects.due().order_by('next_attempt_at', 'id').select_for_update().first()
+            if job is None:
+                break
+            # changes made from now on go to a new pending job
+            job.state = ExchangeUploadJob.PROCESSING
+            job.save(update_fields=('state', 'modified_at'))
+
+        try:
+            process_upload_job(job, exchanges)
+        except Exception as exc:
+            log.exception("Uploading %s failed", job)
+            job.reschedule(exc)
+        else:
+            job.state = ExchangeUploadJob.DONE
+            job.last_error = ''
+            job.save(update_fields=('state', 'last_error', 'modified_at'))
+        processed += 1
+    return processed
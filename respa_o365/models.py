@@ -35,7 +35,7 @@ class OutlookCalendarReservation(models.Model):
     calendar_link = models.ForeignKey('OutlookCalendarLink', verbose_name=_('Calendar Link'),
                         blank=False, null=False, on_delete=models.CASCADE)
     reservation = models.ForeignKey('resources.Reservation', verbose_name=_('Reservation'),
-                                    blank=False, null=False, on_delete=models.CASCADE)
+                                    blank=False, null=False, on_delete=models.CASCADE, db_constraint=False)
     exchange_id = models.TextField(verbose_name=_('Exchange ID'), unique=True)
     exchange_change_key = models.TextField(verbose_name=_('Exchange Change Key'))
     respa_change_key = models.TextField(verbose_name=_('Respa Change Key'))
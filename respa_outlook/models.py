@@ -110,6 +110,7 @@ class RespaOutlookConfiguration(models.Model):
                         response_type='Accept'
                     )
             appointment.save()
+        outlook.exchange_changekey = appointment.changekey
         outlook.modified = datetime.now() + timedelta(minutes=2)
         outlook.save()
 
@@ -152,7 +153,7 @@ class RespaOutlookReservation(models.Model):
     name = models.CharField(verbose_name=_("Reserver name & Resource"), max_length=255)
 
     reservation = models.ForeignKey('resources.Reservation', verbose_name=_('Reservation'), related_name='OutlookReservations',
-                                    blank=True, null=True, on_delete=models.CASCADE)
+                                    blank=True, null=True, on_delete=models.CASCADE, db_constraint=False)
 
     exchange_id = models.CharField(verbose_name=_("Exchange ID"), max_length=255)
     exchange_changekey = models.CharField(verbose_name=_("Exchange Key"), max_length=255)
@@ -1,9 +1,9 @@
 from django.conf import settings
 
 from respa_outlook.models import RespaOutlookReservation
+from resources.models import Reservation
 from django.core.exceptions import ValidationError
-
-from exchangelib.errors import ErrorItemNotFound
+from django.utils import timezone
 
 from time import sleep, time
 from copy import copy
@@ -44,7 +44,7 @@ class Listen():
                 assert self.config is not None
                 assert self.calendar is not None
 
-                self.handle_add()
+                self.poll()
 
                 self.manager = None
                 self.config = None
@@ -58,58 +58,80 @@ class Listen():
         self.signal.set()
 
 
-    def handle_add(self):
-        for appointment in self.calendar:
-            try:
-                RespaOutlookReservation.objects.get(exchange_id=appointment.id)
-                continue
-            except:
-                try:
-                    email = appointment.organizer.email_address
-                    self.config.create_respa_outlook_reservation(
-                        appointment=appointment,
-                        reservation=None,
-                        email=email
-                    )
-                except Exception as ex:
-                    if isinstance(ex, ValidationError):
-                        appointment.delete()
-                    continue
-        self.handle_modify()
-    
-    def handle_modify(self):
-        for appointment in self.calendar:
+    def poll(self):
+        """
+        Synchronize the configuration's mailbox with Respa in a single pass.
+
+        Known appointments are looked up from an exchange_id -> RespaOutlookReservation
+        mapping loaded with one query, modifications are detected by comparing the
+        stored changekeys and remote deletions by set difference.
+        """
+        # The known reservations are loaded before the calendar, so that all of them
+        # were in Exchange when it was fetched. A reservation Respa creates in between
+        # would otherwise look deleted in Exchange and be cancelled. The calendar only
+        # contains future appointments, so stored reservations that have already ended
+        # can't be told apart from deleted ones and are left alone.
+        known = self.get_known(reservation__end__gte=timezone.now())
+
+        appointments = list(self.calendar)
+        exchange_ids = set(appointment.id for appointment in appointments)
+
+        # ended or just created reservations whose appointments are still in the calendar
+        unknown_ids = exchange_ids - set(known)
+        found = self.get_known(exchange_id__in=unknown_ids) if unknown_ids else {}
+
+        for appointment in appointments:
+            outlook = known.get(appointment.id) or found.get(appointment.id)
             try:
-                respa_outlook = RespaOutlookReservation.objects.get(exchange_id=appointment.id)
-                reservation = respa_outlook.reservation
-                if (appointment.start == reservation.begin and
-                    appointment.end == reservation.end):
-                   continue
-                self.config.handle_modify(reservation, appointment)
-            except:
+                if not outlook:
+                    self.handle_add(appointment)
+                elif outlook.reservation.state == Reservation.CANCELLED:
+                    self.handle_remove(appointment, outlook)
+                elif outlook.exchange_changekey != appointment.changekey:
+                    self.handle_modify(appointment, outlook)
+            except Exception:
                 continue
-        self.handle_remove()
-    
-    def handle_remove(self):
-        for appointment in self.calendar:
+
+        for exchange_id in set(known) - exchange_ids:
             try:
-                respa_outlook = RespaOutlookReservation.objects.get(exchange_id=appointment.id)
-                reservation = respa_outlook.reservation
-                if reservation.state == 'cancelled':
-                    appointment.delete()
-                    respa_outlook.delete()
-            except:
+                self.handle_missing(known[exchange_id])
+            except Exception:
                 continue
-        for outlook in RespaOutlookReservation.objects.all():
-            reservation = outlook.reservation
-            try:
-                appointment = self.calendar.get(id=outlook.exchange_id)
-                if isinstance(appointment, ErrorItemNotFound):
-                    reservation.state = 'cancelled'
-                    reservation.save()
-                    outlook.delete()
-            except:
-                outlook.reservation.state = 'cancelled'
-                reservation.save()
-                outlook.delete()
 
+    def get_known(self, **filters):
+        return {
+            outlook.exchange_id: outlook
+            for outlook in RespaOutlookReservation.objects.filter(
+                reservation__resource=self.config.resource, **filters
+            ).select_related('reservation')
+        }
+
+    def handle_add(self, appointment):
+        try:
+            email = appointment.organizer.email_address
+            self.config.create_respa_outlook_reservation(
+                appointment=appointment,
+                reservation=None,
+                email=email
+            )
+        except ValidationError:
+            appointment.delete()
+
+    def handle_modify(self, appointment, outlook):
+        reservation = outlook.reservation
+        if (appointment.start != reservation.begin or
+                appointment.end != reservation.end):
+            self.config.handle_modify(reservation, appointment)
+        outlook.exchange_changekey = appointment.changekey
+        outlook.save(update_fields=['exchange_changekey'])
+
+    def handle_remove(self, appointment, outlook):
+        appointment.delete()
+        outlook.delete()
+
+    def handle_missing(self, outlook):
+        reservation = outlook.reservation
+        if reservation.state != Reservation.CANCELLED:
+            reservation.state = Reservation.CANCELLED
+            reservation.save()
+        outlook.delete()
@@ -0,0 +1,18 @@
+import datetime
+
+import pytest
+from pytz import UTC
+
+from resources.models import Reservation
+from resources.tests.conftest import *  # noqa
+
+
+@pytest.fixture()
+def reservation(resource_in_unit, user):
+    return Reservation.objects.create(
+        resource=resource_in_unit,
+        begin=datetime.datetime(2119, 5, 5, 10, 0, 0, tzinfo=UTC),
+        end=datetime.datetime(2119, 5, 5, 12, 0, 0, tzinfo=UTC),
+        user=user,
+        state=Reservation.CONFIRMED,
+    )
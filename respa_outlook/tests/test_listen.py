@@ -0,0 +1,107 @@
+import datetime
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+from pytz import UTC
+
+from resources.models import Reservation
+from respa_outlook.models import RespaOutlookReservation
+from respa_outlook.polling.listen import Listen
+
+
+def get_listen(resource, calendar):
+    # a poller without its thread
+    listen = Listen.__new__(Listen)
+    listen.config = mock.Mock(resource=resource)
+    listen.calendar = calendar
+    return listen
+
+
+def get_appointment(exchange_id, changekey, reservation):
+    return SimpleNamespace(
+        id=exchange_id, changekey=changekey, start=reservation.begin, end=reservation.end,
+        organizer=SimpleNamespace(email_address='test@example.com'), delete=mock.Mock(),
+    )
+
+
+def create_outlook_reservation(reservation, exchange_id='exchange-1', changekey='key-1'):
+    return RespaOutlookReservation.objects.create(
+        name='test', reservation=reservation, exchange_id=exchange_id, exchange_changekey=changekey
+    )
+
+
+@pytest.mark.django_db
+def test_poll_add(resource_in_unit, reservation):
+    appointment = get_appointment('exchange-1', 'key-1', reservation)
+    listen = get_listen(resource_in_unit, [appointment])
+    listen.poll()
+    listen.config.create_respa_outlook_reservation.assert_called_once_with(
+        appointment=appointment, reservation=None, email='test@example.com'
+    )
+
+
+@pytest.mark.django_db
+def test_poll_unchanged_and_modified(resource_in_unit, reservation):
+    outlook = create_outlook_reservation(reservation)
+    appointment = get_appointment('exchange-1', 'key-1', reservation)
+    listen = get_listen(resource_in_unit, [appointment])
+    listen.poll()
+    assert not listen.config.create_respa_outlook_reservation.called
+    assert not listen.config.handle_modify.called
+
+    appointment.changekey = 'key-2'
+    appointment.end = reservation.end + datetime.timedelta(hours=1)
+    listen.poll()
+    listen.config.handle_modify.assert_called_once()
+    outlook.refresh_from_db()
+    assert outlook.exchange_changekey == 'key-2'
+
+
+@pytest.mark.django_db
+def test_poll_remote_delete(resource_in_unit, reservation):
+    create_outlook_reservation(reservation)
+    get_listen(resource_in_unit, []).poll()
+    reservation.refresh_from_db()
+    assert reservation.state == Reservation.CANCELLED
+    assert not RespaOutlookReservation.objects.exists()
+
+
+@pytest.mark.django_db
+def test_poll_cancelled(resource_in_unit, reservation):
+    create_outlook_reservation(reservation)
+    reservation.state = Reservation.CANCELLED
+    reservation.save()
+    appointment = get_appointment('exchange-1', 'key-1', reservation)
+    get_listen(resource_in_unit, [appointment]).poll()
+    appointment.delete.assert_called_once()
+    assert not RespaOutlookReservation.objects.exists()
+
+
+@pytest.mark.django_db
+def test_poll_ended_reservation_not_cancelled(resource_in_unit, user):
+    reservation = Reservation.objects.create(
+        resource=resource_in_unit,
+        begin=datetime.datetime(2019, 5, 5, 10, 0, 0, tzinfo=UTC),
+        end=datetime.datetime(2019, 5, 5, 12, 0, 0, tzinfo=UTC),
+        user=user,
+        state=Reservation.CONFIRMED,
+    )
+    create_outlook_reservation(reservation)
+    get_listen(resource_in_unit, []).poll()
+    reservation.refresh_from_db()
+    assert reservation.state == Reservation.CONFIRMED
+
+
+@pytest.mark.django_db
+def test_poll_reservation_created_during_fetch(resource_in_unit, reservation):
+    class Calendar:
+        def __iter__(self):
+            # Respa creates a reservation while the calendar is being fetched
+            create_outlook_reservation(reservation)
+            return iter([])
+
+    get_listen(resource_in_unit, Calendar()).poll()
+    reservation.refresh_from_db()
+    assert reservation.state == Reservation.CONFIRMED
+    assert RespaOutlookReservation.objects.exists()
@@ -100,6 +100,7 @@ def anonymize_user_data(modeladmin, request, queryset):
             reserver_id='Removed',
             reserver_email_address='Removed',
             reserver_phone_number='Removed',
+            reserver_phone_number_normalized='',
             reserver_address_street='Removed',
             reserver_address_zip='Removed',
             reserver_address_city='Removed',
@@ -1,4 +1,6 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db import models
+from django.db.models.functions import Upper
 from helusers.models import AbstractUser
 from django.utils.crypto import get_random_string
 from django.utils.translation import gettext_lazy as _
@@ -76,6 +78,12 @@ class User(AbstractUser):
         ordering = ('id',)
         verbose_name = _('User')
         verbose_name_plural = _('Users')
+        # trigram indexes for the reserver_info_search filter of the reservation API
+        indexes = [
+            GinIndex(OpClass(Upper('first_name'), name='gin_trgm_ops'), name='users_user_first_name_trgm'),
+            GinIndex(OpClass(Upper('last_name'), name='gin_trgm_ops'), name='users_user_last_name_trgm'),
+            GinIndex(OpClass(Upper('email'), name='gin_trgm_ops'), name='users_user_email_trgm'),
+        ]
 
     def get_display_name(self):
         return '{0} {1}'.format(self.first_name, self.last_name).strip()